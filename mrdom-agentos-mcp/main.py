@@ -4,14 +4,17 @@ MrDom SDR AgentOS + Bedrock
 Sistema de automação de vendas com agentes inteligentes
 """
 
+import structlog
 import uvicorn
 from src.mrdom.api import create_app
 from src.mrdom.core.config import settings
+from src.mrdom.core.logs import configure_logging
+
+logger = structlog.get_logger("mrdom.main")
 
 def main():
     """Função principal da aplicação."""
-    print("🚀 Iniciando MrDom SDR AgentOS + Bedrock...")
-    print("=" * 50)
+    configure_logging()
     
     # Cria aplicação
     app = create_app()
@@ -21,23 +24,26 @@ def main():
     port = 8000
     reload = settings.debug
     
-    print(f"📱 Aplicação: {settings.app_name}")
-    print(f"🔢 Versão: {settings.version}")
-    print(f"🌍 Ambiente: {settings.environment}")
-    print(f"🤖 Modelo: {settings.bedrock_model}")
-    print(f"🌐 Servidor: http://{host}:{port}")
-    print(f"📚 Documentação: http://{host}:{port}/docs")
-    print(f"❤️ Health Check: http://{host}:{port}/api/v1/health")
-    print(f"🤖 Status Agentes: http://{host}:{port}/api/v1/agents/status")
-    print("=" * 50)
+    logger.info(
+        "server.starting",
+        app=settings.app_name,
+        version=settings.version,
+        environment=settings.environment,
+        model=settings.bedrock_model,
+        url=f"http://{host}:{port}",
+        docs=f"http://{host}:{port}/docs",
+        health=f"http://{host}:{port}/api/v1/health",
+        agents_status=f"http://{host}:{port}/api/v1/agents/status"
+    )
     
-    # Inicia servidor
+    # Inicia servidor (log_config=None: uvicorn usa o logging estruturado configurado acima)
     uvicorn.run(
         app,
         host=host,
         port=port,
         reload=reload,
-        log_level=settings.log_level.lower()
+        log_level=settings.log_level.lower(),
+        log_config=None
     )
 
 if __name__ == "__main__":
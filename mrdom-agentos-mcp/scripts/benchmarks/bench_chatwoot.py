@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark: entrega de respostas ao Chatwoot (pool + coalescência x ingênuo)
+
+Simula conversas que recebem indicador de digitação seguido de rajadas de
+mensagens e mede vazão, requisições HTTP efetivamente enviadas, retentativas
+e latência de entrega. Por padrão usa o servidor falso em processo
+(httpx.ASGITransport); com --url mede contra um servidor real, por exemplo o
+mesmo servidor falso servido pelo uvicorn:
+
+    uvicorn mrdom.integrations.chatwoot_fake:app --port 3999 --app-dir src
+    python scripts/benchmarks/bench_chatwoot.py --url http://127.0.0.1:3999
+
+    python scripts/benchmarks/bench_chatwoot.py --conversations 200 --burst 3
+    python scripts/benchmarks/bench_chatwoot.py --rate-limit-rate 0.05 --error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.mrdom.integrations.chatwoot import ChatwootClient  # noqa: E402
+from src.mrdom.integrations.chatwoot_fake import FakeChatwootServer  # noqa: E402
+
+ACCOUNT_ID = "1"
+TOKEN = "bench-token"
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+async def run_pooled(
+    args: argparse.Namespace, transport: Optional[httpx.AsyncBaseTransport], base_url: str
+) -> Tuple[float, List[float], Dict[str, Any]]:
+    """ChatwootClient: um pool, concorrência limitada, retry e coalescência."""
+    client = ChatwootClient(
+        base_url=base_url,
+        access_token=TOKEN,
+        account_id=ACCOUNT_ID,
+        transport=transport,
+        max_concurrency=args.concurrency,
+        coalesce_window_seconds=args.window
+    )
+    latencies: List[float] = []
+
+    async def conversation(conversation_id: str) -> None:
+        client.set_typing(conversation_id, True)
+        await asyncio.sleep(args.think_time)
+
+        async def one(index: int) -> None:
+            started = time.perf_counter()
+            await client.send_message(conversation_id, f"resposta {index} da conversa {conversation_id}")
+            latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(one(i) for i in range(args.burst)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(conversation(str(c)) for c in range(args.conversations)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    stats = client.status()
+    await client.close()
+    return elapsed, latencies, stats
+
+
+async def run_naive(
+    args: argparse.Namespace, transport: Optional[httpx.AsyncBaseTransport], base_url: str
+) -> Tuple[float, List[float], Dict[str, Any]]:
+    """Um AsyncClient por requisição, sem limite, sem retry e sem coalescência."""
+    latencies: List[float] = []
+    stats = {"requests": 0, "retries": 0, "failures": 0}
+
+    async def post(path: str, payload: Dict[str, Any]) -> None:
+        async with httpx.AsyncClient(base_url=base_url, transport=transport, headers={"api_access_token": TOKEN}) as client:
+            stats["requests"] += 1
+            response = await client.post(path, json=payload)
+            if response.status_code >= 400:
+                stats["failures"] += 1
+
+    async def conversation(conversation_id: str) -> None:
+        prefix = f"/api/v1/accounts/{ACCOUNT_ID}/conversations/{conversation_id}"
+        await post(f"{prefix}/toggle_typing_status", {"typing_status": "on"})
+        await asyncio.sleep(args.think_time)
+
+        async def one(index: int) -> None:
+            started = time.perf_counter()
+            await post(f"{prefix}/messages", {
+                "content": f"resposta {index} da conversa {conversation_id}",
+                "message_type": "outgoing",
+                "private": False
+            })
+            latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(one(i) for i in range(args.burst)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(conversation(str(c)) for c in range(args.conversations)), return_exceptions=True)
+    return time.perf_counter() - started, latencies, stats
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    if args.url:
+        server, base_url = None, args.url
+    else:
+        server = FakeChatwootServer(
+            latency_seconds=args.server_latency,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            access_token=TOKEN,
+            seed=42
+        )
+        base_url = "http://chatwoot.fake"
+
+    total_messages = args.conversations * args.burst
+    print(f"{args.conversations} conversas x {args.burst} mensagens = {total_messages} mensagens")
+    print(f"{'modo':<8} {'msgs/s':>10} {'requisições':>12} {'retries':>8} {'falhas':>7} {'p50 ms':>8} {'p95 ms':>8} {'pico srv':>9}")
+
+    for mode, runner in (("naive", run_naive), ("pooled", run_pooled)):
+        if server is not None:
+            server.max_inflight = 0
+        transport = httpx.ASGITransport(app=server) if server is not None else None
+        elapsed, latencies, stats = await runner(args, transport, base_url)
+        print(
+            f"{mode:<8} {len(latencies) / elapsed:>10.1f} {stats['requests']:>12} "
+            f"{stats['retries']:>8} {stats['failures']:>7} "
+            f"{percentile(latencies, 0.5) * 1000:>8.1f} {percentile(latencies, 0.95) * 1000:>8.1f} "
+            f"{server.max_inflight if server is not None else '-':>9}"
+        )
+        if latencies and args.verbose:
+            print(f"  média {statistics.mean(latencies) * 1000:.1f} ms, {elapsed:.2f}s no total")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Chatwoot (ou servidor falso) real; padrão: servidor falso em processo")
+    parser.add_argument("--conversations", type=int, default=500)
+    parser.add_argument("--burst", type=int, default=2, help="mensagens por conversa na mesma janela")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--window", type=float, default=0.05, help="janela de coalescência (s)")
+    parser.add_argument("--think-time", type=float, default=0.01, help="tempo entre digitação e mensagens (s)")
+    parser.add_argument("--server-latency", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--verbose", action="store_true")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tabela única x particionada por mês (messages)
+
+Mede throughput de INSERT (COPY e INSERT em lote) e a latência das consultas
+limitadas por tempo que a aplicação executa. Usa um schema descartável
+(bench_partitions) no banco indicado; nada é escrito nas tabelas reais.
+
+    python scripts/benchmarks/bench_partitions.py --rows 1000000 --months 12
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator, List, Sequence, Tuple
+
+import asyncpg
+
+SCHEMA = "bench_partitions"
+
+FLAT_DDL = f"""
+CREATE TABLE {SCHEMA}.messages_flat (
+    id UUID PRIMARY KEY,
+    conversation_id UUID,
+    content TEXT NOT NULL,
+    message_type VARCHAR(50) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+CREATE INDEX ON {SCHEMA}.messages_flat(conversation_id, created_at);
+CREATE INDEX ON {SCHEMA}.messages_flat(created_at);
+"""
+
+PARTITIONED_DDL = f"""
+CREATE TABLE {SCHEMA}.messages_part (
+    id UUID NOT NULL,
+    conversation_id UUID,
+    content TEXT NOT NULL,
+    message_type VARCHAR(50) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE INDEX ON {SCHEMA}.messages_part(conversation_id, created_at);
+CREATE INDEX ON {SCHEMA}.messages_part(created_at);
+"""
+
+COLUMNS = ["id", "conversation_id", "content", "message_type", "created_at"]
+
+# Consultas limitadas por tempo equivalentes às da aplicação
+QUERIES = {
+    "rollup_window_1h": """
+        SELECT date_trunc('hour', created_at), count(*) FROM {table}
+        WHERE created_at > $1 - interval '1 hour' AND created_at <= $1 GROUP BY 1
+    """,
+    "last_24h_count": """
+        SELECT count(*) FROM {table} WHERE created_at > $1 - interval '24 hours'
+    """,
+    "conversation_history_7d": """
+        SELECT id, content, created_at FROM {table}
+        WHERE conversation_id = $2 AND created_at > $1 - interval '7 days'
+        ORDER BY created_at DESC LIMIT 50
+    """,
+}
+
+
+def generate_rows(
+    count: int, start: datetime, end: datetime, conversations: List[uuid.UUID]
+) -> Iterator[Tuple[Any, ...]]:
+    span = (end - start).total_seconds()
+    for _ in range(count):
+        yield (
+            uuid.uuid4(),
+            random.choice(conversations),
+            "Olá, gostaria de saber mais sobre os planos da DOM360",
+            random.choice(("incoming", "outgoing")),
+            start + timedelta(seconds=random.random() * span),
+        )
+
+
+def add_months(ts: datetime, months: int) -> datetime:
+    index = ts.month - 1 + months
+    return ts.replace(year=ts.year + index // 12, month=index % 12 + 1, day=1)
+
+
+async def setup(conn: asyncpg.Connection, start: datetime, months: int) -> None:
+    await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA};")
+    await conn.execute(FLAT_DDL)
+    await conn.execute(PARTITIONED_DDL)
+    for month in range(months):
+        lower = add_months(start, month)
+        upper = add_months(start, month + 1)
+        await conn.execute(
+            f"CREATE TABLE {SCHEMA}.messages_part_p{lower:%Y%m%d} PARTITION OF {SCHEMA}.messages_part "
+            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+
+
+async def bench_insert(
+    conn: asyncpg.Connection, table: str, rows: List[Tuple[Any, ...]], batch_size: int
+) -> float:
+    """COPY em lotes (caminho de ingestão em massa) -> linhas/s."""
+    started = time.perf_counter()
+    for i in range(0, len(rows), batch_size):
+        await conn.copy_records_to_table(
+            table, records=rows[i:i + batch_size], columns=COLUMNS, schema_name=SCHEMA
+        )
+    return len(rows) / (time.perf_counter() - started)
+
+
+async def bench_insert_single(conn: asyncpg.Connection, table: str, rows: List[Tuple[Any, ...]]) -> float:
+    """INSERT em lote via executemany (caminho de escrita da API) -> linhas/s."""
+    started = time.perf_counter()
+    await conn.executemany(
+        f"INSERT INTO {SCHEMA}.{table} ({', '.join(COLUMNS)}) VALUES ($1, $2, $3, $4, $5)", rows
+    )
+    return len(rows) / (time.perf_counter() - started)
+
+
+async def bench_query(
+    conn: asyncpg.Connection, sql: str, args: Sequence[Any], repeats: int
+) -> Tuple[float, float]:
+    timings: List[float] = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await conn.fetch(sql, *args)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help="Mantém o schema ao final")
+    args = parser.parse_args()
+
+    end = datetime.now(timezone.utc)
+    start = (end - timedelta(days=30 * (args.months - 1))).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+    conversations = [uuid.uuid4() for _ in range(max(1, args.rows // 50))]
+    rows = list(generate_rows(args.rows, start, end, conversations))
+    probe = (end, random.choice(conversations))
+
+    conn = await asyncpg.connect(args.dsn)
+    try:
+        await setup(conn, start, args.months + 1)
+        print(f"{args.rows} linhas, {args.months} meses\n")
+        print(f"{'tabela':<16}{'COPY (l/s)':>14}{'INSERT (l/s)':>16}")
+        # Metade (até 20 mil linhas) vai por INSERT; o restante por COPY
+        split = len(rows) - min(len(rows) // 2, 20_000)
+        bulk, tail = rows[:split], rows[split:]
+        for table in ("messages_flat", "messages_part"):
+            copy_rate = await bench_insert(conn, table, bulk, args.batch_size)
+            insert_rate = await bench_insert_single(conn, table, tail) if tail else 0.0
+            print(f"{table:<16}{copy_rate:>14,.0f}{insert_rate:>16,.0f}")
+
+        await conn.execute(f"ANALYZE {SCHEMA}.messages_flat; ANALYZE {SCHEMA}.messages_part;")
+
+        print(f"\n{'consulta':<26}{'tabela':<16}{'p50 (ms)':>10}{'max (ms)':>10}")
+        for name, sql in QUERIES.items():
+            for table in ("messages_flat", "messages_part"):
+                query = sql.format(table=f"{SCHEMA}.{table}")
+                query_args = probe if "$2" in query else probe[:1]
+                p50, worst = await bench_query(conn, query, query_args, args.repeats)
+                print(f"{name:<26}{table:<16}{p50:>10.2f}{worst:>10.2f}")
+    finally:
+        if not args.keep:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
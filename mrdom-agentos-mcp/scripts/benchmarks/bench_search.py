@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Benchmark: busca de conversas (GIN trigram + full-text) em milhões de linhas
+
+Carrega dados sintéticos em um schema descartável (bench_search) com os
+mesmos índices da migration 003 e mede a latência da primeira página e da
+paginação profunda (keyset) via PostgresConversationSearch. Com --in-memory
+mede a implementação em memória (baseline de testes).
+
+    python scripts/benchmarks/bench_search.py --rows 2000000
+    python scripts/benchmarks/bench_search.py --in-memory --rows 200000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, List, Tuple
+
+import asyncpg
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.mrdom.search.conversations import (  # noqa: E402
+    ConversationSearchBackend,
+    InMemoryConversationSearch,
+    PostgresConversationSearch,
+    SearchQuery,
+)
+
+SCHEMA = "bench_search"
+
+VOCABULARY = (
+    "olá gostaria de saber mais sobre os planos preço orçamento quanto custa "
+    "integração whatsapp crm marketing vendas equipe demo reunião agendar "
+    "apresentação problema erro suporte ajuda não funciona relatório leads "
+    "pós-venda automação funil proposta contrato amanhã semana obrigado"
+).split()
+COMPANIES = ["Empresa ABC", "Comercial Souza", "Tech Brasil", "Loja Aurora", "Grupo Horizonte"]
+NAMES = ["João Silva", "Maria Oliveira", "Ana Souza", "Pedro Santos", "Carla Lima"]
+
+DDL = f"""
+CREATE TABLE {SCHEMA}.conversations (
+    id UUID PRIMARY KEY, external_id VARCHAR(255), platform VARCHAR(50) NOT NULL,
+    status VARCHAR(50), created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+CREATE TABLE {SCHEMA}.qualifications (
+    id UUID PRIMARY KEY, conversation_id UUID, lead_name VARCHAR(255), company VARCHAR(255),
+    email VARCHAR(255), phone VARCHAR(50), created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+CREATE TABLE {SCHEMA}.messages (
+    id UUID NOT NULL, conversation_id UUID, content TEXT NOT NULL,
+    message_type VARCHAR(50) NOT NULL, created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (id, created_at)
+);
+"""
+
+INDEXES = f"""
+CREATE INDEX ON {SCHEMA}.messages(conversation_id, created_at);
+CREATE INDEX ON {SCHEMA}.messages(created_at DESC, id DESC);
+CREATE INDEX ON {SCHEMA}.messages USING GIN (content gin_trgm_ops);
+CREATE INDEX ON {SCHEMA}.messages USING GIN (to_tsvector('portuguese', content));
+CREATE INDEX ON {SCHEMA}.qualifications(conversation_id);
+CREATE INDEX ON {SCHEMA}.qualifications USING GIN (company gin_trgm_ops);
+CREATE INDEX ON {SCHEMA}.qualifications USING GIN (lead_name gin_trgm_ops);
+CREATE INDEX ON {SCHEMA}.qualifications USING GIN (email gin_trgm_ops);
+CREATE INDEX ON {SCHEMA}.qualifications USING GIN (phone gin_trgm_ops);
+"""
+
+QUERIES = {
+    "frase": SearchQuery(text="agendar demo"),
+    "frase+plataforma+data": SearchQuery(text="integração whatsapp", platform="chatwoot"),
+    "substring": SearchQuery(text="funcion"),
+    "empresa": SearchQuery(company="aurora"),
+    "contato": SearchQuery(contact="oliveira"),
+}
+
+
+def synthetic_dataset(
+    rows: int, start: datetime, end: datetime
+) -> Tuple[List[Tuple[Any, ...]], List[Tuple[Any, ...]], List[Tuple[Any, ...]]]:
+    conversations = []
+    for i in range(max(1, rows // 20)):
+        conversations.append((
+            uuid.uuid4(), f"ext-{i}", random.choice(("chatwoot", "n8n", "webhook")),
+            random.choice(("active", "resolved"))
+        ))
+    qualifications = [
+        (uuid.uuid4(), conv[0], f"{random.choice(NAMES)} {i}", f"{random.choice(COMPANIES)} {i % 97}",
+         f"lead{i}@empresa.com.br", f"+55 11 9{i:08d}")
+        for i, conv in enumerate(conversations) if i % 3 == 0
+    ]
+    span = (end - start).total_seconds()
+    messages = [
+        (uuid.uuid4(), random.choice(conversations)[0],
+         " ".join(random.choices(VOCABULARY, k=random.randint(5, 25))),
+         random.choice(("incoming", "outgoing")),
+         start + timedelta(seconds=random.random() * span))
+        for _ in range(rows)
+    ]
+    return conversations, qualifications, messages
+
+
+async def measure(
+    backend: ConversationSearchBackend, query: SearchQuery, repeats: int, pages: int
+) -> Tuple[float, float, float]:
+    first: List[float] = []
+    deep: List[float] = []
+    for _ in range(repeats):
+        query.cursor = None
+        started = time.perf_counter()
+        page = await backend.search(query)
+        first.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        for _ in range(pages):
+            if not page.next_cursor:
+                break
+            query.cursor = page.next_cursor
+            page = await backend.search(query)
+        deep.append((time.perf_counter() - started) * 1000 / pages)
+    return statistics.median(first), statistics.quantiles(first, n=20)[-1], statistics.median(deep)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=10, help="Páginas seguidas via cursor")
+    parser.add_argument("--in-memory", action="store_true")
+    parser.add_argument("--keep", action="store_true", help="Mantém o schema ao final")
+    args = parser.parse_args()
+
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=365)
+    conversations, qualifications, messages = synthetic_dataset(args.rows, start, end)
+    pool = None
+
+    if args.in_memory:
+        backend = InMemoryConversationSearch()
+        for conv_id, external_id, platform, status in conversations:
+            backend.add_conversation(str(conv_id), platform, status, external_id)
+        for _, conv_id, lead_name, company, email, phone in qualifications:
+            backend.add_qualification(str(conv_id), lead_name=lead_name, company=company, email=email, phone=phone)
+        for msg_id, conv_id, content, message_type, created_at in messages:
+            backend.add_message(str(conv_id), content, created_at, message_type, str(msg_id))
+    else:
+        conn = await asyncpg.connect(args.dsn)
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA};")
+        await conn.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        await conn.execute(DDL)
+        loaded = time.perf_counter()
+        await conn.copy_records_to_table(
+            "conversations", records=conversations, schema_name=SCHEMA,
+            columns=["id", "external_id", "platform", "status"]
+        )
+        await conn.copy_records_to_table(
+            "qualifications", records=qualifications, schema_name=SCHEMA,
+            columns=["id", "conversation_id", "lead_name", "company", "email", "phone"]
+        )
+        await conn.copy_records_to_table(
+            "messages", records=messages, schema_name=SCHEMA,
+            columns=["id", "conversation_id", "content", "message_type", "created_at"]
+        )
+        await conn.execute(INDEXES)
+        await conn.execute(f"ANALYZE {SCHEMA}.messages; ANALYZE {SCHEMA}.qualifications;")
+        await conn.close()
+        print(f"Carga + índices: {time.perf_counter() - loaded:.1f}s")
+
+        pool = await asyncpg.create_pool(
+            args.dsn, server_settings={"search_path": f"{SCHEMA}, public"}
+        )
+        backend = PostgresConversationSearch(pool=pool)
+
+    print(f"{args.rows} mensagens ({'memória' if args.in_memory else 'postgres'})\n")
+    print(f"{'consulta':<24}{'p50 (ms)':>10}{'p95 (ms)':>10}{'página N (ms)':>15}")
+    try:
+        for name, query in QUERIES.items():
+            if name == "frase+plataforma+data":
+                query.date_from = end - timedelta(days=30)
+            p50, p95, deep = await measure(backend, query, args.repeats, args.pages)
+            print(f"{name:<24}{p50:>10.2f}{p95:>10.2f}{deep:>15.2f}")
+    finally:
+        if pool is not None:
+            if not args.keep:
+                await pool.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,32 @@
+-- MrDom SDR AgentOS + Bedrock - Migration 001
+-- Rollups pré-agregados de agent_interactions (hora/dia) para dashboards.
+-- Mantidos incrementalmente por mrdom.analytics.rollups.RollupPipeline.
+
+\c mrdom_sdr;
+
+CREATE TABLE IF NOT EXISTS agent_interaction_rollups (
+    bucket_size VARCHAR(10) NOT NULL, -- 'hour', 'day'
+    agent_name VARCHAR(100) NOT NULL,
+    bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    interactions BIGINT NOT NULL DEFAULT 0,
+    conversions BIGINT NOT NULL DEFAULT 0,
+    latency_count BIGINT NOT NULL DEFAULT 0,
+    latency_sum_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+    latency_min_ms DOUBLE PRECISION,
+    latency_max_ms DOUBLE PRECISION,
+    latency_sketch JSONB NOT NULL DEFAULT '{}', -- sketch logarítmico mesclável
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (bucket_size, agent_name, bucket_start)
+);
+
+-- Leitura dos dashboards: intervalo de tempo para todos os agentes
+CREATE INDEX IF NOT EXISTS idx_agent_interaction_rollups_bucket
+    ON agent_interaction_rollups(bucket_size, bucket_start);
+
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    name VARCHAR(100) PRIMARY KEY,
+    last_processed_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+GRANT ALL PRIVILEGES ON agent_interaction_rollups, rollup_watermarks TO postgres;
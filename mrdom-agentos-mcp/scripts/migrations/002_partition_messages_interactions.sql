@@ -0,0 +1,149 @@
+-- MrDom SDR AgentOS + Bedrock - Migration 002
+-- Converte messages e agent_interactions em tabelas particionadas por
+-- created_at (RANGE, mensal). Partições futuras, arquivamento e retenção são
+-- mantidos pelo job mrdom.maintenance.partitions; com PARTITION_PERIOD=week
+-- o job continua em partições semanais a partir do fim do último mês criado.
+--
+-- Observações:
+--   * A chave primária passa a ser (id, created_at): em tabelas particionadas
+--     toda constraint única precisa conter a chave de partição.
+--   * agent_interactions.message_id deixa de ter FK para messages(id) pelo
+--     mesmo motivo; a coluna é mantida.
+--   * Execute em janela de manutenção: os dados são copiados para as novas
+--     tabelas dentro de uma única transação.
+
+\c mrdom_sdr;
+
+-- Cria (se necessário) a partição de `parent` que contém `ts`.
+-- period: 'month' ou 'week'. Nome: <parent>_pYYYYMMDD (início da partição, UTC).
+CREATE OR REPLACE FUNCTION mrdom_ensure_partition(parent TEXT, period TEXT, ts TIMESTAMP WITH TIME ZONE)
+RETURNS TEXT AS $$
+DECLARE
+    start_ts TIMESTAMP WITH TIME ZONE := date_trunc(period, ts AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    end_ts TIMESTAMP WITH TIME ZONE := start_ts + ('1 ' || period)::INTERVAL;
+    partition_name TEXT := format('%s_p%s', parent, to_char(start_ts AT TIME ZONE 'UTC', 'YYYYMMDD'));
+BEGIN
+    IF period NOT IN ('month', 'week') THEN
+        RAISE EXCEPTION 'period inválido: %', period;
+    END IF;
+    IF to_regclass(partition_name) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            partition_name, parent, start_ts, end_ts
+        );
+    END IF;
+    RETURN partition_name;
+END;
+$$ language 'plpgsql';
+
+BEGIN;
+
+-- Views dependem das tabelas antigas; recriadas ao final
+DROP VIEW IF EXISTS conversation_summary;
+DROP VIEW IF EXISTS agent_performance;
+
+ALTER TABLE agent_interactions DROP CONSTRAINT IF EXISTS agent_interactions_message_id_fkey;
+
+ALTER TABLE messages RENAME TO messages_legacy;
+ALTER TABLE agent_interactions RENAME TO agent_interactions_legacy;
+ALTER INDEX messages_pkey RENAME TO messages_legacy_pkey;
+ALTER INDEX agent_interactions_pkey RENAME TO agent_interactions_legacy_pkey;
+
+CREATE TABLE messages (
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    conversation_id UUID REFERENCES conversations(id) ON DELETE CASCADE,
+    content TEXT NOT NULL,
+    message_type VARCHAR(50) NOT NULL, -- 'incoming', 'outgoing', 'system'
+    sender_info JSONB,
+    metadata JSONB,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE agent_interactions (
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    conversation_id UUID REFERENCES conversations(id) ON DELETE CASCADE,
+    message_id UUID,
+    agent_name VARCHAR(100) NOT NULL,
+    input_text TEXT NOT NULL,
+    output_text TEXT,
+    confidence_score DECIMAL(3,2),
+    processing_time_ms INTEGER,
+    metadata JSONB,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Partições desde o dado mais antigo até 3 meses à frente
+DO $$
+DECLARE
+    parent TEXT;
+    oldest TIMESTAMP WITH TIME ZONE;
+    cursor_ts TIMESTAMP WITH TIME ZONE;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['messages', 'agent_interactions'] LOOP
+        EXECUTE format('SELECT coalesce(min(created_at), NOW()) FROM %I', parent || '_legacy') INTO oldest;
+        cursor_ts := oldest;
+        WHILE cursor_ts < NOW() + INTERVAL '3 months' LOOP
+            PERFORM mrdom_ensure_partition(parent, 'month', cursor_ts);
+            cursor_ts := cursor_ts + INTERVAL '1 month';
+        END LOOP;
+        PERFORM mrdom_ensure_partition(parent, 'month', NOW() + INTERVAL '3 months');
+        -- Recebe linhas fora do intervalo (backfill antigo) em vez de falhar o INSERT
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I DEFAULT', parent || '_default', parent);
+    END LOOP;
+END $$;
+
+INSERT INTO messages (id, conversation_id, content, message_type, sender_info, metadata, created_at)
+SELECT id, conversation_id, content, message_type, sender_info, metadata, coalesce(created_at, NOW())
+FROM messages_legacy;
+
+INSERT INTO agent_interactions (
+    id, conversation_id, message_id, agent_name, input_text, output_text,
+    confidence_score, processing_time_ms, metadata, created_at
+)
+SELECT id, conversation_id, message_id, agent_name, input_text, output_text,
+       confidence_score, processing_time_ms, metadata, coalesce(created_at, NOW())
+FROM agent_interactions_legacy;
+
+DROP TABLE messages_legacy;
+DROP TABLE agent_interactions_legacy;
+
+-- Índices no pai (propagados para todas as partições, atuais e futuras)
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages(conversation_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_messages_type ON messages(message_type);
+CREATE INDEX IF NOT EXISTS idx_messages_created_at ON messages(created_at);
+
+CREATE INDEX IF NOT EXISTS idx_agent_interactions_conversation_id ON agent_interactions(conversation_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_agent_interactions_agent_name ON agent_interactions(agent_name, created_at);
+CREATE INDEX IF NOT EXISTS idx_agent_interactions_created_at ON agent_interactions(created_at);
+
+CREATE OR REPLACE VIEW conversation_summary AS
+SELECT
+    c.id,
+    c.external_id,
+    c.platform,
+    c.status,
+    COUNT(m.id) as message_count,
+    MAX(m.created_at) as last_message_at,
+    c.created_at,
+    c.updated_at
+FROM conversations c
+LEFT JOIN messages m ON c.id = m.conversation_id
+GROUP BY c.id, c.external_id, c.platform, c.status, c.created_at, c.updated_at;
+
+CREATE OR REPLACE VIEW agent_performance AS
+SELECT
+    agent_name,
+    COUNT(*) as total_interactions,
+    AVG(confidence_score) as avg_confidence,
+    AVG(processing_time_ms) as avg_processing_time,
+    COUNT(CASE WHEN confidence_score >= 0.8 THEN 1 END) as high_confidence_count,
+    DATE_TRUNC('day', created_at) as date
+FROM agent_interactions
+GROUP BY agent_name, DATE_TRUNC('day', created_at)
+ORDER BY date DESC, total_interactions DESC;
+
+GRANT ALL PRIVILEGES ON messages, agent_interactions TO postgres;
+
+COMMIT;
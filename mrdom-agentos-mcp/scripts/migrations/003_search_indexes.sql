@@ -0,0 +1,27 @@
+-- MrDom SDR AgentOS + Bedrock - Migration 003
+-- Índices para a busca de conversas (/api/v1/conversations/search):
+-- trigram (ILIKE '%termo%') e full-text em português sobre messages.content,
+-- e trigram nos campos de contato/empresa de qualifications.
+-- Em tabelas particionadas o índice é criado em cada partição (atuais e futuras).
+
+\c mrdom_sdr;
+
+CREATE EXTENSION IF NOT EXISTS "pg_trgm";
+
+CREATE INDEX IF NOT EXISTS idx_messages_content_trgm
+    ON messages USING GIN (content gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_messages_content_fts
+    ON messages USING GIN (to_tsvector('portuguese', content));
+
+-- Paginação keyset: ORDER BY created_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_messages_created_at_id
+    ON messages(created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_qualifications_company_trgm
+    ON qualifications USING GIN (company gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_qualifications_lead_name_trgm
+    ON qualifications USING GIN (lead_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_qualifications_email_trgm
+    ON qualifications USING GIN (email gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_qualifications_phone_trgm
+    ON qualifications USING GIN (phone gin_trgm_ops);
@@ -2,14 +2,23 @@
 Agentes MrDom SDR - AgentOS + Bedrock
 """
 
-from .bedrock_agent import BedrockAgent
-from .qualification_agent import QualificationAgent
-from .sales_agent import SalesAgent
-from .support_agent import SupportAgent
-
-__all__ = [
-    "BedrockAgent",
-    "QualificationAgent", 
-    "SalesAgent",
-    "SupportAgent"
-]
+from importlib import import_module
+from typing import Any
+
+# Import sob demanda: módulos sem dependência do SDK de modelos (cache de
+# respostas, geração) podem ser importados sem carregar o agno
+_EXPORTS = {
+    "AgentRegistry": ".registry",
+    "BedrockAgent": ".bedrock_agent",
+    "IntentClassifier": ".classifier",
+    "agent_registry": ".registry",
+    "classifier_store": ".classifier"
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(_EXPORTS[name], __name__), name)
@@ -2,143 +2,278 @@
 Agente base usando AWS Bedrock
 """
 
-import os
-import asyncio
-from typing import Dict, Any, Optional
+import time
+from typing import Any, Awaitable, Dict, List, Optional
+
+import structlog
 from agno.agent import Agent
-from agno.models.aws_bedrock import BedrockChat
-from agno.os import AgentOS
 
+from ..core.circuit_breaker import CircuitOpenError, circuit_breakers
 from ..core.config import settings
+from ..core.deadline import DeadlineExceededError, check_deadline, run_stage
+from ..core.metrics import DEGRADED_RESPONSES, ROUTING_CONFIDENCE, ROUTING_DECISIONS
+from ..core.scheduler import classify, model_scheduler
+from .classifier import ClassifierStore, IntentRouter, RoutingDecision, classifier_store
+from .generation import (
+    GenerationProfile,
+    estimate_output_tokens,
+    extract_output_tokens,
+    output_token_tracker,
+    resolve_generation_profile,
+)
+from .registry import AgentRegistry, AgentRuntime, RegistrySnapshot, agent_registry
+from .response_cache import response_cache
+
+logger = structlog.get_logger(__name__)
+
+
+def build_prompt(message: str, context: Optional[Dict] = None) -> str:
+    """Mensagem enviada ao modelo, com o contexto anexado."""
+    if not context:
+        return message
+    return f"{message}\nContexto: {context}"
 
 
 class BedrockAgent:
     """Agente base usando AWS Bedrock."""
     
-    def __init__(self):
+    def __init__(self, registry: Optional[AgentRegistry] = None, classifiers: Optional[ClassifierStore] = None):
         self.agent_os = None
-        self.agents = {}
+        self.registry = registry or agent_registry
+        self.classifiers = classifiers or classifier_store
         self._initialize_agents()
     
-    def _initialize_agents(self):
+    def _initialize_agents(self) -> None:
         """Inicializa agentes com Bedrock."""
         if not settings.aws_access_key_id or not settings.aws_secret_access_key:
             raise ValueError("AWS credentials não configuradas")
         
-        # Agente de Qualificação
-        self.agents["qualification"] = Agent(
-            id="mrdom-qualification",
-            model=BedrockChat(
-                id=settings.bedrock_model,
-                sistema_prompt="""Você é Mr. DOM, especialista em qualificação de leads BANT 
-                (Budget, Authority, Need, Timeline) da DOM360. 
-                
-                Sua missão é:
-                1. Fazer perguntas inteligentes para qualificar leads
-                2. Identificar necessidades e urgências
-                3. Determinar fit comercial
-                4. Coletar dados essenciais
-                
-                Seja consultivo, direto e cordial. Foque em valor, não em produto."""
-            )
-        )
-        
-        # Agente de Vendas
-        self.agents["sales"] = Agent(
-            id="mrdom-sales",
-            model=BedrockChat(
-                id=settings.bedrock_model,
-                sistema_prompt="""Você é Mr. DOM, SDR experiente da DOM360.
-                
-                Sua missão é:
-                1. Gerar interesse em demos
-                2. Agendar reuniões de vendas
-                3. Criar urgência para decisão
-                4. Confirmar dados para contato
-                
-                Use técnicas de vendas consultivas. Seja persuasivo mas respeitoso."""
-            )
-        )
-        
-        # Agente de Suporte
-        self.agents["support"] = Agent(
-            id="mrdom-support",
-            model=BedrockChat(
-                id=settings.bedrock_model,
-                sistema_prompt="""Você é Mr. DOM, especialista em sucesso do cliente da DOM360.
-                
-                Sua missão é:
-                1. Resolver problemas rapidamente
-                2. Explicar soluções claramente
-                3. Identificar oportunidades de melhoria
-                4. Escalar quando necessário
-                
-                Priorize satisfação do cliente e resolução eficiente."""
-            )
-        )
+        # Definições em config/agents.json (carregadas uma vez, compartilhadas)
+        self.registry.ensure_loaded()
+    
+    @property
+    def agents(self) -> Dict[str, Agent]:
+        return self.registry.current.agents
+    
+    @property
+    def profiles(self) -> Dict[str, GenerationProfile]:
+        return {
+            agent_type: runtime.profile
+            for agent_type, runtime in self.registry.current.runtimes.items()
+        }
     
-    async def process_message(self, agent_type: str, message: str, context: Optional[Dict] = None) -> Dict[str, Any]:
+    async def process_message(
+        self,
+        agent_type: str,
+        message: str,
+        context: Optional[Dict] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        source: Optional[str] = None
+    ) -> Dict[str, Any]:
         """Processa mensagem com agente específico."""
-        if agent_type not in self.agents:
+        return await self._process(
+            self.registry.current, agent_type, message, context, max_tokens, temperature, source
+        )
+    
+    async def _process(
+        self,
+        snapshot: RegistrySnapshot,
+        agent_type: str,
+        message: str,
+        context: Optional[Dict],
+        max_tokens: Optional[int],
+        temperature: Optional[float],
+        source: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Executa a chamada com o snapshot capturado no início da requisição.
+        A chamada ao modelo espera vaga no scheduler conforme a prioridade
+        (agente, origem = source ou context["source"], context["lead_status"]).
+        """
+        runtime = snapshot.runtimes.get(agent_type)
+        if runtime is None:
             return {
                 "success": False,
                 "error": f"Tipo de agente '{agent_type}' não encontrado"
             }
         
         try:
-            agent = self.agents[agent_type]
+            profile, stage = resolve_generation_profile(
+                agent_type,
+                context,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                base=runtime.profile
+            )
+            agent = runtime.get_agent(profile)
             
             # Prepara contexto
-            context_str = ""
-            if context:
-                context_str = f"\nContexto: {context}"
+            prompt = build_prompt(message, context)
+            
+            # Processa mensagem (orçamento = prazo restante - reserva para a resposta)
+            def call_model() -> Awaitable[Any]:
+                return run_stage(
+                    "model",
+                    agent.arun(prompt),
+                    cap=settings.agent_call_timeout_seconds,
+                    reserve=settings.deadline_response_reserve_seconds
+                )
+            
+            # Vaga no scheduler antes do circuito/modelo (espera conforme a prioridade)
+            priority = classify(agent_type, source, context)
+            async with model_scheduler.slot(priority) as queue_wait:
+                started = time.perf_counter()
+                if settings.circuit_breaker_enabled:
+                    breaker = circuit_breakers.get("bedrock", runtime.definition.model)
+                    try:
+                        response = await breaker.call(call_model)
+                    except CircuitOpenError as e:
+                        # Só o circuito aberto usa cache/resposta padrão; demais erros são falhas
+                        return self._degraded(runtime, message, context, "circuit_open", e)
+                else:
+                    response = await call_model()
             
-            # Processa mensagem
-            response = await agent.arun(f"{message}{context_str}")
+            if settings.response_cache_enabled:
+                response_cache.put(agent_type, message, response.content, context)
+            
+            output_tokens = extract_output_tokens(response)
+            if output_tokens is None:
+                output_tokens = estimate_output_tokens(response.content)
+            output_token_tracker.record(agent_type, stage, output_tokens, profile.max_tokens)
+            logger.info(
+                "agent.call",
+                agent_type=agent_type,
+                agent_version=runtime.definition.version,
+                model=runtime.definition.model,
+                stage=stage,
+                max_tokens=profile.max_tokens,
+                output_tokens=output_tokens,
+                priority=priority.tier,
+                queue_wait_ms=round(queue_wait * 1000, 1),
+                duration_ms=round((time.perf_counter() - started) * 1000, 1)
+            )
             
             return {
                 "success": True,
                 "agent_type": agent_type,
+                "agent_version": runtime.definition.version,
                 "response": response.content,
-                "context_used": context is not None
+                "context_used": context is not None,
+                "generation": {
+                    **profile.to_dict(),
+                    "stage": stage,
+                    "output_tokens": output_tokens
+                },
+                "scheduling": {
+                    **priority.to_dict(),
+                    "queue_wait_ms": round(queue_wait * 1000, 1)
+                }
             }
             
+        except DeadlineExceededError as e:
+            logger.warning("agent.deadline_exceeded", agent_type=agent_type, stage=e.stage, budget=e.budget)
+            raise
         except Exception as e:
+            logger.exception("agent.error", agent_type=agent_type)
             return {
                 "success": False,
                 "error": str(e),
                 "agent_type": agent_type
             }
     
-    def suggest_agent(self, message: str) -> str:
-        """Sugere melhor agente baseado na mensagem."""
-        message_lower = message.lower()
-        
-        # Palavras-chave para qualificação
-        if any(word in message_lower for word in ["preço", "custo", "orçamento", "investimento", "quanto"]):
-            return "qualification"
-        
-        # Palavras-chave para vendas
-        elif any(word in message_lower for word in ["demo", "reunião", "agendar", "apresentação", "meeting"]):
-            return "sales"
+    def _degraded(
+        self,
+        runtime: AgentRuntime,
+        message: str,
+        context: Optional[Dict],
+        reason: str,
+        error: Exception
+    ) -> Dict[str, Any]:
+        """Resposta sem o modelo: cache recente ou resposta padrão (handoff humano)."""
+        agent_type = runtime.definition.agent_type
+        response = response_cache.get(agent_type, message, context) if settings.response_cache_enabled else None
+        source = "cache"
+        if response is None:
+            response = runtime.definition.fallback_response or settings.agent_fallback_response
+            source = "canned"
         
-        # Palavras-chave para suporte
-        elif any(word in message_lower for word in ["problema", "bug", "erro", "suporte", "ajuda", "não funciona"]):
-            return "support"
+        if not response:
+            return {
+                "success": False,
+                "error": str(error),
+                "agent_type": agent_type,
+                "degraded": {"reason": reason, "source": None}
+            }
         
-        # Default para qualificação
-        else:
-            return "qualification"
+        DEGRADED_RESPONSES.labels(agent_type, reason, source).inc()
+        logger.warning(
+            "agent.degraded", agent_type=agent_type, reason=reason, source=source, error=str(error)
+        )
+        return {
+            "success": True,
+            "agent_type": agent_type,
+            "agent_version": runtime.definition.version,
+            "response": response,
+            "context_used": False,
+            "generation": None,
+            "degraded": {
+                "reason": reason,
+                "source": source,
+                # Resposta padrão = conversa deve seguir com um humano
+                "handoff": source == "canned",
+                "error": str(error)
+            }
+        }
+    
+    def router(self, snapshot: Optional[RegistrySnapshot] = None) -> IntentRouter:
+        """Classificador de intenção (se carregado) + palavras-chave do snapshot."""
+        return self.classifiers.router((snapshot or self.registry.current).router)
+    
+    def route(self, message: str) -> RoutingDecision:
+        return self.router().decide(message)
     
-    async def process_with_best_agent(self, message: str, context: Optional[Dict] = None) -> Dict[str, Any]:
-        """Processa mensagem usando melhor agente automaticamente."""
-        best_agent = self.suggest_agent(message)
-        result = await self.process_message(best_agent, message, context)
+    def route_batch(self, messages: List[str]) -> List[RoutingDecision]:
+        """Roteamento de várias mensagens em uma única passada do classificador."""
+        return self.router().decide_batch(messages)
+    
+    def suggest_agent(self, message: str) -> str:
+        """Sugere melhor agente baseado na mensagem (classificador ou keywords de config/agents.json)."""
+        return self.route(message).agent_type
+    
+    async def process_with_best_agent(
+        self,
+        message: str,
+        context: Optional[Dict] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        routing: Optional[RoutingDecision] = None,
+        source: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Processa mensagem usando melhor agente automaticamente. `routing`
+        permite reaproveitar uma decisão já calculada em lote.
+        """
+        snapshot = self.registry.current
+        if routing is None or routing.agent_type not in snapshot.runtimes:
+            # Classificador só roda se ainda houver prazo (a fila e o modelo vêm depois)
+            check_deadline("routing")
+            routing = self.router(snapshot).decide(message)
+        ROUTING_DECISIONS.labels(routing.agent_type, routing.method).inc()
+        if routing.confidence is not None:
+            ROUTING_CONFIDENCE.labels(routing.method).observe(routing.confidence)
+        
+        result = await self._process(
+            snapshot, routing.agent_type, message, context, max_tokens, temperature, source
+        )
         
         return {
             **result,
-            "selected_agent": best_agent,
-            "all_suggested_agents": [best_agent]
+            "selected_agent": routing.agent_type,
+            "all_suggested_agents": routing.suggestions(),
+            # Mesmo formato de agent_interactions.confidence_score (DECIMAL(3,2))
+            "confidence_score": None if routing.confidence is None else round(routing.confidence, 2),
+            "routing": routing.to_dict()
         }
     
     def get_available_agents(self) -> list:
@@ -0,0 +1,474 @@
+"""
+Classificador de intenção leve para seleção de agente
+
+Features: n-gramas de palavras (1-2) e de caracteres (3) com hashing em
+`n_features` posições (sem vocabulário), tf sublinear normalizado (L2).
+Modelo: regressão logística multinomial (pesos densos float32), treinada
+com AdaGrad em mini-lotes esparsos. As probabilidades são calibradas por
+temperature scaling em uma fração separada dos dados.
+
+A pontuação é só NumPy vetorizado (gather + soma por linha), em lote ou por
+mensagem, e custa dezenas de microssegundos. O modelo é salvo em .npz.
+"""
+
+import os
+import re
+import time
+import unicodedata
+import zipfile
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import structlog
+
+from ..core.config import settings
+from .registry import KeywordRouter
+
+logger = structlog.get_logger(__name__)
+
+FORMAT_VERSION = 1
+DEFAULT_FEATURE_BITS = 18
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas e sem acentos ("Preço" e "preco" viram a mesma feature)."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+@dataclass
+class SparseBatch:
+    """Matriz esparsa em formato CSR (uma linha por mensagem)."""
+
+    indices: np.ndarray
+    values: np.ndarray
+    indptr: np.ndarray
+
+    @property
+    def rows(self) -> int:
+        return len(self.indptr) - 1
+
+    def take(self, rows: np.ndarray) -> "SparseBatch":
+        """Submatriz com as linhas informadas (na ordem dada)."""
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        # Posição de cada elemento na matriz original
+        offsets = np.arange(indptr[-1]) - np.repeat(indptr[:-1], lengths) + np.repeat(starts, lengths)
+        return SparseBatch(self.indices[offsets], self.values[offsets], indptr)
+
+
+class HashingVectorizer:
+    """Texto -> vetor esparso de n-gramas com hashing (crc32, estável entre processos)."""
+
+    def __init__(self, feature_bits: int = DEFAULT_FEATURE_BITS):
+        self.feature_bits = feature_bits
+        self.n_features = 1 << feature_bits
+        self._mask = self.n_features - 1
+
+    def _counts(self, text: str) -> Dict[int, int]:
+        tokens = TOKEN_RE.findall(normalize_text(text))
+        grams = [f"w {token}" for token in tokens]
+        grams.extend(f"b {first} {second}" for first, second in zip(tokens, tokens[1:]))
+        for token in tokens:
+            padded = f" {token} "
+            grams.extend(f"c {padded[i:i + 3]}" for i in range(len(padded) - 2))
+
+        counts: Dict[int, int] = {}
+        mask = self._mask
+        for gram in grams:
+            index = zlib.crc32(gram.encode()) & mask
+            counts[index] = counts.get(index, 0) + 1
+        return counts
+
+    def transform(self, texts: Sequence[str]) -> SparseBatch:
+        indices: List[int] = []
+        counts: List[int] = []
+        indptr = [0]
+        for text in texts:
+            row = self._counts(text)
+            indices.extend(row.keys())
+            counts.extend(row.values())
+            indptr.append(len(indices))
+
+        indptr_array = np.asarray(indptr, dtype=np.int64)
+        values = np.log1p(np.asarray(counts, dtype=np.float32))
+        # Normalização L2 por linha
+        lengths = np.diff(indptr_array)
+        row_of = np.repeat(np.arange(len(texts)), lengths)
+        norms = np.sqrt(np.bincount(row_of, weights=values * values, minlength=len(texts)))
+        if values.size:
+            values /= norms[row_of].astype(np.float32)
+        return SparseBatch(np.asarray(indices, dtype=np.int64), values, indptr_array)
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class IntentClassifier:
+    """Regressão logística multinomial sobre features com hashing."""
+
+    def __init__(
+        self,
+        classes: Sequence[str],
+        weights: np.ndarray,
+        bias: np.ndarray,
+        temperature: float = 1.0,
+        feature_bits: int = DEFAULT_FEATURE_BITS,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        self.classes = list(classes)
+        self.weights = weights
+        self.bias = bias
+        self.temperature = temperature
+        self.vectorizer = HashingVectorizer(feature_bits)
+        self.metadata = metadata or {}
+
+    def logits(self, batch: SparseBatch) -> np.ndarray:
+        """X @ W + b sem materializar X: soma das linhas de W de cada mensagem."""
+        logits = np.tile(self.bias, (batch.rows, 1))
+        lengths = np.diff(batch.indptr)
+        nonempty = lengths > 0
+        if batch.indices.size:
+            contributions = self.weights[batch.indices] * batch.values[:, None]
+            # Linhas vazias não têm elementos: os inícios das não vazias delimitam cada soma
+            logits[nonempty] += np.add.reduceat(contributions, batch.indptr[:-1][nonempty], axis=0)
+        return logits
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """Probabilidades calibradas (linhas = mensagens, colunas = self.classes)."""
+        if not texts:
+            return np.zeros((0, len(self.classes)), dtype=np.float32)
+        return softmax(self.logits(self.vectorizer.transform(texts)) / self.temperature)
+
+    def rank(self, text: str) -> List[Tuple[str, float]]:
+        return self.rank_batch([text])[0]
+
+    def rank_batch(self, texts: Sequence[str]) -> List[List[Tuple[str, float]]]:
+        """Agentes ordenados por confiança, para cada mensagem."""
+        probabilities = self.predict_proba(texts)
+        order = np.argsort(-probabilities, axis=1)
+        return [
+            [(self.classes[column], float(row[column])) for column in columns]
+            for row, columns in zip(probabilities, order)
+        ]
+
+    @classmethod
+    def fit(
+        cls,
+        texts: Sequence[str],
+        labels: Sequence[str],
+        feature_bits: int = DEFAULT_FEATURE_BITS,
+        epochs: int = 8,
+        learning_rate: float = 0.5,
+        l2: float = 1e-6,
+        batch_size: int = 256,
+        validation_fraction: float = 0.1,
+        seed: int = 13
+    ) -> Tuple["IntentClassifier", Dict[str, Any]]:
+        """Treina e calibra; retorna o modelo e o relatório (métricas na validação)."""
+        if len(texts) != len(labels) or not texts:
+            raise ValueError("texts e labels devem ter o mesmo tamanho (não vazio)")
+        classes = sorted(set(labels))
+        if len(classes) < 2:
+            raise ValueError("São necessárias pelo menos duas classes para treinar")
+
+        started = time.perf_counter()
+        class_index = {name: index for index, name in enumerate(classes)}
+        y = np.asarray([class_index[label] for label in labels], dtype=np.int64)
+        vectorizer = HashingVectorizer(feature_bits)
+        features = vectorizer.transform(texts)
+
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(y))
+        n_validation = int(len(y) * validation_fraction) if len(y) >= 20 else 0
+        validation_rows, train_rows = order[:n_validation], order[n_validation:]
+        train = features.take(train_rows)
+        y_train = y[train_rows]
+
+        n_classes = len(classes)
+        weights = np.zeros((vectorizer.n_features, n_classes), dtype=np.float32)
+        bias = np.zeros(n_classes, dtype=np.float32)
+        weight_accumulator = np.full_like(weights, 1e-8)
+        bias_accumulator = np.full_like(bias, 1e-8)
+        model = cls(classes, weights, bias, feature_bits=feature_bits)
+
+        for _ in range(epochs):
+            for start in range(0, train.rows, batch_size):
+                batch_rows = np.arange(start, min(start + batch_size, train.rows))
+                batch = train.take(batch_rows)
+                gradient_rows = softmax(model.logits(batch))
+                gradient_rows[np.arange(len(batch_rows)), y_train[batch_rows]] -= 1.0
+                gradient_rows /= len(batch_rows)
+
+                # Gradiente só nas linhas de W tocadas pelo lote (AdaGrad esparso)
+                touched, inverse = np.unique(batch.indices, return_inverse=True)
+                row_of = np.repeat(np.arange(batch.rows), np.diff(batch.indptr))
+                gradient = np.zeros((len(touched), n_classes), dtype=np.float32)
+                np.add.at(gradient, inverse, batch.values[:, None] * gradient_rows[row_of])
+                gradient += l2 * weights[touched]
+                weight_accumulator[touched] += gradient * gradient
+                weights[touched] -= learning_rate * gradient / np.sqrt(weight_accumulator[touched])
+
+                bias_gradient = gradient_rows.sum(axis=0)
+                bias_accumulator += bias_gradient * bias_gradient
+                bias -= learning_rate * bias_gradient / np.sqrt(bias_accumulator)
+            # Nova ordem a cada época
+            shuffle = rng.permutation(train.rows)
+            train, y_train = train.take(shuffle), y_train[shuffle]
+
+        report: Dict[str, Any] = {
+            "samples": len(y),
+            "train_samples": int(train.rows),
+            "validation_samples": int(n_validation),
+            "classes": {name: int((y == index).sum()) for name, index in class_index.items()},
+            "feature_bits": feature_bits,
+            "epochs": epochs
+        }
+        if n_validation:
+            validation_logits = model.logits(features.take(validation_rows))
+            model.temperature = calibrate_temperature(validation_logits, y[validation_rows])
+            probabilities = softmax(validation_logits / model.temperature)
+            report.update(evaluate(probabilities, y[validation_rows]))
+        report["temperature"] = round(model.temperature, 4)
+        report["training_seconds"] = round(time.perf_counter() - started, 2)
+        model.metadata = {"trained_at": time.time(), **report}
+        return model, report
+
+    def save(self, path: Path) -> None:
+        """Grava em .npz (escrita atômica: o arquivo antigo segue válido até o rename)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(path.name + ".tmp")
+        with open(temporary, "wb") as output:
+            np.savez_compressed(
+                output,
+                format_version=np.int64(FORMAT_VERSION),
+                classes=np.asarray(self.classes),
+                weights=self.weights,
+                bias=self.bias,
+                temperature=np.float64(self.temperature),
+                feature_bits=np.int64(self.vectorizer.feature_bits),
+                trained_at=np.float64(self.metadata.get("trained_at", time.time())),
+                samples=np.int64(self.metadata.get("samples", 0)),
+                accuracy=np.float64(self.metadata.get("accuracy", np.nan))
+            )
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "IntentClassifier":
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["format_version"]) != FORMAT_VERSION:
+                raise ValueError(f"Formato de modelo não suportado em {path}")
+            accuracy = float(data["accuracy"])
+            return cls(
+                classes=[str(name) for name in data["classes"]],
+                weights=data["weights"].astype(np.float32, copy=False),
+                bias=data["bias"].astype(np.float32, copy=False),
+                temperature=float(data["temperature"]),
+                feature_bits=int(data["feature_bits"]),
+                metadata={
+                    "trained_at": float(data["trained_at"]),
+                    "samples": int(data["samples"]),
+                    "accuracy": None if np.isnan(accuracy) else accuracy
+                }
+            )
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "classes": self.classes,
+            "temperature": round(self.temperature, 4),
+            "feature_bits": self.vectorizer.feature_bits,
+            **self.metadata
+        }
+
+
+def calibrate_temperature(logits: np.ndarray, y: np.ndarray) -> float:
+    """Temperatura que minimiza a log-loss na validação (busca em grade)."""
+    best_temperature, best_loss = 1.0, np.inf
+    rows = np.arange(len(y))
+    for temperature in np.geomspace(0.1, 10.0, 60):
+        scaled = logits / temperature
+        scaled = scaled - scaled.max(axis=1, keepdims=True)
+        log_probabilities = scaled - np.log(np.exp(scaled).sum(axis=1, keepdims=True))
+        loss = -log_probabilities[rows, y].mean()
+        if loss < best_loss:
+            best_temperature, best_loss = float(temperature), float(loss)
+    return best_temperature
+
+
+def evaluate(probabilities: np.ndarray, y: np.ndarray, bins: int = 10) -> Dict[str, Any]:
+    """Acurácia, log-loss e erro de calibração esperado (ECE)."""
+    rows = np.arange(len(y))
+    predicted = probabilities.argmax(axis=1)
+    confidence = probabilities[rows, predicted]
+    correct = predicted == y
+    bin_of = np.minimum((confidence * bins).astype(np.int64), bins - 1)
+    ece = 0.0
+    for index in range(bins):
+        in_bin = bin_of == index
+        if in_bin.any():
+            ece += in_bin.mean() * abs(correct[in_bin].mean() - confidence[in_bin].mean())
+    return {
+        "accuracy": round(float(correct.mean()), 4),
+        "log_loss": round(float(-np.log(np.maximum(probabilities[rows, y], 1e-12)).mean()), 4),
+        "expected_calibration_error": round(float(ece), 4)
+    }
+
+
+@dataclass(frozen=True)
+class RoutingDecision:
+    """Agente escolhido para uma mensagem e de onde veio a escolha."""
+
+    agent_type: str
+    # keywords | default | classifier
+    method: str
+    # Probabilidade calibrada do agente escolhido (None sem classificador)
+    confidence: Optional[float] = None
+    ranked: Tuple[Tuple[str, float], ...] = field(default_factory=tuple)
+
+    def suggestions(self) -> List[str]:
+        """Agente escolhido seguido das alternativas com confiança relevante."""
+        suggested = [self.agent_type]
+        for agent_type, probability in self.ranked:
+            if len(suggested) >= settings.intent_classifier_max_suggestions:
+                break
+            if agent_type not in suggested and probability >= settings.intent_classifier_suggestion_min_confidence:
+                suggested.append(agent_type)
+        return suggested
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "agent_type": self.agent_type,
+            "method": self.method,
+            "confidence": None if self.confidence is None else round(self.confidence, 4),
+            "scores": {agent_type: round(probability, 4) for agent_type, probability in self.ranked}
+        }
+
+
+class IntentRouter:
+    """
+    Combina classificador e palavras-chave: o classificador decide quando
+    está confiante; abaixo de `min_confidence` uma palavra-chave prevalece;
+    sem palavra-chave, fica o agente mais provável do classificador (em vez
+    do agente padrão). Sem classificador, é o roteamento por palavras-chave.
+    """
+
+    def __init__(
+        self,
+        keywords: KeywordRouter,
+        classifier: Optional[IntentClassifier] = None,
+        min_confidence: Optional[float] = None
+    ):
+        self.keywords = keywords
+        self.classifier = classifier
+        self.min_confidence = (
+            settings.intent_classifier_min_confidence if min_confidence is None else min_confidence
+        )
+        agents = {agent_type for agent_type, _ in keywords.rules}
+        # Classes do modelo que não existem mais na configuração são ignoradas
+        self._columns = (
+            [index for index, name in enumerate(classifier.classes) if name in agents]
+            if classifier is not None else []
+        )
+
+    def keyword_decision(self, message: str) -> RoutingDecision:
+        agent_type = self.keywords.match(message)
+        if agent_type is None:
+            return RoutingDecision(self.keywords.default_agent, "default")
+        return RoutingDecision(agent_type, "keywords")
+
+    def suggest(self, message: str) -> str:
+        return self.decide(message).agent_type
+
+    def decide(self, message: str) -> RoutingDecision:
+        return self.decide_batch([message])[0]
+
+    def decide_batch(self, messages: Sequence[str]) -> List[RoutingDecision]:
+        """Uma única passada do classificador para todas as mensagens."""
+        if len(self._columns) < 2 or not messages:
+            return [self.keyword_decision(message) for message in messages]
+
+        probabilities = self.classifier.predict_proba(messages)[:, self._columns]
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        names = [self.classifier.classes[index] for index in self._columns]
+        order = np.argsort(-probabilities, axis=1)
+
+        decisions = []
+        for message, row, columns in zip(messages, probabilities, order):
+            ranked = tuple((names[column], float(row[column])) for column in columns)
+            best, confidence = ranked[0]
+            if confidence < self.min_confidence:
+                keyword_agent = self.keywords.match(message)
+                if keyword_agent is not None:
+                    scores = dict(ranked)
+                    decisions.append(RoutingDecision(keyword_agent, "keywords", scores.get(keyword_agent), ranked))
+                    continue
+            decisions.append(RoutingDecision(best, "classifier", confidence, ranked))
+        return decisions
+
+
+class ClassifierStore:
+    """Classificador carregado no processo (troca atômica no reload)."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or settings.intent_classifier_path)
+        self.current: Optional[IntentClassifier] = None
+        self.loaded_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._router: Optional[IntentRouter] = None
+
+    def load(self) -> bool:
+        """Carrega o modelo do disco; sem arquivo (ou inválido) o roteamento usa palavras-chave."""
+        if not settings.intent_classifier_enabled:
+            self.current = None
+            self.last_error = "Classificador desabilitado (INTENT_CLASSIFIER_ENABLED=false)"
+            return False
+        if not self.path.exists():
+            self.last_error = f"Modelo não encontrado em {self.path}"
+            logger.info("intent_classifier.missing", path=str(self.path), fallback="keywords")
+            return False
+        try:
+            classifier = IntentClassifier.load(self.path)
+        except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            # Arquivo truncado/corrompido (ex.: cópia parcial) mantém o modelo atual
+            self.last_error = str(e)
+            logger.error("intent_classifier.load_failed", path=str(self.path), error=str(e))
+            return False
+
+        self.current = classifier
+        self.loaded_at = time.time()
+        self.last_error = None
+        logger.info("intent_classifier.loaded", path=str(self.path), classes=len(classifier.classes))
+        return True
+
+    def router(self, keywords: KeywordRouter) -> IntentRouter:
+        """Roteador para o snapshot de agentes atual (recriado se agentes ou modelo mudarem)."""
+        router = self._router
+        if router is None or router.keywords is not keywords or router.classifier is not self.current:
+            router = self._router = IntentRouter(keywords, self.current)
+        return router
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.intent_classifier_enabled,
+            "loaded": self.current is not None,
+            "path": str(self.path),
+            "loaded_at": self.loaded_at,
+            "min_confidence": settings.intent_classifier_min_confidence,
+            "last_error": self.last_error,
+            "model": self.current.describe() if self.current is not None else None
+        }
+
+
+# Instância global compartilhada pelas rotas (carregada no startup)
+classifier_store = ClassifierStore()
@@ -0,0 +1,68 @@
+"""
+Dados de treino do classificador de intenção
+
+Fonte principal: agent_interactions (input_text -> agent_name). Esses
+rótulos refletem o roteamento da época em que a interação foi gravada;
+correções (revisão humana) podem ser gravadas em metadata.expected_agent e
+têm prioridade. Corpora JSONL no formato do replay (com expected_agent)
+também podem ser usados, sozinhos ou junto com o banco.
+"""
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..core.database import get_pool
+
+TRAINING_QUERY = """
+SELECT input_text, coalesce(metadata->>'expected_agent', agent_name) AS label
+FROM agent_interactions
+WHERE input_text IS NOT NULL
+  AND length(input_text) >= $1
+  AND ($2::timestamptz IS NULL OR created_at >= $2)
+ORDER BY created_at DESC
+LIMIT $3
+"""
+
+
+async def fetch_interactions(
+    since_days: Optional[int] = None,
+    limit: int = 200000,
+    min_length: int = 2
+) -> List[Tuple[str, str]]:
+    """Pares (mensagem, agente) mais recentes de agent_interactions."""
+    since = datetime.now(timezone.utc) - timedelta(days=since_days) if since_days else None
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(TRAINING_QUERY, min_length, since, limit)
+    return [(row["input_text"], row["label"]) for row in rows if row["label"]]
+
+
+def read_corpus(path: Path) -> List[Tuple[str, str]]:
+    """Mensagens rotuladas (expected_agent) de um corpus JSONL do replay."""
+    from ..evaluation.replay import iter_replay_messages
+
+    with open(path, encoding="utf-8") as lines:
+        return [
+            (message.content, message.expected_agent)
+            for message in iter_replay_messages(lines)
+            if message.expected_agent
+        ]
+
+
+def select_examples(
+    examples: Iterable[Tuple[str, str]],
+    agents: Iterable[str]
+) -> Tuple[List[str], List[str], Dict[str, int]]:
+    """Mantém só agentes da configuração atual; retorna textos, rótulos e descartes por rótulo."""
+    known = set(agents)
+    texts: List[str] = []
+    labels: List[str] = []
+    dropped: Dict[str, int] = {}
+    for text, label in examples:
+        if label in known:
+            texts.append(text)
+            labels.append(label)
+        else:
+            dropped[label] = dropped.get(label, 0) + 1
+    return texts, labels, dropped
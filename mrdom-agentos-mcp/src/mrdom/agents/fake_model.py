@@ -0,0 +1,56 @@
+"""
+Modelo falso para replay e benchmarks (sem rede, sem credenciais AWS)
+"""
+
+import asyncio
+import hashlib
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+
+@dataclass
+class FakeResponse:
+    """Resposta no formato lido pelo BedrockAgent (content + metrics)."""
+
+    content: str
+    metrics: Dict[str, Any] = field(default_factory=dict)
+
+
+class FakeModel:
+    """
+    Gera respostas determinísticas por prompt com latência sintética:
+    tempo até o primeiro token + tokens de saída / vazão, com jitter
+    log-normal. O mesmo prompt sempre produz o mesmo tamanho de resposta.
+    """
+
+    def __init__(
+        self,
+        first_token_ms: float = 350.0,
+        tokens_per_second: float = 80.0,
+        jitter: float = 0.25,
+        min_tokens: int = 24,
+        time_scale: float = 1.0
+    ):
+        self.first_token_ms = first_token_ms
+        self.tokens_per_second = tokens_per_second
+        self.jitter = jitter
+        self.min_tokens = min_tokens
+        self.time_scale = time_scale
+
+    def _rng(self, prompt: str) -> random.Random:
+        seed = int.from_bytes(hashlib.blake2b(prompt.encode(), digest_size=8).digest(), "big")
+        return random.Random(seed)
+
+    def latency_seconds(self, output_tokens: int, rng: random.Random) -> float:
+        base = self.first_token_ms / 1000 + output_tokens / self.tokens_per_second
+        return base * rng.lognormvariate(0.0, self.jitter) * self.time_scale
+
+    async def arun(self, prompt: str, max_tokens: int = 400, agent_type: str = "fake") -> FakeResponse:
+        rng = self._rng(prompt)
+        output_tokens = rng.randint(min(self.min_tokens, max_tokens), max_tokens)
+        await asyncio.sleep(self.latency_seconds(output_tokens, rng))
+        return FakeResponse(
+            content=f"[{agent_type}] resposta sintética ({output_tokens} tokens)",
+            metrics={"output_tokens": output_tokens}
+        )
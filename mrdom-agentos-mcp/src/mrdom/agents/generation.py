@@ -0,0 +1,195 @@
+"""
+Perfis de geração (max_tokens/temperature) por agente
+"""
+
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from ..core.config import settings
+from ..core.metrics import (
+    AGENT_OUTPUT_TOKENS,
+    AGENT_OUTPUT_TOKEN_LIMIT_RATIO,
+    AGENT_OUTPUT_TRUNCATED,
+)
+
+# Fator aplicado ao max_tokens do perfil conforme o estágio da conversa:
+# aberturas pedem respostas curtas, a descoberta usa o perfil completo.
+STAGE_TOKEN_FACTORS = {
+    "opening": 0.5,
+    "discovery": 1.0,
+    "closing": 0.75
+}
+
+# Granularidade de max_tokens e temperature efetivos (limita as variantes de
+# modelo em cache, inclusive com overrides arbitrários por requisição)
+TOKEN_STEP = 32
+TEMPERATURE_STEP = 0.05
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    """Parâmetros de geração aplicados a uma chamada ao modelo."""
+
+    max_tokens: int
+    temperature: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"max_tokens": self.max_tokens, "temperature": self.temperature}
+
+
+def clamp_max_tokens(value: int) -> int:
+    """Limita max_tokens ao intervalo seguro configurado."""
+    return max(settings.agent_min_tokens, min(int(value), settings.agent_max_tokens))
+
+
+def clamp_temperature(value: float) -> float:
+    """Limita temperature ao intervalo seguro configurado."""
+    return max(0.0, min(float(value), settings.agent_max_temperature))
+
+
+def quantize_max_tokens(value: float) -> int:
+    """Arredonda max_tokens para cima no múltiplo de TOKEN_STEP e limita ao intervalo seguro."""
+    return clamp_max_tokens(-(-int(value) // TOKEN_STEP) * TOKEN_STEP)
+
+
+def quantize_temperature(value: float) -> float:
+    """Arredonda temperature ao passo de TEMPERATURE_STEP e limita ao intervalo seguro."""
+    return clamp_temperature(round(round(float(value) / TEMPERATURE_STEP) * TEMPERATURE_STEP, 2))
+
+
+def get_agent_profile(agent_type: str, defaults: Optional[Dict[str, Any]] = None) -> GenerationProfile:
+    """
+    Retorna o perfil padrão do agente.
+
+    Precedência: override em AGENT_GENERATION_PROFILES, parâmetros da definição
+    do agente (config/agents.json) e, por fim, AGENT_MAX_TOKENS/AGENT_TEMPERATURE.
+    """
+    profile = {**(defaults or {}), **settings.agent_generation_profiles.get(agent_type, {})}
+    return GenerationProfile(
+        max_tokens=clamp_max_tokens(profile.get("max_tokens", settings.agent_max_tokens)),
+        temperature=clamp_temperature(profile.get("temperature", settings.agent_temperature))
+    )
+
+
+def detect_conversation_stage(context: Optional[Dict] = None) -> str:
+    """Identifica o estágio da conversa a partir do contexto."""
+    if not context:
+        # Sem contexto não há como saber se é uma abertura: perfil completo
+        return "discovery"
+
+    stage = context.get("conversation_stage")
+    if stage in STAGE_TOKEN_FACTORS:
+        return stage
+
+    message_count = context.get("message_count")
+    if isinstance(message_count, int):
+        if message_count <= 1:
+            return "opening"
+        if message_count >= settings.agent_closing_stage_messages:
+            return "closing"
+
+    return "discovery"
+
+
+def resolve_generation_profile(
+    agent_type: str,
+    context: Optional[Dict] = None,
+    max_tokens: Optional[int] = None,
+    temperature: Optional[float] = None,
+    base: Optional[GenerationProfile] = None
+) -> Tuple[GenerationProfile, str]:
+    """
+    Resolve o perfil efetivo de uma chamada.
+
+    Overrides da requisição têm precedência; são quantizados (TOKEN_STEP,
+    TEMPERATURE_STEP) e limitados aos intervalos seguros. Sem override, o
+    max_tokens do perfil do agente é ajustado ao estágio da conversa.
+    """
+    base = base or get_agent_profile(agent_type)
+    stage = detect_conversation_stage(context)
+
+    if max_tokens is not None:
+        resolved_tokens = quantize_max_tokens(max_tokens)
+    else:
+        adaptive = quantize_max_tokens(base.max_tokens * STAGE_TOKEN_FACTORS[stage])
+        resolved_tokens = min(adaptive, base.max_tokens)
+
+    resolved_temperature = (
+        quantize_temperature(temperature) if temperature is not None else base.temperature
+    )
+
+    return GenerationProfile(resolved_tokens, resolved_temperature), stage
+
+
+def extract_output_tokens(response: Any) -> Optional[int]:
+    """Extrai tokens de saída das métricas da resposta do agno, se houver."""
+    metrics = getattr(response, "metrics", None)
+    if metrics is None:
+        return None
+
+    if isinstance(metrics, dict):
+        value = metrics.get("output_tokens")
+        if isinstance(value, list):
+            value = sum(value)
+    else:
+        value = getattr(metrics, "output_tokens", None)
+
+    return int(value) if value else None
+
+
+def estimate_output_tokens(text: Optional[str]) -> int:
+    """Estimativa grosseira (~4 caracteres por token) quando não há métricas."""
+    return max(1, len(text or "") // 4)
+
+
+class OutputTokenTracker:
+    """Acumula tokens de saída x limite por agente para calibrar perfis."""
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, agent_type: str, stage: str, output_tokens: int, max_tokens: int) -> None:
+        ratio = output_tokens / max_tokens if max_tokens else 0.0
+        truncated = output_tokens >= max_tokens
+
+        AGENT_OUTPUT_TOKENS.labels(agent_type, stage).observe(output_tokens)
+        AGENT_OUTPUT_TOKEN_LIMIT_RATIO.labels(agent_type, stage).observe(ratio)
+        if truncated:
+            AGENT_OUTPUT_TRUNCATED.labels(agent_type, stage).inc()
+
+        with self._lock:
+            stats = self._stats.setdefault(agent_type, {
+                "calls": 0,
+                "output_tokens": 0,
+                "limit_tokens": 0,
+                "max_output_tokens": 0,
+                "truncated": 0
+            })
+            stats["calls"] += 1
+            stats["output_tokens"] += output_tokens
+            stats["limit_tokens"] += max_tokens
+            stats["max_output_tokens"] = max(stats["max_output_tokens"], output_tokens)
+            stats["truncated"] += int(truncated)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Resumo por agente: média de tokens, uso médio do limite e truncamentos."""
+        with self._lock:
+            return {
+                agent_type: {
+                    "calls": stats["calls"],
+                    "avg_output_tokens": stats["output_tokens"] / stats["calls"],
+                    "max_output_tokens": stats["max_output_tokens"],
+                    "avg_limit_usage": (
+                        stats["output_tokens"] / stats["limit_tokens"]
+                        if stats["limit_tokens"] else 0.0
+                    ),
+                    "truncated": stats["truncated"]
+                }
+                for agent_type, stats in self._stats.items()
+            }
+
+
+# Instância global compartilhada entre as rotas
+output_token_tracker = OutputTokenTracker()
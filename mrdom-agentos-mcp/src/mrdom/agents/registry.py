@@ -0,0 +1,309 @@
+"""
+Registro de agentes a partir de config/agents.json com hot reload
+
+Cada reload monta um novo snapshot imutável fora do caminho das requisições
+e o publica com uma única atribuição. Requisições em andamento continuam
+com o snapshot que capturaram; agentes cuja definição não mudou são
+reaproveitados (mantendo variantes de modelo já aquecidas).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+from agno.agent import Agent
+from agno.models.aws_bedrock import BedrockChat
+
+from ..core.config import settings
+from .generation import GenerationProfile, get_agent_profile
+
+logger = structlog.get_logger(__name__)
+
+
+class AgentConfigError(ValueError):
+    """Arquivo de definições de agentes inválido."""
+
+
+@dataclass(frozen=True)
+class AgentDefinition:
+    """Definição versionada de um agente."""
+
+    agent_type: str
+    id: str
+    description: str
+    prompt: str
+    model: str
+    keywords: Tuple[str, ...]
+    generation: Dict[str, Any]
+    version: int = 1
+    # Resposta em modo degradado (fora da fingerprint: mudar não recria o agente)
+    fallback_response: Optional[str] = None
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash do conteúdo; só agentes com fingerprint diferente são recriados."""
+        payload = json.dumps({
+            "id": self.id,
+            "prompt": self.prompt,
+            "model": self.model,
+            "generation": self.generation,
+            "version": self.version
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @classmethod
+    def from_dict(cls, agent_type: str, data: Dict[str, Any]) -> "AgentDefinition":
+        if not data.get("prompt"):
+            raise AgentConfigError(f"Agente '{agent_type}' sem 'prompt'")
+        generation = data.get("generation") or {}
+        if not isinstance(generation, dict):
+            raise AgentConfigError(f"Agente '{agent_type}': 'generation' deve ser um objeto")
+        return cls(
+            agent_type=agent_type,
+            id=data.get("id") or f"mrdom-{agent_type}",
+            description=data.get("description") or "Agente especializado",
+            prompt=data["prompt"],
+            model=data.get("model") or settings.bedrock_model,
+            keywords=tuple(word.lower() for word in data.get("keywords", [])),
+            generation=generation,
+            version=int(data.get("version", 1)),
+            fallback_response=data.get("fallback_response")
+        )
+
+
+class AgentRuntime:
+    """Agente instanciado para uma definição, com variantes por perfil de geração."""
+
+    def __init__(self, definition: AgentDefinition, previous: Optional["AgentRuntime"] = None):
+        self.definition = definition
+        if previous is not None:
+            # Mesma fingerprint: reaproveita agentes já instanciados
+            self.profile = previous.profile
+            self._variants = previous._variants
+            self.agent = previous.agent
+            return
+
+        self.profile = get_agent_profile(definition.agent_type, definition.generation)
+        # (max_tokens, temperature) -> Agent, em ordem de uso (LRU)
+        self._variants: "OrderedDict[Tuple[int, float], Agent]" = OrderedDict()
+        self.agent = self.get_agent(self.profile)
+
+    def get_agent(self, profile: GenerationProfile) -> Agent:
+        """Retorna (criando se necessário) o agente configurado com o perfil."""
+        key = (profile.max_tokens, profile.temperature)
+        agent = self._variants.get(key)
+        if agent is not None:
+            self._variants.move_to_end(key)
+        else:
+            agent = Agent(
+                id=self.definition.id,
+                model=BedrockChat(
+                    id=self.definition.model,
+                    max_tokens=profile.max_tokens,
+                    temperature=profile.temperature,
+                    sistema_prompt=self.definition.prompt
+                )
+            )
+            self._variants[key] = agent
+            # Variantes pouco usadas saem; o agente do perfil base fica em self.agent
+            while len(self._variants) > settings.agent_model_variants_max:
+                self._variants.popitem(last=False)
+        return agent
+
+
+@dataclass(frozen=True)
+class RegistrySnapshot:
+    """Conjunto imutável de agentes publicado a cada (re)load."""
+
+    config_version: str
+    revision: int
+    default_agent: str
+    runtimes: Dict[str, AgentRuntime]
+    router: "KeywordRouter"
+    loaded_at: float = field(default_factory=time.time)
+
+    @property
+    def agents(self) -> Dict[str, Agent]:
+        return {agent_type: runtime.agent for agent_type, runtime in self.runtimes.items()}
+
+    def suggest(self, message: str) -> str:
+        """Roteamento por palavras-chave, na ordem das definições no arquivo."""
+        return self.router.suggest(message)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "config_version": self.config_version,
+            "revision": self.revision,
+            "default_agent": self.default_agent,
+            "loaded_at": self.loaded_at,
+            "agents": {
+                agent_type: {
+                    "id": runtime.definition.id,
+                    "version": runtime.definition.version,
+                    "model": runtime.definition.model,
+                    "description": runtime.definition.description,
+                    "keywords": list(runtime.definition.keywords),
+                    "generation": runtime.profile.to_dict(),
+                    "fallback_response": runtime.definition.fallback_response
+                }
+                for agent_type, runtime in self.runtimes.items()
+            }
+        }
+
+
+class KeywordRouter:
+    """
+    Roteamento por palavras-chave desacoplado dos agentes instanciados
+    (serializável; usado pelos workers do replay).
+    """
+
+    def __init__(self, definitions: List[AgentDefinition], default_agent: str):
+        self.rules = [(definition.agent_type, definition.keywords) for definition in definitions]
+        self.default_agent = default_agent
+
+    def match(self, message: str) -> Optional[str]:
+        """Primeiro agente com palavra-chave na mensagem (None se nenhum)."""
+        message_lower = message.lower()
+        for agent_type, keywords in self.rules:
+            if any(word in message_lower for word in keywords):
+                return agent_type
+        return None
+
+    def suggest(self, message: str) -> str:
+        return self.match(message) or self.default_agent
+
+
+def parse_config(raw: Dict[str, Any]) -> Tuple[str, str, List[AgentDefinition]]:
+    """Valida o conteúdo do arquivo e retorna (versão, agente padrão, definições)."""
+    agents = raw.get("agents")
+    if not isinstance(agents, dict) or not agents:
+        raise AgentConfigError("'agents' deve ser um objeto não vazio")
+
+    definitions = [AgentDefinition.from_dict(agent_type, data) for agent_type, data in agents.items()]
+    default_agent = raw.get("default_agent") or definitions[0].agent_type
+    if default_agent not in agents:
+        raise AgentConfigError(f"default_agent '{default_agent}' não está definido")
+
+    return str(raw.get("version", "0")), default_agent, definitions
+
+
+def read_config(path: Path) -> Tuple[str, str, List[AgentDefinition]]:
+    """Lê e valida o arquivo de definições (sem instanciar agentes)."""
+    with open(path, encoding="utf-8") as config_file:
+        try:
+            raw = json.load(config_file)
+        except json.JSONDecodeError as e:
+            raise AgentConfigError(f"JSON inválido em {path}: {e}") from e
+    return parse_config(raw)
+
+
+class AgentRegistry:
+    """Carrega, observa e publica snapshots de agentes."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or settings.agents_config_path)
+        self._snapshot: Optional[RegistrySnapshot] = None
+        self._file_state: Optional[Tuple[int, int]] = None
+        self._reload_lock = asyncio.Lock()
+        self.last_error: Optional[str] = None
+
+    @property
+    def current(self) -> RegistrySnapshot:
+        """Snapshot vigente; capture-o uma vez por requisição."""
+        self.ensure_loaded()
+        return self._snapshot
+
+    def ensure_loaded(self) -> None:
+        if self._snapshot is None:
+            self.load()
+
+    def _stat(self) -> Tuple[int, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _build(self) -> Tuple[RegistrySnapshot, List[str]]:
+        """Lê o arquivo e monta o próximo snapshot (sem publicá-lo)."""
+        # Registrado antes do parse: um arquivo inválido só é relido quando mudar de novo
+        self._file_state = self._stat()
+        config_version, default_agent, definitions = read_config(self.path)
+        previous = self._snapshot.runtimes if self._snapshot else {}
+
+        runtimes: Dict[str, AgentRuntime] = {}
+        changed = []
+        for definition in definitions:
+            runtime = previous.get(definition.agent_type)
+            if runtime is None or runtime.definition.fingerprint != definition.fingerprint:
+                runtime = AgentRuntime(definition)
+                changed.append(definition.agent_type)
+            elif runtime.definition != definition:
+                # Só metadados de roteamento/descrição mudaram
+                runtime = AgentRuntime(definition, previous=runtime)
+            runtimes[definition.agent_type] = runtime
+        changed.extend(agent_type for agent_type in previous if agent_type not in runtimes)
+
+        snapshot = RegistrySnapshot(
+            config_version=config_version,
+            revision=(self._snapshot.revision + 1) if self._snapshot else 1,
+            default_agent=default_agent,
+            runtimes=runtimes,
+            router=KeywordRouter(definitions, default_agent)
+        )
+        return snapshot, changed
+
+    def load(self) -> List[str]:
+        """Carga síncrona (startup). Erros propagam: sem snapshot não há agentes."""
+        snapshot, changed = self._build()
+        self._snapshot = snapshot
+        return changed
+
+    async def reload(self) -> Dict[str, Any]:
+        """
+        Recarrega em thread e publica atomicamente. Em caso de erro o snapshot
+        anterior permanece ativo.
+        """
+        async with self._reload_lock:
+            try:
+                snapshot, changed = await asyncio.to_thread(self._build)
+            except (OSError, AgentConfigError, TypeError, ValueError) as e:
+                self.last_error = str(e)
+                logger.error("agent_registry.reload_failed", error=str(e))
+                return {"reloaded": False, "error": str(e), "revision": self.current.revision}
+
+            self._snapshot = snapshot
+            self.last_error = None
+            logger.info(
+                "agent_registry.reloaded",
+                config_version=snapshot.config_version,
+                revision=snapshot.revision,
+                changed=changed
+            )
+            return {"reloaded": True, "changed": changed, "revision": snapshot.revision}
+
+    def has_changed(self) -> bool:
+        try:
+            return self._stat() != self._file_state
+        except OSError:
+            return False
+
+    async def watch(self, interval_seconds: float) -> None:
+        """Observa o arquivo (mtime/tamanho) e recarrega quando muda."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                if self.has_changed():
+                    await self.reload()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("agent_registry.watch_failed")
+
+
+# Instância global compartilhada por todas as rotas
+agent_registry = AgentRegistry()
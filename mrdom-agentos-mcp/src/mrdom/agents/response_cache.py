@@ -0,0 +1,84 @@
+"""
+Cache de respostas recentes por agente/mensagem
+
+Usado apenas em modo degradado (circuito aberto): uma
+mensagem já respondida recentemente pelo mesmo agente recebe a mesma
+resposta em vez da resposta padrão.
+
+O prompt inclui o contexto (remetente, conversa), então a resposta pode ser
+personalizada: com contexto, ela só é reaproveitada na mesma conversa (ou,
+sem conversa, para o mesmo contato). Contexto sem nenhum dos dois
+identificadores não é cacheado; respostas sem contexto são genéricas.
+"""
+
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from ..core.config import settings
+
+
+# Identificadores que delimitam quem pode receber uma resposta gerada com contexto
+SCOPE_FIELDS = ("conversation_id", "contact_id")
+
+
+def cache_scope(context: Optional[Dict] = None) -> Optional[str]:
+    """Escopo da resposta: "*" sem contexto, conversa/contato com contexto, None = não cachear."""
+    if not context:
+        return "*"
+    for scope_field in SCOPE_FIELDS:
+        value = context.get(scope_field)
+        if value is not None and value != "":
+            return f"{scope_field}={value}"
+    return None
+
+
+def cache_key(agent_type: str, message: str, context: Optional[Dict] = None) -> Optional[str]:
+    """Mensagem normalizada (minúsculas, espaços colapsados) dentro do escopo do contexto."""
+    scope = cache_scope(context)
+    if scope is None:
+        return None
+    normalized = re.sub(r"\s+", " ", message.strip().lower())
+    digest = hashlib.blake2b(f"{scope}\n{normalized}".encode(), digest_size=16).hexdigest()
+    return f"{agent_type}:{digest}"
+
+
+class ResponseCache:
+    """LRU com TTL em memória (por processo)."""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries or settings.response_cache_max_entries
+        self.ttl_seconds = ttl_seconds or settings.response_cache_ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, agent_type: str, message: str, response: str, context: Optional[Dict] = None) -> None:
+        key = cache_key(agent_type, message, context)
+        if key is None:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, agent_type: str, message: str, context: Optional[Dict] = None) -> Optional[str]:
+        key = cache_key(agent_type, message, context)
+        if key is None:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+
+# Instância global compartilhada entre as rotas
+response_cache = ResponseCache()
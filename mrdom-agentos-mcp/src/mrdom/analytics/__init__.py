@@ -0,0 +1,14 @@
+"""
+Analytics MrDom SDR - rollups pré-agregados para dashboards
+"""
+
+from .rollups import RollupPipeline, fetch_rollups, rollup_pipeline, summarize_rollups
+from .sketch import LatencySketch
+
+__all__ = [
+    "LatencySketch",
+    "RollupPipeline",
+    "fetch_rollups",
+    "rollup_pipeline",
+    "summarize_rollups"
+]
@@ -0,0 +1,317 @@
+"""
+Rollups incrementais de agent_interactions (hora/dia)
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import structlog
+
+from ..core.config import settings
+from ..core.database import get_pool
+from .sketch import LatencySketch
+
+logger = structlog.get_logger(__name__)
+
+BUCKET_SIZES = ("hour", "day")
+WATERMARK_NAME = "agent_interaction_rollups"
+# Chave do pg_advisory_xact_lock que garante um único executor entre pods
+ROLLUP_LOCK_KEY = 720_270_001
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Deltas horários já agregados pelo Postgres, incluindo o bin do sketch de
+# latência de cada grupo (NULL para latências <= 0, contadas em zero_count).
+# Conversão = metadata.converted verdadeiro.
+DELTA_QUERY = """
+SELECT agent_name,
+       date_trunc('hour', created_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket_start,
+       CASE WHEN processing_time_ms IS NULL OR processing_time_ms <= 0 THEN NULL
+            ELSE ceil(ln(processing_time_ms) / ln($3::float8))::int
+       END AS sketch_key,
+       count(*) AS interactions,
+       count(*) FILTER (WHERE metadata->>'converted' = 'true') AS conversions,
+       count(processing_time_ms) AS latency_count,
+       coalesce(sum(processing_time_ms), 0)::float8 AS latency_sum_ms,
+       min(processing_time_ms) AS latency_min_ms,
+       max(processing_time_ms) AS latency_max_ms
+FROM agent_interactions
+WHERE created_at > $1 AND created_at <= $2
+GROUP BY 1, 2, 3
+"""
+
+SELECT_ROLLUPS_FOR_UPDATE = """
+SELECT bucket_size, agent_name, bucket_start, interactions, conversions,
+       latency_count, latency_sum_ms, latency_min_ms, latency_max_ms, latency_sketch
+FROM agent_interaction_rollups
+WHERE (bucket_size, agent_name, bucket_start) IN (
+    SELECT * FROM unnest($1::varchar[], $2::varchar[], $3::timestamptz[])
+)
+FOR UPDATE
+"""
+
+UPSERT_ROLLUP = """
+INSERT INTO agent_interaction_rollups (
+    bucket_size, agent_name, bucket_start, interactions, conversions,
+    latency_count, latency_sum_ms, latency_min_ms, latency_max_ms, latency_sketch, updated_at
+) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, NOW())
+ON CONFLICT (bucket_size, agent_name, bucket_start) DO UPDATE SET
+    interactions = EXCLUDED.interactions,
+    conversions = EXCLUDED.conversions,
+    latency_count = EXCLUDED.latency_count,
+    latency_sum_ms = EXCLUDED.latency_sum_ms,
+    latency_min_ms = EXCLUDED.latency_min_ms,
+    latency_max_ms = EXCLUDED.latency_max_ms,
+    latency_sketch = EXCLUDED.latency_sketch,
+    updated_at = NOW()
+"""
+
+SELECT_ROLLUP_RANGE = """
+SELECT agent_name, bucket_start, interactions, conversions,
+       latency_count, latency_sum_ms, latency_min_ms, latency_max_ms, latency_sketch
+FROM agent_interaction_rollups
+WHERE bucket_size = $1
+  AND bucket_start >= $2 AND bucket_start < $3
+  AND ($4::varchar IS NULL OR agent_name = $4)
+ORDER BY bucket_start, agent_name
+"""
+
+
+@dataclass
+class RollupBucket:
+    """Agregado de um agente em um bucket de tempo."""
+
+    interactions: int = 0
+    conversions: int = 0
+    latency_count: int = 0
+    latency_sum_ms: float = 0.0
+    latency_min_ms: Optional[float] = None
+    latency_max_ms: Optional[float] = None
+    sketch: LatencySketch = field(
+        default_factory=lambda: LatencySketch(settings.analytics_sketch_accuracy)
+    )
+
+    def merge(self, other: "RollupBucket") -> None:
+        self.interactions += other.interactions
+        self.conversions += other.conversions
+        self.latency_count += other.latency_count
+        self.latency_sum_ms += other.latency_sum_ms
+        if other.latency_min_ms is not None:
+            self.latency_min_ms = (
+                other.latency_min_ms if self.latency_min_ms is None
+                else min(self.latency_min_ms, other.latency_min_ms)
+            )
+        if other.latency_max_ms is not None:
+            self.latency_max_ms = (
+                other.latency_max_ms if self.latency_max_ms is None
+                else max(self.latency_max_ms, other.latency_max_ms)
+            )
+        self.sketch.merge(other.sketch)
+
+    @classmethod
+    def from_record(cls, record: Any) -> "RollupBucket":
+        return cls(
+            interactions=record["interactions"],
+            conversions=record["conversions"],
+            latency_count=record["latency_count"],
+            latency_sum_ms=record["latency_sum_ms"],
+            latency_min_ms=record["latency_min_ms"],
+            latency_max_ms=record["latency_max_ms"],
+            sketch=LatencySketch.from_dict(
+                record["latency_sketch"], settings.analytics_sketch_accuracy
+            )
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "interactions": self.interactions,
+            "conversions": self.conversions,
+            "conversion_rate": (
+                self.conversions / self.interactions if self.interactions else 0.0
+            ),
+            "latency_ms": {
+                "avg": self.latency_sum_ms / self.latency_count if self.latency_count else None,
+                "min": self.latency_min_ms,
+                "max": self.latency_max_ms,
+                **self.sketch.quantiles((0.5, 0.9, 0.95, 0.99))
+            }
+        }
+
+
+RollupKey = Tuple[str, str, datetime]
+
+
+def day_bucket(hour_start: datetime, tz: ZoneInfo) -> datetime:
+    """Início do dia (no fuso de negócio) que contém o bucket horário."""
+    local = hour_start.astimezone(tz)
+    return local.replace(hour=0, minute=0, second=0, microsecond=0).astimezone(timezone.utc)
+
+
+def build_deltas(rows: List[Any], tz: ZoneInfo) -> Dict[RollupKey, RollupBucket]:
+    """Converte as linhas do DELTA_QUERY em deltas por (bucket_size, agente, início)."""
+    deltas: Dict[RollupKey, RollupBucket] = {}
+    for row in rows:
+        partial = RollupBucket(
+            interactions=row["interactions"],
+            conversions=row["conversions"],
+            latency_count=row["latency_count"],
+            latency_sum_ms=row["latency_sum_ms"],
+            latency_min_ms=row["latency_min_ms"],
+            latency_max_ms=row["latency_max_ms"]
+        )
+        if row["sketch_key"] is not None:
+            partial.sketch.add_bin(row["sketch_key"], row["latency_count"])
+        elif row["latency_count"]:
+            # Grupo sem bin: latency_count só conta as latências <= 0 (NULL não entra)
+            partial.sketch.add(0, row["latency_count"])
+
+        hour_start = row["bucket_start"]
+        for key in (
+            ("hour", row["agent_name"], hour_start),
+            ("day", row["agent_name"], day_bucket(hour_start, tz))
+        ):
+            deltas.setdefault(key, RollupBucket()).merge(partial)
+    return deltas
+
+
+class RollupPipeline:
+    """Mantém agent_interaction_rollups a partir de um watermark em created_at."""
+
+    def __init__(self) -> None:
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    async def run_once(self) -> Dict[str, Any]:
+        """Processa o intervalo (watermark, agora - atraso] e avança o watermark."""
+        pool = await get_pool()
+        tz = ZoneInfo(settings.timezone)
+        started = datetime.now(timezone.utc)
+
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                locked = await conn.fetchval("SELECT pg_try_advisory_xact_lock($1)", ROLLUP_LOCK_KEY)
+                if not locked:
+                    return {"skipped": True, "reason": "rollup em execução em outra instância"}
+
+                watermark = await conn.fetchval(
+                    "SELECT last_processed_at FROM rollup_watermarks WHERE name = $1",
+                    WATERMARK_NAME
+                ) or EPOCH
+
+                # Rows recentes ficam de fora até o atraso expirar (commits tardios)
+                upper = started - timedelta(seconds=settings.analytics_rollup_lag_seconds)
+                if watermark == EPOCH:
+                    first = await conn.fetchval("SELECT min(created_at) FROM agent_interactions")
+                    if first is None:
+                        return {"skipped": True, "reason": "nenhuma interação registrada"}
+                    watermark = first - timedelta(microseconds=1)
+                upper = min(upper, watermark + timedelta(hours=settings.analytics_rollup_max_window_hours))
+                if upper <= watermark:
+                    return {"skipped": True, "reason": "nada a processar"}
+
+                rows = await conn.fetch(
+                    DELTA_QUERY, watermark, upper, LatencySketch(settings.analytics_sketch_accuracy).gamma
+                )
+                deltas = build_deltas(rows, tz)
+
+                if deltas:
+                    keys = list(deltas)
+                    existing = await conn.fetch(
+                        SELECT_ROLLUPS_FOR_UPDATE,
+                        [k[0] for k in keys], [k[1] for k in keys], [k[2] for k in keys]
+                    )
+                    merged: Dict[RollupKey, RollupBucket] = {
+                        (r["bucket_size"], r["agent_name"], r["bucket_start"]): RollupBucket.from_record(r)
+                        for r in existing
+                    }
+                    for key, delta in deltas.items():
+                        merged.setdefault(key, RollupBucket()).merge(delta)
+
+                    await conn.executemany(UPSERT_ROLLUP, [
+                        (
+                            bucket_size, agent_name, bucket_start,
+                            bucket.interactions, bucket.conversions,
+                            bucket.latency_count, bucket.latency_sum_ms,
+                            bucket.latency_min_ms, bucket.latency_max_ms,
+                            bucket.sketch.to_dict()
+                        )
+                        for (bucket_size, agent_name, bucket_start), bucket in merged.items()
+                    ])
+
+                await conn.execute(
+                    """
+                    INSERT INTO rollup_watermarks (name, last_processed_at, updated_at)
+                    VALUES ($1, $2, NOW())
+                    ON CONFLICT (name) DO UPDATE
+                    SET last_processed_at = EXCLUDED.last_processed_at, updated_at = NOW()
+                    """,
+                    WATERMARK_NAME, upper
+                )
+
+        self.last_run = {
+            "skipped": False,
+            "from": watermark.isoformat(),
+            "to": upper.isoformat(),
+            "source_groups": len(rows),
+            "buckets_updated": len(deltas),
+            "duration_ms": (datetime.now(timezone.utc) - started).total_seconds() * 1000
+        }
+        return self.last_run
+
+    async def run_forever(self, interval_seconds: float) -> None:
+        """Loop de background; falhas são registradas e o ciclo continua."""
+        while True:
+            try:
+                # Recupera atraso em ciclos consecutivos antes de dormir
+                while True:
+                    result = await self.run_once()
+                    if result.get("skipped"):
+                        break
+                    if datetime.fromisoformat(result["to"]) >= datetime.now(timezone.utc) - timedelta(
+                        seconds=settings.analytics_rollup_lag_seconds + interval_seconds
+                    ):
+                        break
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("analytics.rollup_failed")
+            await asyncio.sleep(interval_seconds)
+
+
+async def fetch_rollups(
+    bucket_size: str,
+    start: datetime,
+    end: datetime,
+    agent_name: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Série temporal por agente lida apenas das tabelas de rollup."""
+    pool = await get_pool()
+    rows = await pool.fetch(SELECT_ROLLUP_RANGE, bucket_size, start, end, agent_name)
+    return [
+        {
+            "agent": row["agent_name"],
+            "bucket_start": row["bucket_start"].isoformat(),
+            **RollupBucket.from_record(row).to_dict()
+        }
+        for row in rows
+    ]
+
+
+async def summarize_rollups(
+    bucket_size: str,
+    start: datetime,
+    end: datetime,
+    agent_name: Optional[str] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Totais por agente no intervalo, mesclando os sketches dos buckets."""
+    pool = await get_pool()
+    rows = await pool.fetch(SELECT_ROLLUP_RANGE, bucket_size, start, end, agent_name)
+    totals: Dict[str, RollupBucket] = {}
+    for row in rows:
+        totals.setdefault(row["agent_name"], RollupBucket()).merge(RollupBucket.from_record(row))
+    return {agent: bucket.to_dict() for agent, bucket in totals.items()}
+
+
+# Instância global usada pelo lifespan da aplicação
+rollup_pipeline = RollupPipeline()
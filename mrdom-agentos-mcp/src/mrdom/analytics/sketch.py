@@ -0,0 +1,96 @@
+"""
+Sketch de latência mesclável (estilo DDSketch)
+"""
+
+import math
+from typing import Any, Dict, Iterable, Optional
+
+
+class LatencySketch:
+    """
+    Histograma logarítmico com erro relativo garantido nos quantis.
+
+    Cada valor positivo cai no bin ``ceil(log_gamma(x))`` e valores <= 0 em
+    ``zero_count``; dois sketches com o mesmo ``relative_accuracy`` são
+    mesclados somando os bins, o que permite combinar buckets horários em
+    diários (ou intervalos arbitrários) sem acessar os dados brutos. Com
+    precisões diferentes (ANALYTICS_SKETCH_ACCURACY alterado), os bins do
+    outro sketch são redistribuídos pelo valor representativo; o erro
+    relativo do resultado fica limitado à soma das duas precisões.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy deve estar entre 0 e 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def key(self, value: float) -> int:
+        """Índice do bin para um valor positivo."""
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def value(self, key: int) -> float:
+        """Valor representativo do bin (erro relativo <= relative_accuracy)."""
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value <= 0:
+            self.zero_count += count
+            self.count += count
+        else:
+            self.add_bin(self.key(value), count)
+
+    def add_bin(self, key: int, count: int) -> None:
+        """Adiciona contagem diretamente a um bin (agregações feitas no SQL)."""
+        self.bins[key] = self.bins.get(key, 0) + count
+        self.count += count
+
+    def merge(self, other: "LatencySketch") -> None:
+        same_scale = other.relative_accuracy == self.relative_accuracy
+        for key, count in other.bins.items():
+            if not same_scale:
+                key = self.key(other.value(key))
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Valor aproximado do quantil ``q`` (0..1), ou None se vazio."""
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+
+        seen = self.zero_count
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return self.value(key)
+        return self.value(max(self.bins))
+
+    def quantiles(self, qs: Iterable[float]) -> Dict[str, Optional[float]]:
+        return {f"p{round(q * 100)}": self.quantile(q) for q in qs}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "alpha": self.relative_accuracy,
+            "zero": self.zero_count,
+            "bins": {str(key): count for key, count in self.bins.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]], relative_accuracy: float = 0.01) -> "LatencySketch":
+        if not data:
+            return cls(relative_accuracy)
+        sketch = cls(data.get("alpha", relative_accuracy))
+        for key, count in data.get("bins", {}).items():
+            sketch.add_bin(int(key), int(count))
+        sketch.zero_count = int(data.get("zero", 0))
+        sketch.count += sketch.zero_count
+        return sketch
@@ -2,24 +2,109 @@
 API MrDom SDR AgentOS + Bedrock
 """
 
-from fastapi import FastAPI
-from .routes import agents, health, webhooks
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from asgi_correlation_id import CorrelationIdMiddleware
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from prometheus_fastapi_instrumentator import Instrumentator
+from .routes import admin, agents, analytics, conversations, health, webhooks
+from ..agents.classifier import classifier_store
+from ..agents.registry import agent_registry
+from ..analytics.rollups import rollup_pipeline
 from ..core.config import settings
+from ..core.database import close_pool
+from ..core.deadline import DeadlineExceededError, DeadlineMiddleware
+from ..core.inflight import CANCEL_CLIENT_DISCONNECT, CallCancelledError
+from ..core.logs import LogSamplingMiddleware, configure_logging, shutdown_logging
+from ..integrations.chatwoot import chatwoot_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Inicia e encerra tarefas de background e recursos compartilhados."""
+    background_tasks = []
+    
+    # Sem modelo treinado o roteamento segue por palavras-chave
+    await asyncio.to_thread(classifier_store.load)
+    
+    if settings.agents_config_watch_enabled:
+        background_tasks.append(asyncio.create_task(
+            agent_registry.watch(settings.agents_config_watch_interval_seconds)
+        ))
+    
+    if settings.analytics_rollup_enabled:
+        background_tasks.append(asyncio.create_task(
+            rollup_pipeline.run_forever(settings.analytics_rollup_interval_seconds)
+        ))
+    
+    yield
+    
+    for task in background_tasks:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    await chatwoot_client.close()
+    await close_pool()
+    shutdown_logging()
 
 
 def create_app() -> FastAPI:
     """Cria aplicação FastAPI."""
+    configure_logging()
     
     app = FastAPI(
         title=settings.app_name,
         version=settings.version,
         description="Sistema de automação de vendas com agentes inteligentes usando AgentOS e AWS Bedrock",
-        debug=settings.debug
+        debug=settings.debug,
+        lifespan=lifespan
     )
     
     # Inclui rotas
     app.include_router(health.router, prefix="/api/v1", tags=["health"])
     app.include_router(agents.router, prefix="/api/v1/agents", tags=["agents"])
     app.include_router(webhooks.router, prefix="/api/v1/webhooks", tags=["webhooks"])
+    app.include_router(analytics.router, prefix="/api/v1/analytics", tags=["analytics"])
+    app.include_router(conversations.router, prefix="/api/v1/conversations", tags=["conversations"])
+    app.include_router(admin.router, prefix="/api/v1/admin", tags=["admin"])
+    
+    @app.exception_handler(CallCancelledError)
+    async def call_cancelled_handler(request: Request, exc: CallCancelledError) -> JSONResponse:
+        # 499 (client closed request) quando o cliente desconectou; 503 no cancelamento administrativo
+        status_code = 499 if exc.reason == CANCEL_CLIENT_DISCONNECT else 503
+        return JSONResponse(
+            status_code=status_code,
+            content={"detail": str(exc), "call_id": exc.call_id, "reason": exc.reason}
+        )
+    
+    @app.exception_handler(DeadlineExceededError)
+    async def deadline_exceeded_handler(request: Request, exc: DeadlineExceededError) -> JSONResponse:
+        return JSONResponse(
+            status_code=504,
+            content={"detail": str(exc), "stage": exc.stage}
+        )
+    
+    # Exposição Prometheus (métricas HTTP + métricas de agentes em core.metrics).
+    # Middlewares adicionados depois ficam mais externos: o instrumentador
+    # entra antes para que o CorrelationIdMiddleware envolva tudo.
+    if settings.prometheus_enabled:
+        Instrumentator().instrument(app).expose(
+            app, endpoint=settings.metrics_endpoint, include_in_schema=False
+        )
+    
+    # Prazo por requisição (header X-Request-Timeout ou padrão da rota)
+    app.add_middleware(DeadlineMiddleware)
+    app.add_middleware(LogSamplingMiddleware)
+    # Mais externo: X-Request-ID recebido (ou gerado) vale para toda a requisição,
+    # a chamada ao agente e as respostas enviadas ao Chatwoot
+    app.add_middleware(
+        CorrelationIdMiddleware,
+        header_name="X-Request-ID",
+        validator=lambda value: 0 < len(value) <= 128
+    )
     
     return app
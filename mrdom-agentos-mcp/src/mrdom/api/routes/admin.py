@@ -0,0 +1,43 @@
+"""
+Rotas administrativas (chamadas em andamento)
+"""
+
+import hmac
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from ...core.config import settings
+from ...core.inflight import CANCEL_ADMIN, inflight_registry
+
+router = APIRouter()
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """Exige X-Admin-Token = ADMIN_TOKEN; sem token configurado, só em modo debug."""
+    if not settings.admin_token:
+        if settings.debug:
+            return
+        raise HTTPException(status_code=403, detail="ADMIN_TOKEN não configurado")
+
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=401, detail="Token administrativo inválido")
+
+
+@router.get("/inflight", dependencies=[Depends(require_admin)])
+async def list_inflight_calls() -> Dict[str, Any]:
+    """Lista chamadas de agente em andamento nesta instância."""
+    calls = inflight_registry.list()
+    return {
+        "total": len(calls),
+        "calls": calls,
+        "cancelled": inflight_registry.cancelled_counts
+    }
+
+
+@router.delete("/inflight/{call_id}", dependencies=[Depends(require_admin)])
+async def cancel_inflight_call(call_id: str) -> Dict[str, Any]:
+    """Cancela uma chamada em andamento, liberando a chamada ao modelo."""
+    if not inflight_registry.cancel(call_id, CANCEL_ADMIN):
+        raise HTTPException(status_code=404, detail=f"Chamada '{call_id}' não encontrada")
+    return {"call_id": call_id, "cancelled": True}
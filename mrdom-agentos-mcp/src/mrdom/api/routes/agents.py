@@ -2,11 +2,17 @@
 Rotas para agentes AgentOS + Bedrock
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Depends, Request
+from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional, List
 
 from ...agents.bedrock_agent import BedrockAgent
+from ...core.config import settings
+from ...core.deadline import DeadlineExceededError
+from ...core.inflight import CallCancelledError, inflight_registry
+from .admin import require_admin
 
 router = APIRouter()
 
@@ -18,6 +24,16 @@ class AgentProcessRequest(BaseModel):
     agent_type: str
     message: str
     context: Optional[Dict[str, Any]] = None
+    # Overrides de geração (limitados aos intervalos seguros da configuração)
+    max_tokens: Optional[int] = Field(default=None, gt=0)
+    temperature: Optional[float] = Field(default=None, ge=0.0)
+
+class AgentProcessBestRequest(BaseModel):
+    message: str
+    context: Optional[Dict[str, Any]] = None
+    # Overrides de geração (limitados aos intervalos seguros da configuração)
+    max_tokens: Optional[int] = Field(default=None, gt=0)
+    temperature: Optional[float] = Field(default=None, ge=0.0)
 
 class AgentProcessResponse(BaseModel):
     success: bool
@@ -25,6 +41,9 @@ class AgentProcessResponse(BaseModel):
     message: str
     response: Optional[str] = None
     context_used: Optional[bool] = None
+    generation: Optional[Dict[str, Any]] = None
+    scheduling: Optional[Dict[str, Any]] = None
+    degraded: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
 
 class AgentSuggestionRequest(BaseModel):
@@ -34,6 +53,9 @@ class AgentSuggestionResponse(BaseModel):
     message: str
     suggested_agent: str
     available_agents: List[str]
+    all_suggested_agents: List[str] = []
+    confidence: Optional[float] = None
+    routing: Optional[Dict[str, Any]] = None
 
 # Dependency para verificar se agentes estão disponíveis
 async def check_agents_available():
@@ -46,10 +68,17 @@ async def check_agents_available():
 @router.get("/status")
 async def get_agents_status():
     """Status dos agentes AgentOS + Bedrock."""
+    snapshot = bedrock_agent.registry.current
     return {
         "agentos_available": bedrock_agent.is_available(),
         "model_provider": "AWS Bedrock",
-        "model": "amazon.nova-lite-v1:0",
+        "model": settings.bedrock_model,
+        "models": {
+            agent_type: runtime.definition.model
+            for agent_type, runtime in snapshot.runtimes.items()
+        },
+        "config_version": snapshot.config_version,
+        "config_revision": snapshot.revision,
         "available_agents": bedrock_agent.get_available_agents(),
         "total_agents": len(bedrock_agent.get_available_agents())
     }
@@ -57,35 +86,68 @@ async def get_agents_status():
 @router.get("/list")
 async def list_agents(_: None = Depends(check_agents_available)):
     """Lista agentes disponíveis."""
-    agents = bedrock_agent.get_available_agents()
-    agent_descriptions = {
-        "qualification": "Especialista em qualificação BANT",
-        "sales": "SDR experiente em agendamento de demos",
-        "support": "Especialista em suporte ao cliente"
-    }
+    snapshot = bedrock_agent.registry.current
     
     return {
         "agents": [
             {
                 "id": agent_id,
                 "name": agent_id.title(),
-                "description": agent_descriptions.get(agent_id, "Agente especializado")
+                "description": runtime.definition.description,
+                "version": runtime.definition.version
             }
-            for agent_id in agents
+            for agent_id, runtime in snapshot.runtimes.items()
         ]
     }
 
+@router.get("/config")
+async def get_agents_config() -> Dict[str, Any]:
+    """Definições de agentes em uso (versão do arquivo e de cada agente)."""
+    return {
+        **bedrock_agent.registry.current.describe(),
+        "path": str(bedrock_agent.registry.path),
+        "last_error": bedrock_agent.registry.last_error
+    }
+
+@router.post("/reload", dependencies=[Depends(require_admin)])
+async def reload_agents_config() -> Dict[str, Any]:
+    """Força o reload de config/agents.json (apenas agentes alterados são recriados)."""
+    result = await bedrock_agent.registry.reload()
+    if not result["reloaded"]:
+        raise HTTPException(status_code=422, detail=result["error"])
+    return result
+
+@router.get("/classifier")
+async def get_classifier_status() -> Dict[str, Any]:
+    """Classificador de intenção em uso (métricas do treino, calibração)."""
+    return bedrock_agent.classifiers.status()
+
+@router.post("/classifier/reload", dependencies=[Depends(require_admin)])
+async def reload_classifier() -> Dict[str, Any]:
+    """Recarrega o modelo do disco (após `mrdom-sdr train`); falha mantém o modelo atual."""
+    if not await asyncio.to_thread(bedrock_agent.classifiers.load):
+        raise HTTPException(status_code=422, detail=bedrock_agent.classifiers.last_error)
+    return bedrock_agent.classifiers.status()
+
 @router.post("/process", response_model=AgentProcessResponse)
 async def process_with_agent(
     request: AgentProcessRequest,
+    http_request: Request,
     _: None = Depends(check_agents_available)
 ):
     """Processa mensagem com agente específico."""
     try:
-        result = await bedrock_agent.process_message(
-            agent_type=request.agent_type,
-            message=request.message,
-            context=request.context
+        result = await inflight_registry.run(
+            bedrock_agent.process_message(
+                agent_type=request.agent_type,
+                message=request.message,
+                context=request.context,
+                max_tokens=request.max_tokens,
+                temperature=request.temperature
+            ),
+            route="agents.process",
+            request=http_request,
+            metadata={"agent_type": request.agent_type}
         )
         
         if not result["success"]:
@@ -93,31 +155,43 @@ async def process_with_agent(
         
         return AgentProcessResponse(**result)
         
+    except (HTTPException, CallCancelledError, DeadlineExceededError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/process-best")
 async def process_with_best_agent(
-    request: dict,
+    request: AgentProcessBestRequest,
+    http_request: Request,
     _: None = Depends(check_agents_available)
 ):
     """Processa mensagem usando melhor agente automaticamente."""
     try:
-        message = request.get("message", "")
-        context = request.get("context", None)
-        
-        if not message:
+        if not request.message:
             raise HTTPException(status_code=400, detail="Campo 'message' é obrigatório")
         
-        result = await bedrock_agent.process_with_best_agent(message, context)
+        result = await inflight_registry.run(
+            bedrock_agent.process_with_best_agent(
+                request.message,
+                request.context,
+                max_tokens=request.max_tokens,
+                temperature=request.temperature
+            ),
+            route="agents.process_best",
+            request=http_request
+        )
         
         return {
             "success": result["success"],
             "selected_agent": result.get("selected_agent"),
             "all_suggested_agents": result.get("all_suggested_agents", []),
+            "confidence_score": result.get("confidence_score"),
             "result": result
         }
         
+    except (HTTPException, CallCancelledError, DeadlineExceededError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -125,13 +199,16 @@ async def process_with_best_agent(
 async def suggest_agent(request: AgentSuggestionRequest):
     """Sugere melhor agente para mensagem."""
     try:
-        suggested = bedrock_agent.suggest_agent(request.message)
+        routing = bedrock_agent.route(request.message)
         available = bedrock_agent.get_available_agents()
         
         return AgentSuggestionResponse(
             message=request.message,
-            suggested_agent=suggested,
-            available_agents=available
+            suggested_agent=routing.agent_type,
+            available_agents=available,
+            all_suggested_agents=routing.suggestions(),
+            confidence=routing.confidence,
+            routing=routing.to_dict()
         )
         
     except Exception as e:
@@ -0,0 +1,103 @@
+"""
+Rotas de analytics servidas pelos rollups pré-agregados
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query
+
+from ...analytics.rollups import (
+    BUCKET_SIZES,
+    fetch_rollups,
+    rollup_pipeline,
+    summarize_rollups,
+)
+from ...core.config import settings
+
+router = APIRouter()
+
+BUCKET_LENGTHS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+DEFAULT_RANGES = {"hour": timedelta(hours=24), "day": timedelta(days=30)}
+
+
+def resolve_range(
+    bucket: str,
+    start: Optional[datetime],
+    end: Optional[datetime]
+) -> Tuple[datetime, datetime]:
+    """Valida bucket/intervalo e aplica padrões (últimas 24h ou 30 dias)."""
+    if bucket not in BUCKET_SIZES:
+        raise HTTPException(status_code=400, detail=f"bucket deve ser um de {list(BUCKET_SIZES)}")
+
+    end = end or datetime.now(timezone.utc)
+    start = start or end - DEFAULT_RANGES[bucket]
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'start' deve ser anterior a 'end'")
+
+    # Mantém o custo da leitura limitado pelo número de buckets, não pelos dados brutos
+    if (end - start) / BUCKET_LENGTHS[bucket] > settings.analytics_max_buckets:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Intervalo excede {settings.analytics_max_buckets} buckets de '{bucket}'"
+        )
+    return start, end
+
+
+@router.get("/agents")
+async def agent_timeseries(
+    bucket: str = Query("hour"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    agent: Optional[str] = None
+) -> Dict[str, Any]:
+    """Volume, conversão e percentis de latência por agente e bucket."""
+    start, end = resolve_range(bucket, start, end)
+    try:
+        series = await fetch_rollups(bucket, start, end, agent)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Rollups indisponíveis: {e}")
+
+    return {
+        "bucket": bucket,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "series": series
+    }
+
+
+@router.get("/agents/summary")
+async def agent_summary(
+    bucket: str = Query("day"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    agent: Optional[str] = None
+) -> Dict[str, Any]:
+    """Totais por agente no intervalo (sketches de latência mesclados)."""
+    start, end = resolve_range(bucket, start, end)
+    try:
+        agents = await summarize_rollups(bucket, start, end, agent)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Rollups indisponíveis: {e}")
+
+    return {
+        "bucket": bucket,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "agents": agents
+    }
+
+
+@router.get("/rollups/status")
+async def rollup_status() -> Dict[str, Any]:
+    """Estado do pipeline de rollups nesta instância."""
+    return {
+        "enabled": settings.analytics_rollup_enabled,
+        "interval_seconds": settings.analytics_rollup_interval_seconds,
+        "lag_seconds": settings.analytics_rollup_lag_seconds,
+        "last_run": rollup_pipeline.last_run
+    }
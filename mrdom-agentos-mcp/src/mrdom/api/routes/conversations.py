@@ -0,0 +1,62 @@
+"""
+Rotas de busca no histórico de conversas
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from ...core.config import settings
+from ...search.conversations import (
+    ConversationSearchBackend,
+    InvalidCursorError,
+    PostgresConversationSearch,
+    SearchQuery,
+)
+
+router = APIRouter()
+
+# Instância global do backend de busca
+search_backend = PostgresConversationSearch()
+
+
+def get_search_backend() -> ConversationSearchBackend:
+    """Dependency do backend (substituível via app.dependency_overrides)."""
+    return search_backend
+
+
+@router.get("/search")
+async def search_conversations(
+    q: Optional[str] = Query(None, description="Frase ou termos no conteúdo das mensagens"),
+    company: Optional[str] = None,
+    contact: Optional[str] = Query(None, description="Nome, email ou telefone do lead"),
+    platform: Optional[str] = None,
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = Query(settings.search_default_limit, ge=1, le=settings.search_max_limit),
+    cursor: Optional[str] = None,
+    backend: ConversationSearchBackend = Depends(get_search_backend)
+) -> Dict[str, Any]:
+    """Busca mensagens por frase, empresa ou contato (paginação por cursor)."""
+    query = SearchQuery(
+        text=q.strip() if q else None,
+        company=company.strip() if company else None,
+        contact=contact.strip() if contact else None,
+        platform=platform,
+        status=status,
+        date_from=date_from,
+        date_to=date_to,
+        limit=limit,
+        cursor=cursor
+    )
+
+    try:
+        page = await backend.search(query)
+    except (InvalidCursorError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Busca indisponível: {e}")
+
+    return page.to_dict()
@@ -11,6 +11,13 @@ from datetime import datetime
 
 from ...core.config import settings
 from ...agents.bedrock_agent import BedrockAgent
+from ...agents.generation import output_token_tracker
+from ...core.circuit_breaker import HALF_OPEN, OPEN, circuit_breakers
+from ...core.database import get_pool
+from ...core.deadline import DeadlineExceededError, run_stage, stage_timeouts
+from ...core.inflight import inflight_registry
+from ...core.logs import dropped_log_records
+from ...core.scheduler import model_scheduler
 
 router = APIRouter()
 
@@ -80,6 +87,17 @@ async def detailed_health_check():
             "message": str(e)
         }
     
+    # Circuitos dos provedores de modelo
+    breakers = circuit_breakers.snapshot()
+    states = {breaker["state"] for breaker in breakers}
+    if OPEN in states:
+        status, message = "unhealthy", "Circuito aberto: respostas em modo degradado"
+    elif HALF_OPEN in states:
+        status, message = "degraded", "Circuito em teste (half-open)"
+    else:
+        status, message = "healthy", "Circuitos fechados"
+    components["model_providers"] = {"status": status, "message": message, "circuits": breakers}
+    
     # Verifica AWS Credentials
     if settings.aws_access_key_id and settings.aws_secret_access_key:
         components["aws_credentials"] = {
@@ -92,6 +110,16 @@ async def detailed_health_check():
             "message": "Credenciais AWS não configuradas"
         }
     
+    # Verifica banco (conexão + SELECT 1 dentro do orçamento do health check)
+    try:
+        pool = await run_stage("health.database", get_pool(), cap=settings.health_check_timeout_seconds)
+        await run_stage("health.database", pool.fetchval("SELECT 1"), cap=settings.health_check_timeout_seconds)
+        components["database"] = {"status": "healthy", "message": "PostgreSQL respondendo"}
+    except DeadlineExceededError as e:
+        components["database"] = {"status": "unhealthy", "message": str(e)}
+    except Exception as e:
+        components["database"] = {"status": "error", "message": str(e)}
+    
     # Determina status geral
     overall_status = "healthy"
     for component, info in components.items():
@@ -151,6 +179,21 @@ async def metrics():
             "total": len(bedrock_agent.get_available_agents()),
             "available": bedrock_agent.get_available_agents()
         },
+        "calls": {
+            "inflight": len(inflight_registry),
+            "cancelled": inflight_registry.cancelled_counts,
+            "deadline_exceeded": stage_timeouts
+        },
+        "circuit_breakers": circuit_breakers.snapshot(),
+        "model_scheduler": model_scheduler.snapshot(),
+        "logging": {"dropped_records": dropped_log_records()},
+        "generation": {
+            "profiles": {
+                agent_type: profile.to_dict()
+                for agent_type, profile in bedrock_agent.profiles.items()
+            },
+            "output_tokens": output_token_tracker.snapshot()
+        },
         "configuration": {
             "bedrock_model": settings.bedrock_model,
             "aws_region": settings.aws_default_region,
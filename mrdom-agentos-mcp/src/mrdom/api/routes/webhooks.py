@@ -4,13 +4,32 @@ Rotas para webhooks (Chatwoot, N8N, etc.)
 
 from fastapi import APIRouter, HTTPException, Request, Depends
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from starlette.requests import ClientDisconnect
+from typing import AsyncIterator, Dict, Any, Optional, Tuple
 import hmac
 import hashlib
 import json
 
+import structlog
+
 from ...core.config import settings
 from ...agents.bedrock_agent import BedrockAgent
+from ...agents.classifier import RoutingDecision
+from ...core.deadline import DeadlineExceededError, reset_deadline, set_deadline
+from ...core.inflight import CallCancelledError, inflight_registry
+from ...core.metrics import BULK_RECORDS
+from ...core.streaming import (
+    NDJSON_MEDIA_TYPE,
+    DuplexStreamingResponse,
+    NDJSONRecord,
+    UploadStream,
+    bounded_as_completed,
+    iter_ndjson,
+    ndjson_line,
+)
+from ...integrations.chatwoot import chatwoot_client
+
+logger = structlog.get_logger(__name__)
 
 router = APIRouter()
 
@@ -25,6 +44,7 @@ class WebhookResponse(BaseModel):
     success: bool
     response: Optional[str] = None
     agent_used: Optional[str] = None
+    confidence: Optional[float] = None
     error: Optional[str] = None
 
 def verify_chatwoot_signature(request: Request) -> bool:
@@ -85,17 +105,53 @@ async def chatwoot_webhook(request: Request):
             "contact_id": conversation_data.get("contact", {}).get("id"),
             "sender": message_data.get("sender", {}),
             "timestamp": message_data.get("created_at"),
+            # Atributo personalizado da conversa (peso na fila de prioridade)
+            "lead_status": (conversation_data.get("custom_attributes") or {}).get("lead_status"),
             "source": "chatwoot"
         }
         
+        # Retries do Chatwoot para a mesma mensagem reaproveitam a chamada em andamento
+        message_id = message_data.get("id")
+        call_key = f"chatwoot:{message_id}" if message_id is not None else None
+        
+        deliver = (
+            settings.chatwoot_reply_enabled
+            and chatwoot_client.enabled
+            and context["conversation_id"] is not None
+        )
+        if deliver:
+            # O remetente do webhook desiste em poucos segundos: confirma já e
+            # processa em background, sem vincular a chamada à conexão HTTP
+            if call_key is not None and inflight_registry.find(call_key) is not None:
+                # Retry: a resposta já será postada pela chamada em andamento
+                return WebhookResponse(
+                    success=True,
+                    response="Mensagem já em processamento",
+                    agent_used=None
+                )
+            chatwoot_client.set_typing(context["conversation_id"], True)
+            chatwoot_client.run_in_background(reply_via_api(message_text, context, call_key))
+            return WebhookResponse(
+                success=True,
+                response="Mensagem recebida; resposta será entregue pela API do Chatwoot",
+                agent_used=None
+            )
+        
         # Processa com melhor agente
-        result = await bedrock_agent.process_with_best_agent(message_text, context)
+        result = await inflight_registry.run(
+            bedrock_agent.process_with_best_agent(message_text, context, source="chatwoot"),
+            route="webhooks.chatwoot",
+            request=request,
+            metadata={"conversation_id": context["conversation_id"], "source": "chatwoot"},
+            key=call_key
+        )
         
         if result["success"]:
             return WebhookResponse(
                 success=True,
                 response=result["response"],
-                agent_used=result.get("selected_agent")
+                agent_used=result.get("selected_agent"),
+                confidence=result.get("confidence_score")
             )
         else:
             return WebhookResponse(
@@ -103,9 +159,35 @@ async def chatwoot_webhook(request: Request):
                 error=result.get("error", "Erro desconhecido")
             )
         
+    except (HTTPException, CallCancelledError, DeadlineExceededError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def reply_via_api(message_text: str, context: Dict[str, Any], call_key: Optional[str] = None) -> None:
+    """Processa a mensagem do Chatwoot e posta a resposta pela API (fora do webhook)."""
+    conversation_id = context["conversation_id"]
+    if call_key is not None and inflight_registry.find(call_key) is not None:
+        # Retry que chegou junto com o original: a chamada em andamento posta a resposta
+        return
+    try:
+        # Sem request: a desconexão do webhook não cancela a chamada (ainda cancelável pelo admin)
+        result = await inflight_registry.run(
+            bedrock_agent.process_with_best_agent(message_text, context, source="chatwoot"),
+            route="webhooks.chatwoot",
+            metadata={"conversation_id": conversation_id, "source": "chatwoot"},
+            key=call_key
+        )
+    except Exception as e:
+        # Prazo da rota esgotado ou cancelamento administrativo
+        result = {"success": False, "error": str(e)}
+    
+    if result["success"]:
+        chatwoot_client.schedule_reply(conversation_id, result["response"])
+    else:
+        chatwoot_client.set_typing(conversation_id, False)
+        logger.warning("chatwoot.reply_failed", conversation_id=conversation_id, error=result.get("error"))
+
 @router.post("/n8n", response_model=WebhookResponse)
 async def n8n_webhook(request: Request):
     """Webhook do N8N para processamento de workflows."""
@@ -121,13 +203,19 @@ async def n8n_webhook(request: Request):
             raise HTTPException(status_code=400, detail="Campo 'message' é obrigatório")
         
         # Processa com melhor agente
-        result = await bedrock_agent.process_with_best_agent(message, context)
+        result = await inflight_registry.run(
+            bedrock_agent.process_with_best_agent(message, context, source="n8n"),
+            route="webhooks.n8n",
+            request=request,
+            metadata={"source": "n8n"}
+        )
         
         if result["success"]:
             return WebhookResponse(
                 success=True,
                 response=result["response"],
-                agent_used=result.get("selected_agent")
+                agent_used=result.get("selected_agent"),
+                confidence=result.get("confidence_score")
             )
         else:
             return WebhookResponse(
@@ -135,27 +223,140 @@ async def n8n_webhook(request: Request):
                 error=result.get("error", "Erro desconhecido")
             )
         
+    except (HTTPException, CallCancelledError, DeadlineExceededError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def routed_records(
+    records: AsyncIterator[NDJSONRecord],
+    batch_size: int
+) -> AsyncIterator[Tuple[NDJSONRecord, Optional[RoutingDecision]]]:
+    """Lê as linhas em grupos e roteia cada grupo em uma única passada do classificador."""
+    batch = []
+    exhausted = False
+    while not exhausted:
+        async for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                break
+        else:
+            exhausted = True
+        
+        valid = [
+            record for record in batch
+            if isinstance(record.data, dict) and isinstance(record.data.get("message"), str) and record.data["message"]
+        ]
+        decisions = dict(zip(
+            (record.line for record in valid),
+            bedrock_agent.route_batch([record.data["message"] for record in valid])
+        ))
+        for record in batch:
+            yield record, decisions.get(record.line)
+        batch = []
+
+async def process_bulk_record(record: NDJSONRecord, routing: Optional[RoutingDecision] = None) -> Dict[str, Any]:
+    """Processa uma linha do lote; erros viram um resultado, nunca abortam o lote."""
+    data = record.data if isinstance(record.data, dict) else {}
+    item_id = data.get("id", record.line)
+    
+    if record.error or not isinstance(record.data, dict):
+        error = record.error or "Cada linha deve ser um objeto JSON"
+        BULK_RECORDS.labels("invalid").inc()
+        return {"id": item_id, "line": record.line, "success": False, "error": error}
+    
+    message = data.get("message")
+    if not message or not isinstance(message, str):
+        BULK_RECORDS.labels("invalid").inc()
+        return {"id": item_id, "line": record.line, "success": False, "error": "Campo 'message' é obrigatório"}
+    
+    # Cada item tem prazo próprio (o lote inteiro pode durar minutos)
+    token = set_deadline(settings.n8n_bulk_item_timeout_seconds)
+    try:
+        result = await inflight_registry.run(
+            bedrock_agent.process_with_best_agent(
+                message, data.get("context") or {}, routing=routing, source="n8n"
+            ),
+            route="webhooks.n8n_bulk",
+            metadata={"source": "n8n", "id": item_id}
+        )
+    except Exception as e:
+        # Inclui timeout (DeadlineExceededError) e cancelamento administrativo
+        result = {"success": False, "error": str(e)}
+    finally:
+        reset_deadline(token)
+    
+    BULK_RECORDS.labels("success" if result["success"] else "error").inc()
+    if result["success"]:
+        return {
+            "id": item_id,
+            "line": record.line,
+            "success": True,
+            "response": result["response"],
+            "agent_used": result.get("selected_agent"),
+            "confidence": result.get("confidence_score")
+        }
+    return {"id": item_id, "line": record.line, "success": False, "error": result.get("error", "Erro desconhecido")}
+
+@router.post("/n8n/bulk")
+async def n8n_bulk_webhook(request: Request) -> DuplexStreamingResponse:
+    """
+    Lote NDJSON do N8N: uma linha {"id", "message", "context"} por lead.
+    
+    As linhas são processadas com paralelismo limitado e os resultados
+    voltam em NDJSON conforme terminam (fora de ordem, marcados com o id de
+    entrada), seguidos de uma linha final de resumo.
+    """
+    upload = UploadStream(request.receive)
+    records = iter_ndjson(upload, settings.n8n_bulk_max_line_bytes)
+    # Roteamento em grupos do tamanho do paralelismo (um grupo adiantado em memória)
+    items = routed_records(records, settings.n8n_bulk_concurrency)
+    
+    async def process_item(item: Tuple[NDJSONRecord, Optional[RoutingDecision]]) -> Dict[str, Any]:
+        return await process_bulk_record(*item)
+    
+    async def results() -> AsyncIterator[bytes]:
+        totals = {"total": 0, "succeeded": 0, "failed": 0}
+        try:
+            async for result in bounded_as_completed(
+                items, process_item, settings.n8n_bulk_concurrency
+            ):
+                totals["total"] += 1
+                totals["succeeded" if result["success"] else "failed"] += 1
+                yield ndjson_line(result)
+        except ClientDisconnect:
+            # Cliente foi embora no meio do upload: workers pendentes já foram cancelados
+            return
+        yield ndjson_line({"done": True, **totals})
+    
+    # Depois do upload, a desconexão do cliente cancela o envio e os workers pendentes
+    return DuplexStreamingResponse(results(), upload=upload, media_type=NDJSON_MEDIA_TYPE)
+
 @router.post("/test", response_model=WebhookResponse)
-async def test_webhook(request: WebhookRequest):
+async def test_webhook(request: WebhookRequest, http_request: Request) -> WebhookResponse:
     """Webhook de teste para validação."""
     try:
         if not request.message:
             raise HTTPException(status_code=400, detail="Campo 'message' é obrigatório")
         
         # Processa com melhor agente
-        result = await bedrock_agent.process_with_best_agent(
-            request.message, 
-            request.context
+        result = await inflight_registry.run(
+            bedrock_agent.process_with_best_agent(
+                request.message, 
+                request.context,
+                source="test"
+            ),
+            route="webhooks.test",
+            request=http_request,
+            metadata={"source": "test"}
         )
         
         if result["success"]:
             return WebhookResponse(
                 success=True,
                 response=result["response"],
-                agent_used=result.get("selected_agent")
+                agent_used=result.get("selected_agent"),
+                confidence=result.get("confidence_score")
             )
         else:
             return WebhookResponse(
@@ -163,6 +364,8 @@ async def test_webhook(request: WebhookRequest):
                 error=result.get("error", "Erro desconhecido")
             )
         
+    except (HTTPException, CallCancelledError, DeadlineExceededError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -174,6 +377,10 @@ async def chatwoot_status():
         "base_url": settings.chatwoot_base_url,
         "account_id": settings.chatwoot_account_id,
         "hmac_secret_configured": bool(settings.chatwoot_hmac_secret),
+        "reply_delivery": {
+            "enabled": settings.chatwoot_reply_enabled and chatwoot_client.enabled,
+            **chatwoot_client.status()
+        },
         "webhook_url": "/api/v1/webhooks/chatwoot"
     }
 
@@ -183,5 +390,7 @@ async def n8n_status():
     return {
         "enabled": bool(settings.n8n_api_key),
         "base_url": settings.n8n_base_url,
-        "webhook_url": "/api/v1/webhooks/n8n"
+        "webhook_url": "/api/v1/webhooks/n8n",
+        "bulk_webhook_url": "/api/v1/webhooks/n8n/bulk",
+        "bulk_concurrency": settings.n8n_bulk_concurrency
     }
@@ -0,0 +1,174 @@
+"""
+CLI MrDom SDR (mrdom-sdr)
+
+    mrdom-sdr replay conversas.jsonl --output resultados.jsonl --model fake
+    mrdom-sdr train --since-days 90
+    mrdom-sdr partitions --dry-run
+    mrdom-sdr rollups
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def print_json(payload: Any) -> None:
+    print(json.dumps(payload, indent=2, ensure_ascii=False, default=str))
+
+
+def cmd_replay(args: argparse.Namespace) -> int:
+    from .agents.fake_model import FakeModel
+    from .evaluation.replay import build_runner, replay_file
+
+    runner = build_runner(
+        args.model,
+        agents_config=args.agents_config,
+        workers=args.workers,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        include_responses=args.include_responses,
+        fake_model=FakeModel(time_scale=args.fake_time_scale),
+        classifier_path=args.classifier
+    )
+    report = asyncio.run(replay_file(args.input, runner, args.output, args.limit))
+
+    if args.summary:
+        args.summary.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print_json(report)
+    return 1 if report["messages"] == 0 else 0
+
+
+def cmd_train(args: argparse.Namespace) -> int:
+    from .agents.classifier import IntentClassifier
+    from .agents.classifier_training import fetch_interactions, read_corpus, select_examples
+    from .agents.registry import AgentRegistry, read_config
+    from .core.config import settings
+    from .core.database import close_pool
+
+    async def fetch() -> List[Tuple[str, str]]:
+        try:
+            return await fetch_interactions(args.since_days, args.limit)
+        finally:
+            await close_pool()
+
+    examples = []
+    if not args.skip_db:
+        examples.extend(asyncio.run(fetch()))
+    for corpus in args.corpus:
+        examples.extend(read_corpus(corpus))
+
+    _, _, definitions = read_config(AgentRegistry(args.agents_config).path)
+    texts, labels, dropped = select_examples(examples, [definition.agent_type for definition in definitions])
+    try:
+        classifier, report = IntentClassifier.fit(
+            texts, labels, feature_bits=args.feature_bits, epochs=args.epochs
+        )
+    except ValueError as e:
+        print(f"Treino não realizado ({len(texts)} exemplos): {e}", file=sys.stderr)
+        return 1
+    report["dropped_labels"] = dropped
+
+    output = args.output or Path(settings.intent_classifier_path)
+    accuracy = report.get("accuracy")
+    report["saved"] = accuracy is None or accuracy >= args.min_accuracy
+    if report["saved"]:
+        classifier.save(output)
+        report["output"] = str(output)
+    print_json(report)
+    return 0 if report["saved"] else 1
+
+
+def cmd_partitions(args: argparse.Namespace) -> int:
+    from .core.database import close_pool
+    from .maintenance.partitions import PartitionMaintenance
+
+    async def run() -> Dict[str, Any]:
+        try:
+            return await PartitionMaintenance().run(dry_run=args.dry_run)
+        finally:
+            await close_pool()
+
+    print_json(asyncio.run(run()))
+    return 0
+
+
+def cmd_rollups(args: argparse.Namespace) -> int:
+    from .analytics.rollups import rollup_pipeline
+    from .core.database import close_pool
+
+    async def run() -> Dict[str, Any]:
+        try:
+            return await rollup_pipeline.run_once()
+        finally:
+            await close_pool()
+
+    print_json(asyncio.run(run()))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="mrdom-sdr", description="MrDom SDR AgentOS + Bedrock")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay = commands.add_parser(
+        "replay",
+        help="Replay offline de conversas gravadas (JSONL) pelo roteamento e agentes"
+    )
+    replay.add_argument("input", type=Path, help="Corpus JSONL de conversas")
+    replay.add_argument("--output", "-o", type=Path, help="Resultados por mensagem (JSONL)")
+    replay.add_argument("--summary", type=Path, help="Grava também o resumo agregado (JSON)")
+    replay.add_argument("--model", choices=("fake", "bedrock"), default="fake")
+    replay.add_argument("--agents-config", help="Definições de agentes (padrão: AGENTS_CONFIG_PATH)")
+    replay.add_argument("--workers", type=int, help="Processos para os estágios de CPU (0 = no processo atual)")
+    replay.add_argument("--concurrency", type=int, default=16, help="Chamadas simultâneas ao modelo")
+    replay.add_argument("--batch-size", type=int, default=64)
+    replay.add_argument("--limit", type=int, help="Número máximo de mensagens")
+    replay.add_argument("--include-responses", action="store_true", help="Inclui o texto gerado nos resultados")
+    replay.add_argument("--classifier", type=Path, help="Modelo de intenção (.npz); sem ele, palavras-chave")
+    replay.add_argument(
+        "--fake-time-scale", type=float, default=1.0,
+        help="Escala da latência sintética do modelo falso (0 = sem espera)"
+    )
+    replay.set_defaults(handler=cmd_replay)
+
+    train = commands.add_parser(
+        "train",
+        help="Treina o classificador de intenção com agent_interactions e/ou corpora rotulados"
+    )
+    train.add_argument("--output", "-o", type=Path, help="Arquivo .npz (padrão: INTENT_CLASSIFIER_PATH)")
+    train.add_argument(
+        "--corpus", type=Path, action="append", default=[],
+        help="Corpus JSONL no formato do replay, com expected_agent (pode repetir)"
+    )
+    train.add_argument("--skip-db", action="store_true", help="Não lê agent_interactions")
+    train.add_argument("--since-days", type=int, help="Apenas interações dos últimos N dias")
+    train.add_argument("--limit", type=int, default=200000, help="Máximo de interações lidas do banco")
+    train.add_argument("--agents-config", help="Definições de agentes (padrão: AGENTS_CONFIG_PATH)")
+    train.add_argument("--epochs", type=int, default=8)
+    train.add_argument("--feature-bits", type=int, default=18, help="Espaço de hashing = 2^N features")
+    train.add_argument(
+        "--min-accuracy", type=float, default=0.0,
+        help="Não grava o modelo se a acurácia na validação ficar abaixo deste valor"
+    )
+    train.set_defaults(handler=cmd_train)
+
+    partitions = commands.add_parser("partitions", help="Manutenção de partições (criação/retenção)")
+    partitions.add_argument("--dry-run", action="store_true", help="Apenas lista o que seria feito")
+    partitions.set_defaults(handler=cmd_partitions)
+
+    rollups = commands.add_parser("rollups", help="Executa um ciclo dos rollups de analytics")
+    rollups.set_defaults(handler=cmd_rollups)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
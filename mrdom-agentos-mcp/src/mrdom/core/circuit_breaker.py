@@ -0,0 +1,228 @@
+"""
+Circuit breaker por provedor/modelo
+
+closed: chamadas passam; `failure_threshold` falhas consecutivas abrem o
+circuito. open: chamadas são rejeitadas imediatamente (CircuitOpenError)
+até `reset_timeout_seconds`. half_open: até `half_open_max_calls` chamadas
+de teste passam; sucesso fecha o circuito, falha o reabre.
+
+Só erros do provedor contam como falha: throttling, 5xx, erros de
+transporte e timeouts com orçamento razoável. Erros da requisição (4xx,
+validação, prompt grande demais) e bugs da aplicação não abrem o circuito.
+"""
+
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+try:
+    from botocore.exceptions import ConnectionError as BotocoreConnectionError
+    from botocore.exceptions import HTTPClientError
+except ImportError:  # pragma: no cover - SDK AWS ausente
+    TRANSPORT_ERRORS: Tuple[type, ...] = (ConnectionError, TimeoutError)
+else:
+    TRANSPORT_ERRORS = (ConnectionError, TimeoutError, BotocoreConnectionError, HTTPClientError)
+
+from .config import settings
+from .deadline import DeadlineExceededError
+from .metrics import CIRCUIT_REJECTED, CIRCUIT_STATE, CIRCUIT_TRANSITIONS
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Valor exportado no gauge mrdom_circuit_state
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Chamada rejeitada sem tentar o provedor (circuito aberto)."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuito '{name}' aberto (nova tentativa em {retry_after:.1f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+# Códigos de erro do Bedrock (botocore ClientError) que indicam o provedor indisponível
+PROVIDER_ERROR_CODES = frozenset({
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "InternalServerException",
+    "ModelNotReadyException",
+    "ModelTimeoutException"
+})
+
+
+def _provider_verdict(error: BaseException) -> Optional[bool]:
+    """Veredito de um erro isolado; None se ele não diz nada sobre o provedor."""
+    if isinstance(error, TRANSPORT_ERRORS):
+        return True
+    response = getattr(error, "response", None)
+    if isinstance(response, dict):
+        # botocore ClientError: código do erro e status HTTP da resposta
+        code = response.get("Error", {}).get("Code")
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        if code in PROVIDER_ERROR_CODES:
+            return True
+        return isinstance(status, int) and (status == 429 or status >= 500)
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return None
+
+
+def default_is_failure(error: BaseException) -> bool:
+    """Quais erros contam contra o provedor."""
+    if isinstance(error, DeadlineExceededError):
+        # Timeout só conta se o provedor teve um orçamento razoável (não um prazo já curto)
+        return error.budget >= settings.circuit_breaker_slow_call_seconds
+    # Cancelamentos (cliente desconectou, shutdown) não dizem nada sobre o provedor
+    if not isinstance(error, Exception):
+        return False
+    # O SDK do modelo encapsula o erro do botocore (raise ... from e): a causa
+    # original tem precedência sobre o status genérico do invólucro
+    chain: List[BaseException] = []
+    current: Optional[BaseException] = error
+    while current is not None and current not in chain:
+        chain.append(current)
+        current = current.__cause__
+    for cause in reversed(chain):
+        verdict = _provider_verdict(cause)
+        if verdict is not None:
+            return verdict
+    return False
+
+
+class CircuitBreaker:
+    """Estado do circuito de um provedor/modelo."""
+
+    def __init__(
+        self,
+        provider: str,
+        model: str,
+        failure_threshold: Optional[int] = None,
+        reset_timeout_seconds: Optional[float] = None,
+        half_open_max_calls: Optional[int] = None,
+        is_failure: Callable[[BaseException], bool] = default_is_failure
+    ):
+        self.provider = provider
+        self.model = model
+        self.failure_threshold = failure_threshold or settings.circuit_breaker_failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds or settings.circuit_breaker_reset_timeout_seconds
+        self.half_open_max_calls = half_open_max_calls or settings.circuit_breaker_half_open_max_calls
+        self.is_failure = is_failure
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.half_open_calls = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+        CIRCUIT_STATE.labels(provider, model).set(STATE_VALUES[CLOSED])
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        self.state = state
+        CIRCUIT_STATE.labels(self.provider, self.model).set(STATE_VALUES[state])
+        CIRCUIT_TRANSITIONS.labels(self.provider, self.model, state).inc()
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        if state != HALF_OPEN:
+            self.half_open_calls = 0
+
+    def retry_after(self) -> float:
+        if self.state != OPEN or self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        """Reserva a passagem de uma chamada (conta como teste em half_open)."""
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                return False
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self.half_open_calls >= self.half_open_max_calls:
+                return False
+            self.half_open_calls += 1
+        return True
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self._transition(CLOSED)
+
+    def record_failure(self, error: Optional[BaseException] = None) -> None:
+        self.consecutive_failures += 1
+        if error is not None:
+            self.last_error = str(error)
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._transition(OPEN)
+            # Reabertura reinicia a janela de espera
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Chamada encerrada sem veredito (cancelada): libera a vaga de teste."""
+        if self.state == HALF_OPEN and self.half_open_calls > 0:
+            self.half_open_calls -= 1
+
+    async def call(self, factory: Callable[[], Awaitable[T]]) -> T:
+        """Executa factory() sob o circuito; a coroutine só é criada se permitida."""
+        if not self.allow():
+            self.rejected += 1
+            CIRCUIT_REJECTED.labels(self.provider, self.model).inc()
+            raise CircuitOpenError(self.name, self.retry_after())
+
+        try:
+            result = await factory()
+        except BaseException as e:
+            if self.is_failure(e):
+                self.record_failure(e)
+            else:
+                self.release()
+            raise
+        self.record_success()
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after_seconds": round(self.retry_after(), 3),
+            "rejected": self.rejected,
+            "last_error": self.last_error
+        }
+
+
+class CircuitBreakerRegistry:
+    """Um circuito por (provedor, modelo), criado no primeiro uso."""
+
+    def __init__(self) -> None:
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+    def get(self, provider: str, model: str) -> CircuitBreaker:
+        key = (provider, model)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(provider, model)
+        return breaker
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [breaker.to_dict() for breaker in self._breakers.values()]
+
+    @property
+    def any_open(self) -> bool:
+        return any(breaker.state == OPEN for breaker in self._breakers.values())
+
+
+# Instância global compartilhada por todos os agentes do processo
+circuit_breakers = CircuitBreakerRegistry()
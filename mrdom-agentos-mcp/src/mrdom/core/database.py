@@ -0,0 +1,48 @@
+"""
+Pool de conexões PostgreSQL (asyncpg)
+"""
+
+import asyncio
+import json
+from typing import Optional
+
+import asyncpg
+
+from .config import settings
+
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    """Decodifica JSON/JSONB como objetos Python."""
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name,
+            encoder=json.dumps,
+            decoder=json.loads,
+            schema="pg_catalog"
+        )
+
+
+async def get_pool() -> asyncpg.Pool:
+    """Retorna o pool global, criando-o na primeira chamada."""
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await asyncpg.create_pool(
+                    settings.database_url,
+                    min_size=settings.database_pool_min_size,
+                    max_size=settings.database_pool_max_size,
+                    init=_init_connection
+                )
+    return _pool
+
+
+async def close_pool() -> None:
+    """Fecha o pool global (shutdown da aplicação)."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
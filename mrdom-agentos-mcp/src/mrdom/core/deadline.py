@@ -0,0 +1,159 @@
+"""
+Deadline por requisição com orçamento por estágio
+
+O middleware define o prazo da requisição (header X-Request-Timeout ou
+padrão da rota) em uma contextvar. Cada estágio (roteamento pelo
+classificador, fila do scheduler, chamada ao modelo, health checks) consome
+o tempo restante: estágios síncronos verificam o prazo antes de executar e
+estágios assíncronos rodam sob asyncio.wait_for com o orçamento restante.
+Prazo esgotado vira DeadlineExceededError (HTTP 504) em vez de uma
+requisição presa.
+"""
+
+import asyncio
+import time
+from contextvars import ContextVar, Token
+from typing import Awaitable, Dict, Optional, TypeVar
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .config import settings
+from .metrics import DEADLINE_EXCEEDED, REQUEST_STAGE_SECONDS
+
+T = TypeVar("T")
+
+
+class DeadlineExceededError(Exception):
+    """O prazo da requisição se esgotou durante (ou antes de) um estágio."""
+
+    def __init__(self, stage: str, budget: float):
+        super().__init__(f"Prazo esgotado no estágio '{stage}' (orçamento {budget:.3f}s)")
+        self.stage = stage
+        self.budget = budget
+
+
+class Deadline:
+    """Instante limite (relógio monotônico) de uma requisição."""
+
+    def __init__(self, timeout_seconds: float):
+        self.timeout_seconds = timeout_seconds
+        self.expires_at = time.monotonic() + timeout_seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("mrdom_deadline", default=None)
+
+# Timeouts por estágio desde o início do processo (espelha DEADLINE_EXCEEDED)
+stage_timeouts: Dict[str, int] = {}
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def set_deadline(timeout_seconds: float) -> Token:
+    """Define o prazo do contexto atual; retorna o token para reset."""
+    return _current_deadline.set(Deadline(timeout_seconds))
+
+
+def reset_deadline(token: Token) -> None:
+    _current_deadline.reset(token)
+
+
+def route_timeout(path: str) -> float:
+    """Timeout padrão da rota: prefixo mais longo em REQUEST_TIMEOUT_ROUTES."""
+    matches = [prefix for prefix in settings.request_timeout_routes if path.startswith(prefix)]
+    if not matches:
+        return settings.request_timeout_seconds
+    return float(settings.request_timeout_routes[max(matches, key=len)])
+
+
+def parse_timeout_header(value: Optional[str]) -> Optional[float]:
+    """Segundos informados pelo cliente, limitados a REQUEST_TIMEOUT_MAX_SECONDS."""
+    if not value:
+        return None
+    try:
+        timeout = float(value)
+    except ValueError:
+        return None
+    if timeout <= 0:
+        return None
+    return min(timeout, settings.request_timeout_max_seconds)
+
+
+def record_timeout(stage: str) -> None:
+    DEADLINE_EXCEEDED.labels(stage).inc()
+    stage_timeouts[stage] = stage_timeouts.get(stage, 0) + 1
+
+
+def stage_budget(cap: Optional[float] = None, reserve: float = 0.0) -> Optional[float]:
+    """
+    Orçamento do próximo estágio: tempo restante menos a reserva para montar a
+    resposta, limitado por cap. None quando não há prazo nem cap.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return cap
+    budget = max(0.0, deadline.remaining() - reserve)
+    return min(budget, cap) if cap is not None else budget
+
+
+def check_deadline(stage: str) -> None:
+    """Falha rápido se o prazo já se esgotou (estágios síncronos)."""
+    deadline = current_deadline()
+    if deadline is not None and deadline.expired:
+        record_timeout(stage)
+        raise DeadlineExceededError(stage, 0.0)
+
+
+async def run_stage(
+    stage: str,
+    awaitable: Awaitable[T],
+    cap: Optional[float] = None,
+    reserve: float = 0.0
+) -> T:
+    """Executa um estágio assíncrono dentro do orçamento restante."""
+    budget = stage_budget(cap, reserve)
+    if budget is not None and budget <= 0:
+        # Não inicia trabalho que já não cabe no prazo
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        record_timeout(stage)
+        raise DeadlineExceededError(stage, 0.0)
+
+    started = time.monotonic()
+    try:
+        return await asyncio.wait_for(awaitable, timeout=budget)
+    except asyncio.TimeoutError:
+        record_timeout(stage)
+        raise DeadlineExceededError(stage, budget) from None
+    finally:
+        REQUEST_STAGE_SECONDS.labels(stage).observe(time.monotonic() - started)
+
+
+class DeadlineMiddleware:
+    """Middleware ASGI que define o prazo de cada requisição HTTP."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header = settings.deadline_header.lower().encode()
+        value = next((v.decode("latin-1") for k, v in scope["headers"] if k == header), None)
+        timeout = parse_timeout_header(value) or route_timeout(scope["path"])
+
+        token = set_deadline(timeout)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            reset_deadline(token)
@@ -0,0 +1,197 @@
+"""
+Registro de chamadas de agente em andamento com cancelamento
+
+Cada chamada roda em uma task própria. Nas rotas de
+INFLIGHT_CANCEL_ON_DISCONNECT_ROUTES a conexão HTTP é verificada
+periodicamente: se o cliente desconectar (timeout do N8N) a task é
+cancelada, liberando a chamada ao modelo em vez de produzir uma resposta
+que ninguém vai ler. Chamadas com a mesma chave (ex.: retry do Chatwoot da
+mesma mensagem) são coalescidas: o retry aguarda a chamada já em andamento,
+que só é cancelada por desconexão quando todos os interessados desconectam.
+Chamadas também podem ser listadas e canceladas pelo endpoint administrativo.
+"""
+
+import asyncio
+import inspect
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Dict, List, Optional, TypeVar
+
+from starlette.requests import Request
+
+from .config import settings
+from .metrics import (
+    AGENT_CALL_CANCELLED_SECONDS,
+    AGENT_CALLS_CANCELLED,
+    AGENT_CALLS_COALESCED,
+    AGENT_CALLS_INFLIGHT,
+)
+
+T = TypeVar("T")
+
+CANCEL_CLIENT_DISCONNECT = "client_disconnect"
+CANCEL_ADMIN = "admin"
+
+
+class CallCancelledError(Exception):
+    """A chamada foi cancelada (cliente desconectou ou cancelamento administrativo)."""
+
+    def __init__(self, call_id: str, reason: str):
+        super().__init__(f"Chamada {call_id} cancelada: {reason}")
+        self.call_id = call_id
+        self.reason = reason
+
+
+@dataclass
+class InflightCall:
+    call_id: str
+    route: str
+    task: asyncio.Task
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    key: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+    cancel_reason: Optional[str] = None
+    # Requisições aguardando a chamada e quantas delas já desconectaram
+    attached: int = 0
+    disconnected: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "call_id": self.call_id,
+            "route": self.route,
+            "started_at": self.started_at,
+            "elapsed_seconds": time.time() - self.started_at,
+            "cancelling": self.cancel_reason is not None,
+            "attached": self.attached,
+            "metadata": self.metadata
+        }
+
+
+class InflightRegistry:
+    """Chamadas em andamento neste processo."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, InflightCall] = {}
+        self._keys: Dict[str, InflightCall] = {}
+        self.cancelled_counts: Dict[str, int] = {}
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [call.to_dict() for call in self._calls.values()]
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def find(self, key: str) -> Optional[InflightCall]:
+        """Chamada em andamento com a chave, se houver."""
+        call = self._keys.get(key)
+        if call is None or call.task.done():
+            return None
+        return call
+
+    def cancel(self, call_id: str, reason: str = CANCEL_ADMIN) -> bool:
+        """Cancela a chamada; retorna False se ela não existe (ou já terminou)."""
+        call = self._calls.get(call_id)
+        if call is None or call.task.done():
+            return False
+        if call.cancel_reason is None:
+            call.cancel_reason = reason
+        call.task.cancel()
+        return True
+
+    def _start(
+        self,
+        awaitable: Awaitable[Any],
+        route: str,
+        metadata: Optional[Dict[str, Any]],
+        key: Optional[str]
+    ) -> InflightCall:
+        call = InflightCall(
+            call_id=uuid.uuid4().hex,
+            route=route,
+            task=asyncio.ensure_future(awaitable),
+            metadata=metadata or {},
+            key=key
+        )
+        self._calls[call.call_id] = call
+        if key is not None:
+            self._keys[key] = call
+        AGENT_CALLS_INFLIGHT.labels(route).inc()
+        call.task.add_done_callback(lambda task: self._finish(call))
+        return call
+
+    def _finish(self, call: InflightCall) -> None:
+        """Fim da task (uma vez por chamada, independente de quantos aguardavam)."""
+        self._calls.pop(call.call_id, None)
+        if call.key is not None and self._keys.get(call.key) is call:
+            del self._keys[call.key]
+        AGENT_CALLS_INFLIGHT.labels(call.route).dec()
+        if call.task.cancelled() and call.cancel_reason is not None:
+            reason = call.cancel_reason
+            AGENT_CALLS_CANCELLED.labels(call.route, reason).inc()
+            AGENT_CALL_CANCELLED_SECONDS.labels(call.route, reason).observe(time.time() - call.started_at)
+            self.cancelled_counts[reason] = self.cancelled_counts.get(reason, 0) + 1
+
+    async def _watch_disconnect(self, request: Request, call: InflightCall) -> bool:
+        """Conta a desconexão do cliente; cancela quando ninguém mais aguarda a chamada."""
+        while not call.task.done():
+            if await request.is_disconnected():
+                call.disconnected += 1
+                if call.disconnected >= call.attached:
+                    self.cancel(call.call_id, CANCEL_CLIENT_DISCONNECT)
+                return True
+            await asyncio.sleep(settings.disconnect_poll_interval_seconds)
+        return False
+
+    async def run(
+        self,
+        awaitable: Awaitable[T],
+        route: str,
+        request: Optional[Request] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        key: Optional[str] = None
+    ) -> T:
+        """
+        Executa a chamada registrada e cancelável.
+
+        Com `key`, uma chamada em andamento com a mesma chave é reaproveitada
+        (o `awaitable` novo é descartado). A desconexão de `request` só é
+        observada se `route` está em INFLIGHT_CANCEL_ON_DISCONNECT_ROUTES.
+
+        Levanta CallCancelledError se for cancelada pelo registro; um
+        cancelamento externo (ex.: shutdown) é propagado normalmente.
+        """
+        call = self.find(key) if key is not None else None
+        if call is None:
+            call = self._start(awaitable, route, metadata, key)
+        else:
+            if inspect.iscoroutine(awaitable):
+                awaitable.close()
+            AGENT_CALLS_COALESCED.labels(route).inc()
+        call.attached += 1
+        watcher = (
+            asyncio.create_task(self._watch_disconnect(request, call))
+            if request is not None and route in settings.inflight_cancel_on_disconnect_routes
+            else None
+        )
+
+        try:
+            # shield: o cancelamento de um interessado não derruba a chamada dos demais
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.task.cancelled() and call.cancel_reason is not None:
+                raise CallCancelledError(call.call_id, call.cancel_reason)
+            if not call.task.done() and call.attached == 1:
+                # Cancelamento externo do único interessado: a chamada não tem mais leitor
+                call.task.cancel()
+            raise
+        finally:
+            call.attached -= 1
+            if watcher is not None:
+                watcher.cancel()
+                if watcher.done() and not watcher.cancelled() and watcher.result():
+                    call.disconnected -= 1
+
+
+# Instância global compartilhada entre as rotas
+inflight_registry = InflightRegistry()
@@ -0,0 +1,171 @@
+"""
+Logging estruturado (structlog) com correlation ID e escrita não bloqueante
+
+Todos os logs (structlog e logging da stdlib, incluindo uvicorn) passam por
+um QueueHandler: a thread do event loop apenas enfileira o registro e uma
+QueueListener faz a formatação JSON e a escrita. A fila é limitada; se
+encher, registros são descartados (e contados) em vez de bloquear.
+
+Sob carga, logs verbosos (abaixo de WARNING) emitidos dentro de uma
+requisição são amostrados por requisição: ou a requisição loga tudo, ou não
+loga nada verboso, mantendo cada trace completo.
+"""
+
+import logging
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+import structlog
+from asgi_correlation_id.context import correlation_id
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .config import settings
+
+# None = fora de requisição (startup, jobs); True/False = decisão da requisição
+_verbose_sampled: ContextVar[Optional[bool]] = ContextVar("mrdom_log_verbose_sampled", default=None)
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Enfileira sem bloquear e sem formatar na thread de quem loga."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Contextvars só existem na thread de origem: captura o correlation ID aqui
+        record.request_id = correlation_id.get()
+        if not isinstance(record.msg, dict):
+            # Registros da stdlib: resolve os args agora (objetos podem mudar depois)
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class VerboseSamplingFilter(logging.Filter):
+    """Descarta logs verbosos de requisições não amostradas."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        return _verbose_sampled.get() is not False
+
+
+def add_request_id(logger: Any, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    record = event_dict.get("_record")
+    request_id = getattr(record, "request_id", None)
+    if request_id:
+        event_dict.setdefault("request_id", request_id)
+    return event_dict
+
+
+def configure_logging() -> None:
+    """Configura structlog + stdlib uma única vez por processo."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    timestamper = structlog.processors.TimeStamper(fmt="iso", utc=True)
+    renderer = (
+        structlog.processors.JSONRenderer(ensure_ascii=False)
+        if settings.log_format == "json"
+        else structlog.dev.ConsoleRenderer(colors=False)
+    )
+
+    structlog.configure(
+        processors=[
+            structlog.contextvars.merge_contextvars,
+            structlog.stdlib.filter_by_level,
+            structlog.stdlib.add_logger_name,
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.PositionalArgumentsFormatter(),
+            timestamper,
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+        ],
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True,
+    )
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(structlog.stdlib.ProcessorFormatter(
+        foreign_pre_chain=[
+            structlog.stdlib.add_logger_name,
+            structlog.stdlib.add_log_level,
+            timestamper,
+        ],
+        processors=[
+            add_request_id,
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            structlog.processors.format_exc_info,
+            renderer,
+        ],
+    ))
+
+    _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.log_queue_max_size))
+    _queue_handler.addFilter(VerboseSamplingFilter())
+
+    root = logging.getLogger()
+    root.handlers = [_queue_handler]
+    root.setLevel(settings.log_level.upper())
+    # uvicorn passa a usar o handler da raiz
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).handlers = []
+        logging.getLogger(name).propagate = True
+
+    _listener = QueueListener(_queue_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Esvazia a fila e para a thread de escrita (shutdown da aplicação)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_log_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+class LogSamplingMiddleware:
+    """
+    Decide por requisição se logs verbosos serão emitidos: abaixo de
+    LOG_SAMPLING_LOAD_THRESHOLD requisições ativas tudo é logado; acima,
+    apenas LOG_VERBOSE_SAMPLE_RATE das requisições.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.active_requests = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.log_sampling_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        self.active_requests += 1
+        sampled = (
+            self.active_requests <= settings.log_sampling_load_threshold
+            or random.random() < settings.log_verbose_sample_rate
+        )
+        token = _verbose_sampled.set(sampled)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _verbose_sampled.reset(token)
+            self.active_requests -= 1
@@ -0,0 +1,147 @@
+"""
+Métricas Prometheus do MrDom SDR AgentOS + Bedrock
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Geração (tokens de saída x limite configurado)
+AGENT_OUTPUT_TOKENS = Histogram(
+    "mrdom_agent_output_tokens",
+    "Tokens de saída gerados por chamada ao modelo",
+    ["agent", "stage"],
+    buckets=(16, 32, 64, 128, 256, 384, 512, 768, 1024, 2048, 4096)
+)
+AGENT_OUTPUT_TOKEN_LIMIT_RATIO = Histogram(
+    "mrdom_agent_output_token_limit_ratio",
+    "Fração do max_tokens efetivamente usada por chamada",
+    ["agent", "stage"],
+    buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 1.0)
+)
+AGENT_OUTPUT_TRUNCATED = Counter(
+    "mrdom_agent_output_truncated_total",
+    "Respostas que atingiram o limite de max_tokens",
+    ["agent", "stage"]
+)
+
+# Chamadas de agente em andamento / canceladas
+AGENT_CALLS_INFLIGHT = Gauge(
+    "mrdom_agent_calls_inflight",
+    "Chamadas de agente em andamento",
+    ["route"]
+)
+AGENT_CALLS_CANCELLED = Counter(
+    "mrdom_agent_calls_cancelled_total",
+    "Chamadas de agente canceladas antes de concluir",
+    ["route", "reason"]
+)
+AGENT_CALL_CANCELLED_SECONDS = Histogram(
+    "mrdom_agent_call_cancelled_seconds",
+    "Tempo já gasto pelas chamadas canceladas",
+    ["route", "reason"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+AGENT_CALLS_COALESCED = Counter(
+    "mrdom_agent_calls_coalesced_total",
+    "Requisições atendidas por uma chamada de agente já em andamento (mesma chave)",
+    ["route"]
+)
+
+# Deadlines por requisição
+REQUEST_STAGE_SECONDS = Histogram(
+    "mrdom_request_stage_seconds",
+    "Duração dos estágios executados sob o deadline da requisição",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+DEADLINE_EXCEEDED = Counter(
+    "mrdom_deadline_exceeded_total",
+    "Requisições que esgotaram o prazo, por estágio",
+    ["stage"]
+)
+
+# Entrega de respostas ao Chatwoot
+CHATWOOT_REQUESTS = Counter(
+    "mrdom_chatwoot_requests_total",
+    "Requisições à API do Chatwoot por endpoint e status",
+    ["endpoint", "status"]
+)
+CHATWOOT_RETRIES = Counter(
+    "mrdom_chatwoot_retries_total",
+    "Retentativas de requisições ao Chatwoot (429/5xx/transporte)",
+    ["endpoint"]
+)
+CHATWOOT_REQUEST_SECONDS = Histogram(
+    "mrdom_chatwoot_request_seconds",
+    "Latência das requisições à API do Chatwoot",
+    ["endpoint"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+CHATWOOT_COALESCED = Counter(
+    "mrdom_chatwoot_coalesced_total",
+    "Envios absorvidos por coalescência (mensagens unidas, digitação descartada)",
+    ["kind"]
+)
+
+# Lotes NDJSON (/webhooks/n8n/bulk)
+BULK_RECORDS = Counter(
+    "mrdom_bulk_records_total",
+    "Linhas processadas pelo endpoint de lote, por resultado",
+    ["status"]
+)
+
+# Circuit breaker por provedor/modelo
+CIRCUIT_STATE = Gauge(
+    "mrdom_circuit_state",
+    "Estado do circuito (0 = closed, 1 = half_open, 2 = open)",
+    ["provider", "model"]
+)
+CIRCUIT_TRANSITIONS = Counter(
+    "mrdom_circuit_transitions_total",
+    "Transições de estado do circuito",
+    ["provider", "model", "state"]
+)
+CIRCUIT_REJECTED = Counter(
+    "mrdom_circuit_rejected_total",
+    "Chamadas rejeitadas com o circuito aberto",
+    ["provider", "model"]
+)
+DEGRADED_RESPONSES = Counter(
+    "mrdom_degraded_responses_total",
+    "Respostas servidas sem o modelo (cache ou resposta padrão)",
+    ["agent", "reason", "source"]
+)
+
+# Roteamento (classificador de intenção x palavras-chave)
+ROUTING_DECISIONS = Counter(
+    "mrdom_routing_decisions_total",
+    "Agentes escolhidos por método de roteamento",
+    ["agent", "method"]
+)
+ROUTING_CONFIDENCE = Histogram(
+    "mrdom_routing_confidence",
+    "Confiança calibrada do agente escolhido (com classificador carregado)",
+    ["method"],
+    buckets=(0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0)
+)
+
+# Fila de prioridade das chamadas ao modelo
+MODEL_CALLS_ACTIVE = Gauge(
+    "mrdom_model_calls_active",
+    "Chamadas ao modelo ocupando vagas do scheduler"
+)
+MODEL_QUEUE_DEPTH = Gauge(
+    "mrdom_model_queue_depth",
+    "Chamadas esperando vaga por classe de prioridade",
+    ["priority"]
+)
+MODEL_QUEUE_WAIT_SECONDS = Histogram(
+    "mrdom_model_queue_wait_seconds",
+    "Espera na fila antes da chamada ao modelo por classe de prioridade",
+    ["priority"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+MODEL_QUEUE_AGED = Counter(
+    "mrdom_model_queue_aged_total",
+    "Chamadas atendidas por tempo de espera (aging) em vez do peso",
+    ["priority"]
+)
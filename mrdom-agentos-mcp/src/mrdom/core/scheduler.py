@@ -0,0 +1,257 @@
+"""
+Fila de prioridade das chamadas ao modelo
+
+No máximo `capacity` chamadas ao modelo rodam ao mesmo tempo no processo.
+Acima disso, cada chamada espera na fila do seu fluxo (agente, origem,
+status do lead). Os fluxos são atendidos por weighted fair queueing
+(stride scheduling): o peso do fluxo é o produto dos pesos configurados
+para agente, origem e status do lead, e um fluxo com o dobro do peso recebe
+o dobro das vagas enquanto houver disputa. Nenhum fluxo fica sem vaga:
+quem espera mais que `max_wait_seconds` passa na frente (aging), limitado
+a `aging_share` das vagas para que a saturação não vire FIFO.
+
+A espera na fila consome o prazo da requisição (estágio "queue").
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+from ..analytics.sketch import LatencySketch
+from .config import settings
+from .deadline import run_stage
+from .metrics import MODEL_CALLS_ACTIVE, MODEL_QUEUE_AGED, MODEL_QUEUE_DEPTH, MODEL_QUEUE_WAIT_SECONDS
+
+# Valores fora das tabelas de pesos (evita cardinalidade ilimitada de fluxos)
+OTHER = "other"
+UNKNOWN = "unknown"
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+@dataclass(frozen=True)
+class Priority:
+    """Fluxo de uma chamada e sua classe de prioridade."""
+
+    agent: str
+    source: str
+    lead_status: str
+    weight: float
+    # high | normal | low (limiares em MODEL_SCHEDULER_PRIORITY_TIERS)
+    tier: str
+
+    @property
+    def flow(self) -> Tuple[str, str, str]:
+        return self.agent, self.source, self.lead_status
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "agent": self.agent,
+            "source": self.source,
+            "lead_status": self.lead_status,
+            "weight": round(self.weight, 3),
+            "class": self.tier
+        }
+
+
+def _known(value: Optional[Any], weights: Dict[str, float]) -> str:
+    if value is None or value == "":
+        return UNKNOWN
+    value = str(value).lower()
+    return value if value in weights else OTHER
+
+
+def classify(agent_type: str, source: Optional[str] = None, context: Optional[Dict] = None) -> Priority:
+    """Prioridade a partir do agente escolhido, da origem e de context["lead_status"]."""
+    context = context or {}
+    agent_weights = settings.model_scheduler_agent_weights
+    source_weights = settings.model_scheduler_source_weights
+    lead_weights = settings.model_scheduler_lead_status_weights
+
+    source = _known(source or context.get("source"), source_weights)
+    lead_status = _known(context.get("lead_status"), lead_weights)
+    weight = (
+        float(agent_weights.get(agent_type, 1.0))
+        * float(source_weights.get(source, 1.0))
+        * float(lead_weights.get(lead_status, 1.0))
+    )
+
+    tier = "low"
+    # Limiares em ordem decrescente de peso mínimo
+    for name, minimum in sorted(settings.model_scheduler_priority_tiers.items(), key=lambda item: -item[1]):
+        if weight >= minimum:
+            tier = name
+            break
+    return Priority(agent_type, source, lead_status, max(weight, 1e-3), tier)
+
+
+@dataclass
+class _Waiter:
+    priority: Priority
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class _Flow:
+    """Fila FIFO de um fluxo com sua posição virtual (pass) no stride scheduling."""
+
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.waiters: Deque[_Waiter] = deque()
+        self.pass_value = 0.0
+
+
+class PriorityScheduler:
+    """Limita chamadas simultâneas ao modelo e ordena a espera por prioridade."""
+
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        max_wait_seconds: Optional[float] = None,
+        aging_share: Optional[float] = None
+    ):
+        self.capacity = capacity or settings.model_scheduler_capacity
+        self.max_wait_seconds = (
+            settings.model_scheduler_max_wait_seconds if max_wait_seconds is None else max_wait_seconds
+        )
+        self.aging_share = settings.model_scheduler_aging_share if aging_share is None else aging_share
+        self.active = 0
+        self._dispatched = 0
+        self._aged_dispatched = 0
+        self._flows: Dict[Tuple[str, str, str], _Flow] = {}
+        self._virtual_time = 0.0
+        self._waiting = 0
+        self._waiting_by_tier: Dict[str, int] = {}
+        self._wait_ms: Dict[str, LatencySketch] = {}
+        self._aged: Dict[str, int] = {}
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    def _record_wait(self, priority: Priority, seconds: float) -> None:
+        MODEL_QUEUE_WAIT_SECONDS.labels(priority.tier).observe(seconds)
+        sketch = self._wait_ms.get(priority.tier)
+        if sketch is None:
+            sketch = self._wait_ms[priority.tier] = LatencySketch()
+        sketch.add(seconds * 1000)
+
+    def _set_waiting(self, tier: str, delta: int) -> None:
+        self._waiting += delta
+        self._waiting_by_tier[tier] = self._waiting_by_tier.get(tier, 0) + delta
+        MODEL_QUEUE_DEPTH.labels(tier).set(self._waiting_by_tier[tier])
+
+    async def acquire(self, priority: Priority) -> float:
+        """Reserva uma vaga; retorna o tempo de espera na fila (segundos)."""
+        if self.active < self.capacity and not self._waiting:
+            self.active += 1
+            MODEL_CALLS_ACTIVE.set(self.active)
+            self._record_wait(priority, 0.0)
+            return 0.0
+
+        flow = self._flows.get(priority.flow)
+        if flow is None:
+            flow = self._flows[priority.flow] = _Flow(priority.weight)
+        flow.weight = priority.weight
+        if not flow.waiters:
+            # Fluxo que volta a disputar não acumula crédito do tempo ocioso
+            flow.pass_value = max(flow.pass_value, self._virtual_time)
+
+        waiter = _Waiter(priority, asyncio.get_running_loop().create_future(), time.monotonic())
+        flow.waiters.append(waiter)
+        self._set_waiting(priority.tier, 1)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Vaga concedida junto com o cancelamento: devolve
+                self.release()
+            elif waiter in flow.waiters:
+                flow.waiters.remove(waiter)
+                self._set_waiting(priority.tier, -1)
+            # Fora da fila: _dispatch já descartou o waiter cancelado
+            raise
+        return time.monotonic() - waiter.enqueued_at
+
+    def release(self) -> None:
+        self.active -= 1
+        self._dispatch()
+        MODEL_CALLS_ACTIVE.set(self.active)
+
+    def _discard_cancelled(self, flow: _Flow) -> None:
+        """Remove da frente da fila waiters cancelados cujo except ainda não rodou."""
+        while flow.waiters and flow.waiters[0].future.done():
+            waiter = flow.waiters.popleft()
+            self._set_waiting(waiter.priority.tier, -1)
+
+    def _next_flow(self) -> Tuple[Optional[_Flow], bool]:
+        """Próximo fluxo a receber vaga e se a escolha foi por aging."""
+        for flow in self._flows.values():
+            self._discard_cancelled(flow)
+        backlogged = [flow for flow in self._flows.values() if flow.waiters]
+        if not backlogged:
+            return None, False
+        self._dispatched += 1
+        if self._aged_dispatched < self.aging_share * self._dispatched:
+            oldest = min(backlogged, key=lambda flow: flow.waiters[0].enqueued_at)
+            head = oldest.waiters[0]
+            if time.monotonic() - head.enqueued_at >= self.max_wait_seconds:
+                self._aged_dispatched += 1
+                self._aged[head.priority.tier] = self._aged.get(head.priority.tier, 0) + 1
+                MODEL_QUEUE_AGED.labels(head.priority.tier).inc()
+                return oldest, True
+        return min(backlogged, key=lambda flow: flow.pass_value), False
+
+    def _dispatch(self) -> None:
+        while self.active < self.capacity:
+            flow, aged = self._next_flow()
+            if flow is None:
+                return
+            waiter = flow.waiters.popleft()
+            if not aged:
+                # Tempo virtual = pass do último fluxo atendido por peso
+                self._virtual_time = max(self._virtual_time, flow.pass_value)
+            flow.pass_value += 1.0 / flow.weight
+            self._set_waiting(waiter.priority.tier, -1)
+            self.active += 1
+            self._record_wait(waiter.priority, time.monotonic() - waiter.enqueued_at)
+            waiter.future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority) -> AsyncIterator[float]:
+        """Mantém uma vaga durante o bloco; a espera respeita o prazo da requisição."""
+        if not settings.model_scheduler_enabled:
+            yield 0.0
+            return
+
+        waited = await run_stage(
+            "queue", self.acquire(priority), reserve=settings.deadline_response_reserve_seconds
+        )
+        try:
+            yield waited
+        finally:
+            self.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.model_scheduler_enabled,
+            "capacity": self.capacity,
+            "active": self.active,
+            "waiting": self._waiting,
+            "classes": {
+                tier: {
+                    "waiting": self._waiting_by_tier.get(tier, 0),
+                    "served": sketch.count,
+                    "aged": self._aged.get(tier, 0),
+                    "wait_ms": sketch.quantiles(QUANTILES)
+                }
+                for tier, sketch in self._wait_ms.items()
+            }
+        }
+
+
+# Instância global: a capacidade vale para todas as rotas do processo
+model_scheduler = PriorityScheduler()
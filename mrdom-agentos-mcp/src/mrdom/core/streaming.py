@@ -0,0 +1,182 @@
+"""
+Utilitários de streaming NDJSON com concorrência limitada
+
+O corpo é lido em chunks e dividido em linhas incrementalmente; cada linha
+só é lida quando há vaga no pool de workers, e os resultados são emitidos
+na ordem em que terminam. Memória fica limitada a `concurrency` itens em
+processamento mais uma linha, independentemente do tamanho do lote.
+"""
+
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+@dataclass
+class NDJSONRecord:
+    """Linha do corpo: objeto decodificado ou o erro de parse."""
+
+    line: int
+    data: Optional[Any] = None
+    error: Optional[str] = None
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[NDJSONRecord]:
+    """Decodifica NDJSON de um fluxo de bytes; linhas vazias são ignoradas."""
+    buffer = bytearray()
+    oversized = False
+    line = 0
+
+    def finish() -> Optional[NDJSONRecord]:
+        nonlocal oversized
+        if oversized:
+            oversized = False
+            return NDJSONRecord(line, error=f"Linha excede {max_line_bytes} bytes")
+        raw = bytes(buffer).strip()
+        buffer.clear()
+        if not raw:
+            return None
+        try:
+            return NDJSONRecord(line, data=json.loads(raw))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            return NDJSONRecord(line, error=f"JSON inválido: {e}")
+
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            piece = chunk[start:] if end == -1 else chunk[start:end]
+            if not oversized:
+                buffer += piece
+                if len(buffer) > max_line_bytes:
+                    # Descarta o restante da linha em vez de acumulá-la
+                    oversized = True
+                    buffer.clear()
+            if end == -1:
+                break
+            line += 1
+            record = finish()
+            if record is not None:
+                yield record
+            start = end + 1
+
+    line += 1
+    record = finish()
+    if record is not None:
+        yield record
+
+
+async def bounded_as_completed(
+    items: AsyncIterator[T],
+    worker: Callable[[T], Awaitable[R]],
+    concurrency: int
+) -> AsyncIterator[R]:
+    """
+    Aplica worker a cada item com no máximo `concurrency` em paralelo,
+    emitindo resultados conforme terminam. A entrada só é consumida quando
+    há vaga (backpressure); ao fechar o gerador, workers pendentes são
+    cancelados.
+    """
+    iterator = items.__aiter__()
+    pending = set()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(worker(item)))
+
+            if not pending:
+                return
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def ndjson_line(payload: Any) -> bytes:
+    return (json.dumps(payload, ensure_ascii=False, default=str) + "\n").encode()
+
+
+class UploadStream:
+    """
+    Corpo da requisição lido direto do receive (como request.stream()).
+
+    `finished` é setado ao receber a última mensagem do corpo, mesmo que o
+    consumidor ainda não tenha processado o último chunk (backpressure).
+    """
+
+    def __init__(self, receive: Callable[[], Awaitable[Dict[str, Any]]]):
+        self._receive = receive
+        self.finished = asyncio.Event()
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        while not self.finished.is_set():
+            message = await self._receive()
+            if message["type"] == "http.disconnect":
+                raise ClientDisconnect()
+            if not message.get("more_body", False):
+                self.finished.set()
+            body = message.get("body", b"")
+            if body:
+                yield body
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que lê o corpo da requisição enquanto responde.
+
+    Durante o upload o gerador lê request.stream() e um listener de
+    http.disconnect consumiria esses chunks; a desconexão chega como
+    ClientDisconnect na leitura. Terminado o upload (`upload.finished`),
+    receive() passa a ser escutado em paralelo e um http.disconnect cancela
+    o envio, fechando o gerador (e os workers pendentes).
+    """
+
+    def __init__(self, content: Any, upload: Optional[UploadStream] = None, **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self.upload = upload
+
+    async def _cancel_on_disconnect(self, receive: Receive, stream: asyncio.Task) -> None:
+        await self.upload.finished.wait()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                stream.cancel()
+                return
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        stream = asyncio.ensure_future(self.stream_response(send))
+        listener = (
+            asyncio.ensure_future(self._cancel_on_disconnect(receive, stream))
+            if self.upload is not None else None
+        )
+        try:
+            await stream
+        except asyncio.CancelledError:
+            # Cancelamento externo (shutdown) continua propagando
+            if listener is None or not listener.done() or listener.cancelled():
+                raise
+        finally:
+            if listener is not None:
+                listener.cancel()
+
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,12 @@
+"""
+Avaliação offline MrDom SDR (replay de conversas gravadas)
+"""
+
+from .replay import ReplayRunner, build_runner, iter_replay_messages, replay_file
+
+__all__ = [
+    "ReplayRunner",
+    "build_runner",
+    "iter_replay_messages",
+    "replay_file"
+]
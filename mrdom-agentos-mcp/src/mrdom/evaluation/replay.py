@@ -0,0 +1,408 @@
+"""
+Replay offline de conversas gravadas para avaliar roteamento e prompts
+
+O corpus JSONL é lido em streaming e dividido em lotes. Os estágios de CPU
+(roteamento, estágio da conversa, montagem do prompt) rodam em um pool de
+processos; as chamadas ao modelo (falso ou Bedrock) rodam no event loop com
+concorrência limitada. Apenas `max_inflight_batches` lotes ficam em memória,
+então o corpus pode ter qualquer tamanho. Cada mensagem gera uma linha de
+resultado e o resumo agrega acurácia de roteamento e tempos por estágio.
+
+Formatos aceitos por linha:
+
+    {"id": "conv-1", "context": {...}, "messages": [
+        {"content": "...", "message_type": "incoming", "expected_agent": "sales"}, ...]}
+    {"id": "msg-1", "message": "...", "context": {...}, "expected_agent": "sales"}
+"""
+
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, IO, Iterator, List, Optional
+
+from ..agents.bedrock_agent import BedrockAgent, build_prompt
+from ..agents.classifier import IntentClassifier, IntentRouter
+from ..agents.fake_model import FakeModel
+from ..agents.generation import (
+    detect_conversation_stage,
+    estimate_output_tokens,
+    extract_output_tokens,
+    get_agent_profile,
+    resolve_generation_profile,
+)
+from ..agents.registry import AgentDefinition, AgentRegistry, KeywordRouter, read_config
+from ..analytics.sketch import LatencySketch
+from ..core.streaming import bounded_as_completed
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+@dataclass
+class ReplayMessage:
+    conversation_id: str
+    index: int
+    content: str
+    context: Dict[str, Any] = field(default_factory=dict)
+    expected_agent: Optional[str] = None
+
+
+@dataclass
+class RoutedMessage:
+    message: ReplayMessage
+    agent_type: str
+    stage: str
+    prompt: str
+    routing_seconds: float
+    routing_method: str = "keywords"
+    confidence: Optional[float] = None
+
+
+def iter_replay_messages(lines: Iterator[str], invalid: Optional[List[int]] = None) -> Iterator[ReplayMessage]:
+    """Extrai as mensagens incoming do corpus; linhas inválidas vão para `invalid`."""
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            record = None
+        if not isinstance(record, dict):
+            if invalid is not None:
+                invalid.append(line_number)
+            continue
+
+        conversation_id = str(record.get("id") or f"line-{line_number}")
+        base_context = record.get("context") or {}
+
+        if "messages" not in record:
+            if record.get("message"):
+                yield ReplayMessage(
+                    conversation_id=conversation_id,
+                    index=0,
+                    content=record["message"],
+                    context={**base_context, "source": "replay"},
+                    expected_agent=record.get("expected_agent")
+                )
+            continue
+
+        for index, message in enumerate(record["messages"]):
+            if message.get("message_type", "incoming") != "incoming" or not message.get("content"):
+                continue
+            yield ReplayMessage(
+                conversation_id=conversation_id,
+                index=index,
+                content=message["content"],
+                context={
+                    **base_context,
+                    **(message.get("context") or {}),
+                    "conversation_id": conversation_id,
+                    "message_count": index + 1,
+                    "source": "replay"
+                },
+                expected_agent=message.get("expected_agent")
+            )
+
+
+# Roteador do processo atual (definido pelo initializer de cada worker)
+_router: Optional[IntentRouter] = None
+
+
+def init_worker(router: IntentRouter) -> None:
+    global _router
+    _router = router
+
+
+def route_batch(batch: List[ReplayMessage]) -> List[RoutedMessage]:
+    """Estágios de CPU de um lote (executado nos workers do pool)."""
+    started = time.perf_counter()
+    # Classificador em lote: o tempo de roteamento é dividido entre as mensagens
+    decisions = _router.decide_batch([message.content for message in batch])
+    routing_seconds = (time.perf_counter() - started) / max(len(batch), 1)
+
+    routed = []
+    for message, decision in zip(batch, decisions):
+        started = time.perf_counter()
+        stage = detect_conversation_stage(message.context)
+        prompt = build_prompt(message.content, message.context)
+        routed.append(RoutedMessage(
+            message,
+            decision.agent_type,
+            stage,
+            prompt,
+            routing_seconds + time.perf_counter() - started,
+            routing_method=decision.method,
+            confidence=decision.confidence
+        ))
+    return routed
+
+
+class FakeReplayBackend:
+    """Aplica os perfis de geração reais sobre o FakeModel."""
+
+    name = "fake"
+
+    def __init__(self, definitions: List[AgentDefinition], model: Optional[FakeModel] = None):
+        self.model = model or FakeModel()
+        self.profiles = {
+            definition.agent_type: get_agent_profile(definition.agent_type, definition.generation)
+            for definition in definitions
+        }
+
+    async def process(self, routed: RoutedMessage) -> Dict[str, Any]:
+        profile, stage = resolve_generation_profile(
+            routed.agent_type, routed.message.context, base=self.profiles[routed.agent_type]
+        )
+        response = await self.model.arun(routed.prompt, profile.max_tokens, routed.agent_type)
+        return {
+            "success": True,
+            "response": response.content,
+            "generation": {
+                **profile.to_dict(),
+                "stage": stage,
+                "output_tokens": extract_output_tokens(response) or estimate_output_tokens(response.content)
+            }
+        }
+
+
+class BedrockReplayBackend:
+    """Chamadas reais ao Bedrock via BedrockAgent (exige credenciais AWS)."""
+
+    name = "bedrock"
+
+    def __init__(self, registry: AgentRegistry):
+        self.agent = BedrockAgent(registry)
+
+    async def process(self, routed: RoutedMessage) -> Dict[str, Any]:
+        return await self.agent.process_message(
+            routed.agent_type, routed.message.content, routed.message.context
+        )
+
+
+class ReplaySummary:
+    """Agregados do replay: acurácia, distribuição por agente e tempos."""
+
+    def __init__(self) -> None:
+        self.messages = 0
+        self.errors = 0
+        self.labeled = 0
+        self.correct = 0
+        self.output_tokens = 0
+        self.per_agent: Dict[str, Dict[str, int]] = {}
+        self.confusion: Dict[str, Dict[str, int]] = {}
+        self.methods: Dict[str, int] = {}
+        self.routing = LatencySketch()
+        self.model = LatencySketch()
+        self.routing_seconds = 0.0
+
+    def _agent(self, agent_type: str) -> Dict[str, int]:
+        return self.per_agent.setdefault(agent_type, {"predicted": 0, "expected": 0, "correct": 0})
+
+    def add(self, result: Dict[str, Any]) -> None:
+        self.messages += 1
+        self.routing_seconds += result["routing_ms"] / 1000
+        self.routing.add(result["routing_ms"])
+        self.model.add(result["model_ms"])
+        self._agent(result["predicted_agent"])["predicted"] += 1
+        self.methods[result["routing_method"]] = self.methods.get(result["routing_method"], 0) + 1
+        if not result["success"]:
+            self.errors += 1
+        self.output_tokens += result.get("output_tokens") or 0
+
+        expected = result.get("expected_agent")
+        if expected:
+            self.labeled += 1
+            self._agent(expected)["expected"] += 1
+            row = self.confusion.setdefault(expected, {})
+            row[result["predicted_agent"]] = row.get(result["predicted_agent"], 0) + 1
+            if result["correct"]:
+                self.correct += 1
+                self._agent(expected)["correct"] += 1
+
+    def to_dict(self, wall_seconds: float) -> Dict[str, Any]:
+        return {
+            "messages": self.messages,
+            "errors": self.errors,
+            "wall_seconds": round(wall_seconds, 3),
+            "messages_per_second": round(self.messages / wall_seconds, 2) if wall_seconds else None,
+            "routing": {
+                "labeled": self.labeled,
+                "accuracy": round(self.correct / self.labeled, 4) if self.labeled else None,
+                "methods": self.methods,
+                "per_agent": self.per_agent,
+                "confusion": self.confusion
+            },
+            "timing_ms": {
+                "routing_cpu_total": round(self.routing_seconds * 1000, 1),
+                "routing": self.routing.quantiles(QUANTILES),
+                "model": self.model.quantiles(QUANTILES)
+            },
+            "output_tokens": self.output_tokens
+        }
+
+
+class ReplayRunner:
+    """Executa o replay de um corpus JSONL."""
+
+    def __init__(
+        self,
+        backend: Any,
+        router: IntentRouter,
+        workers: int = 0,
+        concurrency: int = 16,
+        batch_size: int = 64,
+        include_responses: bool = False,
+        config_version: Optional[str] = None
+    ):
+        self.backend = backend
+        self.router = router
+        self.workers = workers
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.include_responses = include_responses
+        self.config_version = config_version
+        self.invalid_lines: List[int] = []
+
+    async def _batches(self, lines: Iterator[str], limit: Optional[int]) -> AsyncIterator[List[ReplayMessage]]:
+        batch: List[ReplayMessage] = []
+        for count, message in enumerate(iter_replay_messages(lines, self.invalid_lines), 1):
+            batch.append(message)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+                # Devolve o controle ao loop entre lotes (leitura é síncrona)
+                await asyncio.sleep(0)
+            if limit is not None and count >= limit:
+                break
+        if batch:
+            yield batch
+
+    async def _call_model(self, routed: RoutedMessage, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await self.backend.process(routed)
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            model_ms = (time.perf_counter() - started) * 1000
+
+        message = routed.message
+        generation = result.get("generation") or {}
+        record = {
+            "conversation_id": message.conversation_id,
+            "message_index": message.index,
+            "expected_agent": message.expected_agent,
+            "predicted_agent": routed.agent_type,
+            "correct": message.expected_agent == routed.agent_type if message.expected_agent else None,
+            "routing_method": routed.routing_method,
+            "confidence": None if routed.confidence is None else round(routed.confidence, 4),
+            "stage": routed.stage,
+            "max_tokens": generation.get("max_tokens"),
+            "temperature": generation.get("temperature"),
+            "output_tokens": generation.get("output_tokens"),
+            "routing_ms": round(routed.routing_seconds * 1000, 3),
+            "model_ms": round(model_ms, 3),
+            "success": result["success"],
+            "error": result.get("error")
+        }
+        if self.include_responses:
+            record["response"] = result.get("response")
+        return record
+
+    async def run(self, lines: Iterator[str], output: Optional[IO[str]] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        summary = ReplaySummary()
+        pool = None
+        if self.workers > 0:
+            pool = ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=(self.router,))
+        else:
+            init_worker(self.router)
+
+        async def process_batch(batch: List[ReplayMessage]) -> List[Dict[str, Any]]:
+            if pool is not None:
+                routed = await loop.run_in_executor(pool, route_batch, batch)
+            else:
+                routed = route_batch(batch)
+            return await asyncio.gather(*(self._call_model(item, semaphore) for item in routed))
+
+        # Lotes em voo suficientes para manter workers e modelo ocupados
+        max_inflight_batches = max(2, self.workers * 2, -(-self.concurrency // self.batch_size) + 1)
+        started = time.perf_counter()
+        try:
+            async for results in bounded_as_completed(
+                self._batches(lines, limit), process_batch, max_inflight_batches
+            ):
+                for result in results:
+                    summary.add(result)
+                    if output is not None:
+                        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        report = summary.to_dict(time.perf_counter() - started)
+        report["backend"] = self.backend.name
+        report["config_version"] = self.config_version
+        report["workers"] = self.workers
+        report["concurrency"] = self.concurrency
+        report["invalid_lines"] = len(self.invalid_lines)
+        return report
+
+
+def build_runner(
+    model: str,
+    agents_config: Optional[str] = None,
+    workers: Optional[int] = None,
+    concurrency: int = 16,
+    batch_size: int = 64,
+    include_responses: bool = False,
+    fake_model: Optional[FakeModel] = None,
+    classifier_path: Optional[Path] = None
+) -> ReplayRunner:
+    """
+    Monta o runner a partir das definições de agentes (arquivo padrão ou
+    informado); com classifier_path, o roteamento usa o classificador.
+    """
+    registry = AgentRegistry(agents_config)
+    config_version, default_agent, definitions = read_config(registry.path)
+    classifier = IntentClassifier.load(classifier_path) if classifier_path else None
+    router = IntentRouter(KeywordRouter(definitions, default_agent), classifier)
+
+    if model == "fake":
+        backend = FakeReplayBackend(definitions, fake_model)
+    elif model == "bedrock":
+        backend = BedrockReplayBackend(registry)
+    else:
+        raise ValueError(f"Modelo desconhecido: {model}")
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    return ReplayRunner(
+        backend,
+        router,
+        workers=workers,
+        concurrency=concurrency,
+        batch_size=batch_size,
+        include_responses=include_responses,
+        config_version=config_version
+    )
+
+
+async def replay_file(
+    input_path: Path,
+    runner: ReplayRunner,
+    output_path: Optional[Path] = None,
+    limit: Optional[int] = None
+) -> Dict[str, Any]:
+    """Replay de um arquivo JSONL, gravando os resultados por mensagem em output_path."""
+    with open(input_path, encoding="utf-8") as lines:
+        if output_path is None:
+            return await runner.run(lines, limit=limit)
+        with open(output_path, "w", encoding="utf-8") as output:
+            return await runner.run(lines, output, limit)
+
@@ -0,0 +1,11 @@
+"""
+Integrações externas MrDom SDR (Chatwoot)
+"""
+
+from .chatwoot import ChatwootClient, ChatwootDeliveryError, chatwoot_client
+
+__all__ = [
+    "ChatwootClient",
+    "ChatwootDeliveryError",
+    "chatwoot_client"
+]
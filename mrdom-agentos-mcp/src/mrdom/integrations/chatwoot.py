@@ -0,0 +1,349 @@
+"""
+Cliente de entrega de respostas para a API do Chatwoot
+
+Um único httpx.AsyncClient (pool de conexões keep-alive) atende todas as
+conversas, com concorrência limitada por semáforo. Falhas são repetidas com
+backoff exponencial com jitter (respeitando Retry-After). Indicadores de
+digitação são idempotentes e repetem em 429/5xx e em qualquer erro de
+transporte; posts de mensagem só repetem quando o Chatwoot certamente não
+processou o post (falha ao conectar, 429 ou 503), para não duplicar
+mensagens na conversa. Por conversa, indicadores de digitação e
+mensagens enfileirados dentro da janela de coalescência viram uma única
+requisição: só o último estado de digitação vale, e mensagens consecutivas
+são unidas em um post.
+"""
+
+import asyncio
+import email.utils
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Dict, List, Optional, Set
+
+import httpx
+import structlog
+from asgi_correlation_id.context import correlation_id
+
+from ..core.config import settings
+from ..core.metrics import (
+    CHATWOOT_COALESCED,
+    CHATWOOT_REQUEST_SECONDS,
+    CHATWOOT_REQUESTS,
+    CHATWOOT_RETRIES,
+)
+
+logger = structlog.get_logger(__name__)
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+# Recusas em que o Chatwoot não processou a requisição (seguras para posts)
+REJECTED_STATUS = frozenset({429, 503})
+# Falhas antes de a requisição ser enviada
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+MESSAGE_SEPARATOR = "\n\n"
+
+
+class ChatwootDeliveryError(Exception):
+    """Falha definitiva ao entregar uma requisição ao Chatwoot."""
+
+    def __init__(self, endpoint: str, message: str, status_code: Optional[int] = None):
+        super().__init__(f"{endpoint}: {message}")
+        self.endpoint = endpoint
+        self.status_code = status_code
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After em segundos ou data HTTP; None se ausente/inválido."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Backoff exponencial com full jitter."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+@dataclass
+class _Outbox:
+    """Envios pendentes de uma conversa (drenados por uma única task)."""
+
+    messages: List[str] = field(default_factory=list)
+    waiters: List[asyncio.Future] = field(default_factory=list)
+    typing: Optional[bool] = None
+    typing_sent: Optional[bool] = None
+    task: Optional[asyncio.Task] = None
+    # Correlation ID da requisição que enfileirou o último envio
+    request_id: Optional[str] = None
+
+
+class ChatwootClient:
+    """Entrega mensagens e indicadores de digitação via API do Chatwoot."""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        access_token: Optional[str] = None,
+        account_id: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        coalesce_window_seconds: Optional[float] = None
+    ):
+        self.base_url = (base_url or settings.chatwoot_base_url).rstrip("/")
+        self.access_token = access_token or settings.chatwoot_access_token
+        self.account_id = account_id or settings.chatwoot_account_id
+        self.transport = transport
+        self.max_concurrency = max_concurrency or settings.chatwoot_max_concurrency
+        self.max_retries = settings.chatwoot_max_retries if max_retries is None else max_retries
+        self.coalesce_window_seconds = (
+            settings.chatwoot_coalesce_window_seconds
+            if coalesce_window_seconds is None else coalesce_window_seconds
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._outboxes: Dict[str, _Outbox] = {}
+        self._background: Set[asyncio.Task] = set()
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "retries": 0,
+            "failures": 0,
+            "messages_queued": 0,
+            "messages_coalesced": 0,
+            "typing_coalesced": 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.access_token and self.account_id)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Cliente HTTP compartilhado, criado no primeiro uso (dentro do event loop)."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"api_access_token": self.access_token or ""},
+                timeout=httpx.Timeout(settings.chatwoot_timeout_seconds),
+                limits=httpx.Limits(
+                    max_connections=settings.chatwoot_max_connections,
+                    max_keepalive_connections=settings.chatwoot_max_connections
+                ),
+                transport=self.transport
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def _conversation_path(self, conversation_id: str, suffix: str) -> str:
+        return f"/api/v1/accounts/{self.account_id}/conversations/{conversation_id}/{suffix}"
+
+    async def _request(
+        self,
+        endpoint: str,
+        path: str,
+        payload: Dict[str, Any],
+        request_id: Optional[str] = None,
+        idempotent: bool = True
+    ) -> Dict[str, Any]:
+        """
+        POST com concorrência limitada e retry.
+
+        Idempotente: repete em 429/5xx e em erros de transporte. Caso
+        contrário, só quando o post certamente não foi processado (falha ao
+        conectar, 429 ou 503): um timeout de leitura pode ter sido entregue.
+        """
+        client = self._get_client()
+        request_id = request_id or correlation_id.get()
+        headers = {"X-Request-ID": request_id} if request_id else None
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            async with self._semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(path, json=payload, headers=headers)
+                except httpx.TransportError as e:
+                    status, error = "transport_error", ChatwootDeliveryError(endpoint, str(e))
+                    retryable = idempotent or isinstance(e, NOT_SENT_ERRORS)
+                else:
+                    status = str(response.status_code)
+                    if response.status_code < 400:
+                        error = None
+                    else:
+                        error = ChatwootDeliveryError(
+                            endpoint, f"HTTP {response.status_code}", response.status_code
+                        )
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                        retryable = response.status_code in (
+                            RETRYABLE_STATUS if idempotent else REJECTED_STATUS
+                        )
+                finally:
+                    CHATWOOT_REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - started)
+
+            CHATWOOT_REQUESTS.labels(endpoint, status).inc()
+            self.stats["requests"] += 1
+            if error is None:
+                return response.json() if response.content else {}
+
+            if not retryable or attempt == self.max_retries:
+                self.stats["failures"] += 1
+                raise error
+
+            delay = backoff_delay(
+                attempt, settings.chatwoot_retry_base_seconds, settings.chatwoot_retry_max_seconds
+            )
+            if retry_after is not None:
+                delay = min(max(delay, retry_after), settings.chatwoot_retry_max_seconds)
+            CHATWOOT_RETRIES.labels(endpoint).inc()
+            self.stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+    async def post_message(self, conversation_id: str, content: str, request_id: Optional[str] = None) -> Dict[str, Any]:
+        """Publica uma mensagem outgoing imediatamente (sem coalescência)."""
+        return await self._request(
+            "messages",
+            self._conversation_path(conversation_id, "messages"),
+            {"content": content, "message_type": "outgoing", "private": False},
+            request_id,
+            idempotent=False
+        )
+
+    async def toggle_typing(self, conversation_id: str, on: bool, request_id: Optional[str] = None) -> Dict[str, Any]:
+        return await self._request(
+            "toggle_typing_status",
+            self._conversation_path(conversation_id, "toggle_typing_status"),
+            {"typing_status": "on" if on else "off"},
+            request_id
+        )
+
+    def _outbox(self, conversation_id: str) -> _Outbox:
+        outbox = self._outboxes.get(conversation_id)
+        if outbox is None:
+            outbox = self._outboxes[conversation_id] = _Outbox()
+        if outbox.task is None:
+            outbox.task = asyncio.create_task(self._drain(conversation_id, outbox))
+        return outbox
+
+    async def send_message(self, conversation_id: Any, content: str) -> Dict[str, Any]:
+        """
+        Enfileira uma mensagem; mensagens da mesma conversa dentro da janela
+        saem em um único post. Retorna a resposta do Chatwoot para o post.
+        """
+        outbox = self._outbox(str(conversation_id))
+        future = asyncio.get_running_loop().create_future()
+        outbox.messages.append(content)
+        outbox.request_id = correlation_id.get()
+        outbox.waiters.append(future)
+        self.stats["messages_queued"] += 1
+        return await future
+
+    def set_typing(self, conversation_id: Any, on: bool = True) -> None:
+        """Registra o estado de digitação; apenas o último da janela é enviado."""
+        outbox = self._outbox(str(conversation_id))
+        if outbox.typing is not None:
+            self.stats["typing_coalesced"] += 1
+            CHATWOOT_COALESCED.labels("typing").inc()
+        outbox.typing = on
+        outbox.request_id = correlation_id.get()
+
+    def run_in_background(self, awaitable: Awaitable[Any]) -> asyncio.Task:
+        """Tarefa acompanhada pelo cliente: flush()/close() aguardam seu término."""
+        task = asyncio.ensure_future(awaitable)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    def schedule_reply(self, conversation_id: Any, content: str) -> None:
+        """Entrega em background (fora do caminho da resposta HTTP), registrando falhas."""
+        self.run_in_background(self._deliver(conversation_id, content))
+
+    async def _deliver(self, conversation_id: Any, content: str) -> None:
+        try:
+            await self.send_message(conversation_id, content)
+        except Exception as e:
+            logger.error("chatwoot.delivery_failed", conversation_id=conversation_id, error=str(e))
+
+    async def _drain(self, conversation_id: str, outbox: _Outbox) -> None:
+        """Envia o que acumulou em cada janela até a conversa ficar ociosa."""
+        try:
+            while True:
+                await asyncio.sleep(self.coalesce_window_seconds)
+                messages, waiters = outbox.messages, outbox.waiters
+                outbox.messages, outbox.waiters = [], []
+                typing, outbox.typing = outbox.typing, None
+                if not messages and typing is None:
+                    break
+
+                if messages:
+                    if len(messages) > 1:
+                        self.stats["messages_coalesced"] += len(messages) - 1
+                        CHATWOOT_COALESCED.labels("messages").inc(len(messages) - 1)
+                    # Postar uma mensagem encerra o indicador de digitação no Chatwoot
+                    await self._flush_messages(conversation_id, messages, waiters, outbox.request_id)
+                    outbox.typing_sent = False
+                elif typing != outbox.typing_sent:
+                    try:
+                        await self.toggle_typing(conversation_id, typing, outbox.request_id)
+                        outbox.typing_sent = typing
+                    except ChatwootDeliveryError as e:
+                        logger.warning("chatwoot.typing_failed", conversation_id=conversation_id, error=str(e))
+        finally:
+            outbox.task = None
+            if self._outboxes.get(conversation_id) is outbox:
+                del self._outboxes[conversation_id]
+            for future in outbox.waiters:
+                if not future.done():
+                    future.cancel()
+
+    async def _flush_messages(
+        self,
+        conversation_id: str,
+        messages: List[str],
+        waiters: List[asyncio.Future],
+        request_id: Optional[str] = None
+    ) -> None:
+        try:
+            result = await self.post_message(conversation_id, MESSAGE_SEPARATOR.join(messages), request_id)
+        except Exception as e:
+            for future in waiters:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for future in waiters:
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            # Cancelamento (shutdown) no meio do post
+            for future in waiters:
+                if not future.done():
+                    future.cancel()
+
+    async def flush(self) -> None:
+        """Aguarda a entrega de tudo que está enfileirado."""
+        tasks = [outbox.task for outbox in self._outboxes.values() if outbox.task is not None]
+        tasks.extend(self._background)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def close(self) -> None:
+        """Drena as filas e fecha o pool de conexões (shutdown da aplicação)."""
+        await self.flush()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "pending_conversations": len(self._outboxes),
+            "background_deliveries": len(self._background),
+            **self.stats
+        }
+
+
+# Instância global compartilhada (um pool de conexões por processo)
+chatwoot_client = ChatwootClient()
@@ -0,0 +1,129 @@
+"""
+Servidor Chatwoot falso (ASGI) para testes e benchmarks do cliente
+
+Implementa os endpoints usados pelo ChatwootClient e registra o que
+recebeu. Latência, taxa de 429/5xx e Retry-After são configuráveis. Use em
+processo com httpx.ASGITransport(app=FakeChatwootServer()) ou sirva com
+uvicorn para exercitar o pool de conexões real:
+
+    uvicorn mrdom.integrations.chatwoot_fake:app --port 3999
+"""
+
+import asyncio
+import json
+import random
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from starlette.types import Receive, Scope, Send
+
+CONVERSATION_PATH = re.compile(
+    r"^/api/v1/accounts/(?P<account>[^/]+)/conversations/(?P<conversation>[^/]+)/(?P<action>messages|toggle_typing_status)$"
+)
+
+
+class FakeChatwootServer:
+    """Aplicação ASGI mínima com o contrato de mensagens/digitação do Chatwoot."""
+
+    def __init__(
+        self,
+        latency_seconds: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: Optional[str] = "0",
+        access_token: Optional[str] = None,
+        seed: Optional[int] = None
+    ):
+        self.latency_seconds = latency_seconds
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.access_token = access_token
+        self.random = random.Random(seed)
+        self.messages: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.typing: Dict[str, List[str]] = defaultdict(list)
+        self.requests = 0
+        self.rejected = 0
+        self.inflight = 0
+        self.max_inflight = 0
+
+    async def _read_body(self, receive: Receive) -> bytes:
+        body = b""
+        while True:
+            event = await receive()
+            body += event.get("body", b"")
+            if not event.get("more_body"):
+                return body
+
+    async def _respond(
+        self, send: Send, status: int, payload: Any, headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        body = json.dumps(payload).encode()
+        raw_headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        raw_headers.extend((k.lower().encode(), v.encode()) for k, v in (headers or {}).items())
+        await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            while True:
+                event = await receive()
+                if event["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif event["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        self.requests += 1
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            await self._handle(scope, receive, send)
+        finally:
+            self.inflight -= 1
+
+    async def _handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        body = await self._read_body(receive)
+        match = CONVERSATION_PATH.match(scope["path"])
+        if scope["method"] != "POST" or match is None:
+            await self._respond(send, 404, {"error": "not found"})
+            return
+
+        headers = dict(scope["headers"])
+        if self.access_token and headers.get(b"api_access_token", b"").decode() != self.access_token:
+            await self._respond(send, 401, {"error": "unauthorized"})
+            return
+
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+
+        roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            self.rejected += 1
+            headers = {"Retry-After": self.retry_after} if self.retry_after is not None else {}
+            await self._respond(send, 429, {"error": "rate limited"}, headers)
+            return
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.rejected += 1
+            await self._respond(send, 503, {"error": "unavailable"})
+            return
+
+        payload = json.loads(body or b"{}")
+        conversation_id = match.group("conversation")
+        if match.group("action") == "toggle_typing_status":
+            self.typing[conversation_id].append(payload.get("typing_status"))
+            await self._respond(send, 200, {})
+            return
+
+        message = {
+            "id": sum(len(items) for items in self.messages.values()) + 1,
+            "content": payload.get("content"),
+            "message_type": payload.get("message_type"),
+            "conversation_id": conversation_id
+        }
+        self.messages[conversation_id].append(message)
+        await self._respond(send, 200, message)
+
+
+app = FakeChatwootServer()
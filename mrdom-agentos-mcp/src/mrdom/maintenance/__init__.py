@@ -0,0 +1,9 @@
+"""
+Jobs de manutenção do banco MrDom SDR
+"""
+
+from .partitions import PartitionMaintenance
+
+__all__ = [
+    "PartitionMaintenance"
+]
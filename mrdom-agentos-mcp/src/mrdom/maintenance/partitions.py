@@ -0,0 +1,266 @@
+"""
+Manutenção de partições de messages/agent_interactions
+
+Cria partições futuras, e ao fim da retenção destaca (DETACH) as antigas,
+arquiva o conteúdo em CSV gzip e remove a tabela. Novas partições começam
+no fim da última existente: ao trocar PARTITION_PERIOD (a migration cria
+partições mensais), a primeira partição semanal cobre só o trecho até o
+início da próxima semana, sem sobrepor os meses já criados. Deve rodar fora do
+processo da API (cron / CronJob), por exemplo:
+
+    python -m mrdom.maintenance.partitions --dry-run
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+import structlog
+
+from ..core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+PARTITIONED_TABLES = ("messages", "agent_interactions")
+PERIODS = ("month", "week")
+
+BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+LIST_ATTACHED = """
+SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bound
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = $1::regclass
+"""
+
+# Tabelas <parent>_pYYYYMMDD que não estão anexadas (DETACH de execução anterior)
+LIST_DETACHED = """
+SELECT c.relname AS name
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = current_schema()
+  AND c.relkind = 'r'
+  AND NOT c.relispartition
+  AND c.relname ~ ('^' || $1 || '_p[0-9]{8}$')
+"""
+
+
+def quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+@dataclass
+class PartitionInfo:
+    name: str
+    start: Optional[datetime]
+    end: Optional[datetime]
+
+    @property
+    def is_default(self) -> bool:
+        return self.start is None
+
+
+def parse_bound(name: str, bound: str) -> PartitionInfo:
+    """Interpreta o relpartbound (sessão em UTC) de uma partição."""
+    match = BOUND_RE.search(bound or "")
+    if not match:
+        return PartitionInfo(name, None, None)
+    start, end = (datetime.fromisoformat(value) for value in match.groups())
+    return PartitionInfo(name, start, end)
+
+
+def period_start(ts: datetime, period: str) -> datetime:
+    """Início do período (UTC) que contém ts, como date_trunc(period, ...)."""
+    ts = ts.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "week":
+        return ts - timedelta(days=ts.weekday())
+    return ts.replace(day=1)
+
+
+def next_period(start: datetime, period: str) -> datetime:
+    if period == "week":
+        return start + timedelta(days=7)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def plan_partitions(
+    partitions: List[PartitionInfo],
+    period: str,
+    premake: int,
+    now: datetime
+) -> List[Tuple[datetime, datetime]]:
+    """
+    Intervalos a criar até `premake` períodos à frente do atual.
+
+    Começa no fim da última partição existente (ou no período atual) e
+    alinha o fim de cada intervalo ao próximo limite do período, então
+    partições de outro período nunca se sobrepõem às existentes.
+    """
+    cursor = period_start(now, period)
+    horizon = cursor
+    for _ in range(premake + 1):
+        horizon = next_period(horizon, period)
+
+    last_end = max((p.end for p in partitions if not p.is_default), default=None)
+    if last_end is not None and last_end > cursor:
+        cursor = last_end.astimezone(timezone.utc)
+
+    ranges = []
+    while cursor < horizon:
+        end = next_period(period_start(cursor, period), period)
+        ranges.append((cursor, end))
+        cursor = end
+    return ranges
+
+
+class PartitionMaintenance:
+    """Job de criação, arquivamento e retenção de partições."""
+
+    def __init__(
+        self,
+        period: Optional[str] = None,
+        premake: Optional[int] = None,
+        retention_days: Optional[int] = None,
+        archive_dir: Optional[str] = None,
+        archive_enabled: Optional[bool] = None
+    ):
+        self.period = period or settings.partition_period
+        if self.period not in PERIODS:
+            raise ValueError(f"partition_period deve ser um de {PERIODS}")
+        self.premake = settings.partition_premake if premake is None else premake
+        self.retention_days = (
+            settings.partition_retention_days if retention_days is None else retention_days
+        )
+        self.archive_dir = Path(archive_dir or settings.partition_archive_dir)
+        self.archive_enabled = (
+            settings.partition_archive_enabled if archive_enabled is None else archive_enabled
+        )
+
+    async def list_partitions(self, conn: asyncpg.Connection, table: str) -> List[PartitionInfo]:
+        rows = await conn.fetch(LIST_ATTACHED, table)
+        return sorted(
+            (parse_bound(row["name"], row["bound"]) for row in rows),
+            key=lambda p: p.start or datetime.min.replace(tzinfo=timezone.utc)
+        )
+
+    async def ensure_future_partitions(
+        self,
+        conn: asyncpg.Connection,
+        table: str,
+        now: Optional[datetime] = None
+    ) -> List[str]:
+        """Garante a partição atual e `premake` partições à frente."""
+        partitions = await self.list_partitions(conn, table)
+        created = []
+        for start, end in plan_partitions(
+            partitions, self.period, self.premake, now or datetime.now(timezone.utc)
+        ):
+            # Mesmo padrão de nome de mrdom_ensure_partition (início da partição)
+            name = f"{table}_p{start:%Y%m%d}"
+            await conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {quote_ident(name)} PARTITION OF {quote_ident(table)} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+            created.append(name)
+        return created
+
+    def archive_path(self, table: str, partition: str) -> Path:
+        return self.archive_dir / table / f"{partition}.csv.gz"
+
+    async def archive_and_drop(self, conn: asyncpg.Connection, table: str, partition: str) -> Optional[str]:
+        """Exporta a tabela destacada para CSV gzip (se habilitado) e a remove."""
+        path = None
+        if self.archive_enabled:
+            path = self.archive_path(table, partition)
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_suffix(".gz.tmp")
+                with gzip.open(tmp_path, "wb") as archive:
+                    await conn.copy_from_table(partition, output=archive, format="csv", header=True)
+                # Só o rename final marca o arquivo como completo
+                os.replace(tmp_path, path)
+
+        await conn.execute(f"DROP TABLE {quote_ident(partition)}")
+        return str(path) if path else None
+
+    async def expire_partitions(
+        self,
+        conn: asyncpg.Connection,
+        table: str,
+        dry_run: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Destaca, arquiva e remove partições além da retenção."""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+        expired = [
+            p.name for p in await self.list_partitions(conn, table)
+            if not p.is_default and p.end <= cutoff
+        ]
+        # Sobras de execuções interrompidas entre o DETACH e o DROP
+        leftovers = [row["name"] for row in await conn.fetch(LIST_DETACHED, table)]
+
+        results = []
+        for name in expired + leftovers:
+            if dry_run:
+                results.append({"partition": name, "archive": None, "dry_run": True})
+                continue
+            if name in expired:
+                await conn.execute(
+                    f"ALTER TABLE {quote_ident(table)} DETACH PARTITION {quote_ident(name)}"
+                )
+            archive = await self.archive_and_drop(conn, table, name)
+            results.append({"partition": name, "archive": archive})
+        return results
+
+    async def default_has_rows(self, conn: asyncpg.Connection, table: str) -> bool:
+        """Linhas no DEFAULT impedem criar a partição correspondente."""
+        default = f"{table}_default"
+        if await conn.fetchval("SELECT to_regclass($1)", default) is None:
+            return False
+        return await conn.fetchval(f"SELECT EXISTS (SELECT 1 FROM {quote_ident(default)})")
+
+    async def run(self, dry_run: bool = False) -> Dict[str, Any]:
+        conn = await asyncpg.connect(settings.database_url)
+        try:
+            # Limites das partições são lidos/gerados sempre em UTC
+            await conn.execute("SET TIME ZONE 'UTC'")
+            report = {}
+            for table in PARTITIONED_TABLES:
+                report[table] = {
+                    "created": [] if dry_run else await self.ensure_future_partitions(conn, table),
+                    "expired": await self.expire_partitions(conn, table, dry_run),
+                    "default_has_rows": await self.default_has_rows(conn, table)
+                }
+                logger.info(
+                    "partitions.maintained",
+                    table=table,
+                    period=self.period,
+                    dry_run=dry_run,
+                    created=len(report[table]["created"]),
+                    expired=len(report[table]["expired"])
+                )
+                if report[table]["default_has_rows"]:
+                    logger.warning("partitions.default_has_rows", table=table)
+            return report
+        finally:
+            await conn.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manutenção de partições MrDom SDR")
+    parser.add_argument("--dry-run", action="store_true", help="Apenas lista o que seria feito")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(PartitionMaintenance().run(dry_run=args.dry_run))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
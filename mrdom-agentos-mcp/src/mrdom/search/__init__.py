@@ -0,0 +1,21 @@
+"""
+Busca de conversas MrDom SDR
+"""
+
+from .conversations import (
+    ConversationSearchBackend,
+    InMemoryConversationSearch,
+    PostgresConversationSearch,
+    SearchHit,
+    SearchPage,
+    SearchQuery,
+)
+
+__all__ = [
+    "ConversationSearchBackend",
+    "InMemoryConversationSearch",
+    "PostgresConversationSearch",
+    "SearchHit",
+    "SearchPage",
+    "SearchQuery"
+]
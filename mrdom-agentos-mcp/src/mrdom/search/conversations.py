@@ -0,0 +1,417 @@
+"""
+Busca no histórico de mensagens por frase, empresa ou contato
+
+Resultados ordenados por (created_at DESC, id DESC) com paginação keyset:
+o cursor codifica a última linha retornada, então o custo de cada página
+independe da profundidade da paginação.
+"""
+
+import base64
+import re
+import unicodedata
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from ..core.database import get_pool
+
+SNIPPET_LENGTH = 280
+
+
+class InvalidCursorError(ValueError):
+    """Cursor de paginação malformado."""
+
+
+@dataclass
+class SearchQuery:
+    """Critérios de busca; ao menos um de text/company/contact é obrigatório."""
+
+    text: Optional[str] = None
+    company: Optional[str] = None
+    contact: Optional[str] = None
+    platform: Optional[str] = None
+    status: Optional[str] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    limit: int = 20
+    cursor: Optional[str] = None
+
+    def validate(self) -> None:
+        if not any((self.text, self.company, self.contact)):
+            raise ValueError("Informe ao menos um de 'q', 'company' ou 'contact'")
+        if not 1 <= self.limit <= settings.search_max_limit:
+            raise ValueError(f"'limit' deve estar entre 1 e {settings.search_max_limit}")
+
+
+@dataclass
+class SearchHit:
+    message_id: str
+    conversation_id: str
+    external_id: Optional[str]
+    platform: str
+    status: Optional[str]
+    message_type: str
+    snippet: str
+    created_at: datetime
+    company: Optional[str] = None
+    lead_name: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "message_id": self.message_id,
+            "conversation_id": self.conversation_id,
+            "external_id": self.external_id,
+            "platform": self.platform,
+            "status": self.status,
+            "message_type": self.message_type,
+            "snippet": self.snippet,
+            "created_at": self.created_at.isoformat(),
+            "company": self.company,
+            "lead_name": self.lead_name
+        }
+
+
+@dataclass
+class SearchPage:
+    hits: List[SearchHit] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "results": [hit.to_dict() for hit in self.hits],
+            "count": len(self.hits),
+            "next_cursor": self.next_cursor
+        }
+
+
+def encode_cursor(created_at: datetime, message_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{message_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, message_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), str(uuid.UUID(message_id))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursorError("Cursor inválido") from e
+
+
+def snippet(content: str) -> str:
+    return content if len(content) <= SNIPPET_LENGTH else content[:SNIPPET_LENGTH - 1] + "…"
+
+
+def escape_like(value: str) -> str:
+    """Escapa curingas do LIKE para busca literal por substring."""
+    return re.sub(r"([\\%_])", r"\\\1", value)
+
+
+def build_page(hits: List[SearchHit], limit: int) -> SearchPage:
+    """Recebe até limit + 1 hits; o excedente indica que há próxima página."""
+    if len(hits) <= limit:
+        return SearchPage(hits=hits)
+    page = hits[:limit]
+    return SearchPage(hits=page, next_cursor=encode_cursor(page[-1].created_at, page[-1].message_id))
+
+
+class ConversationSearchBackend(ABC):
+    """Interface comum das implementações de busca."""
+
+    @abstractmethod
+    async def search(self, query: SearchQuery) -> SearchPage:
+        ...
+
+
+class PostgresConversationSearch(ConversationSearchBackend):
+    """Busca via índices GIN (pg_trgm + full-text) da migration 003."""
+
+    def __init__(self, text_config: Optional[str] = None, pool: Optional[Any] = None):
+        self.text_config = text_config or settings.search_text_config
+        self.pool = pool
+        # Literal no SQL para casar com o índice de expressão to_tsvector('portuguese', ...)
+        if not re.fullmatch(r"[a-z_]+", self.text_config):
+            raise ValueError(f"text_config inválido: {self.text_config}")
+
+    def build_sql(self, query: SearchQuery) -> Tuple[str, List[Any]]:
+        params: List[Any] = []
+
+        def param(value: Any) -> str:
+            params.append(value)
+            return f"${len(params)}"
+
+        where = []
+        if query.text:
+            text = param(query.text)
+            like = param(f"%{escape_like(query.text)}%")
+            where.append(
+                f"(to_tsvector('{self.text_config}', m.content) @@ "
+                f"websearch_to_tsquery('{self.text_config}', {text}) "
+                f"OR m.content ILIKE {like})"
+            )
+        if query.platform:
+            where.append(f"c.platform = {param(query.platform)}")
+        if query.status:
+            where.append(f"c.status = {param(query.status)}")
+        if query.date_from:
+            where.append(f"m.created_at >= {param(query.date_from)}")
+        if query.date_to:
+            where.append(f"m.created_at < {param(query.date_to)}")
+        # Empresa/contato: os índices trigram de qualifications selecionam as
+        # conversas, e idx_messages_conversation_id resolve as mensagens
+        if query.company:
+            company = param(f"%{escape_like(query.company)}%")
+            where.append(
+                "m.conversation_id IN (SELECT conversation_id FROM qualifications "
+                f"WHERE company ILIKE {company})"
+            )
+        if query.contact:
+            contact = param(f"%{escape_like(query.contact)}%")
+            where.append(
+                "m.conversation_id IN (SELECT conversation_id FROM qualifications "
+                f"WHERE lead_name ILIKE {contact} OR email ILIKE {contact} OR phone ILIKE {contact})"
+            )
+        if query.cursor:
+            created_at, message_id = decode_cursor(query.cursor)
+            where.append(f"(m.created_at, m.id) < ({param(created_at)}, {param(message_id)}::uuid)")
+
+        # Empresa/contato exibidos vêm da qualificação mais recente da conversa
+        sql = f"""
+            SELECT m.id, m.conversation_id, m.content, m.message_type, m.created_at,
+                   c.external_id, c.platform, c.status, q.company, q.lead_name
+            FROM messages m
+            JOIN conversations c ON c.id = m.conversation_id
+            LEFT JOIN LATERAL (
+                SELECT company, lead_name
+                FROM qualifications
+                WHERE conversation_id = m.conversation_id
+                ORDER BY created_at DESC
+                LIMIT 1
+            ) q ON TRUE
+            WHERE {' AND '.join(where)}
+            ORDER BY m.created_at DESC, m.id DESC
+            LIMIT {param(query.limit + 1)}
+        """
+        return sql, params
+
+    async def search(self, query: SearchQuery) -> SearchPage:
+        query.validate()
+        sql, params = self.build_sql(query)
+        pool = self.pool or await get_pool()
+        rows = await pool.fetch(sql, *params)
+        hits = [
+            SearchHit(
+                message_id=str(row["id"]),
+                conversation_id=str(row["conversation_id"]),
+                external_id=row["external_id"],
+                platform=row["platform"],
+                status=row["status"],
+                message_type=row["message_type"],
+                snippet=snippet(row["content"]),
+                created_at=row["created_at"],
+                company=row["company"],
+                lead_name=row["lead_name"]
+            )
+            for row in rows
+        ]
+        return build_page(hits, query.limit)
+
+
+def normalize(text: Optional[str]) -> str:
+    """Minúsculas sem acentos (aproxima o full-text em português)."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+# Aproximação do dicionário 'portuguese': stopwords mais comuns e um stemmer
+# de sufixos (sem acentos, após normalize)
+STOPWORDS = frozenset({
+    "a", "o", "as", "os", "ao", "aos", "de", "da", "do", "das", "dos", "e", "em",
+    "no", "na", "nos", "nas", "um", "uma", "uns", "umas", "para", "pra", "por",
+    "pelo", "pela", "com", "sem", "que", "se", "ou", "mas", "como", "mais", "muito",
+    "eu", "voce", "ele", "ela", "me", "te", "meu", "minha", "seu", "sua", "isso",
+    "esse", "essa", "este", "esta", "ja", "nao", "ser", "ter", "foi", "sao"
+})
+SUFFIXES = (
+    "amentos", "imentos", "amento", "imento", "adores", "mente", "acoes", "istas",
+    "acao", "coes", "ador", "ismo", "ista", "cao", "oes", "aes", "ais", "eis",
+    "es", "as", "os", "a", "o", "e", "s"
+)
+MIN_STEM_LENGTH = 3
+
+
+def stem(word: str) -> str:
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return word[:-len(suffix)]
+    return word
+
+
+def lexemes(text: Optional[str]) -> List[Optional[str]]:
+    """Lexemas por posição, como to_tsvector; stopwords ficam como None."""
+    return [
+        None if word in STOPWORDS else stem(word)
+        for word in re.findall(r"\w+", normalize(text))
+    ]
+
+
+# Termo de websearch_to_tsquery: (negado, lexemas da frase)
+Term = Tuple[bool, List[Optional[str]]]
+
+
+def parse_websearch(text: str) -> List[List[Term]]:
+    """
+    Sintaxe de websearch_to_tsquery: palavras soltas (AND), "frase", "or" e
+    -negação. Retorna cláusulas OR de termos AND; vazio se só há stopwords.
+    """
+    clauses: List[List[Term]] = [[]]
+    for quoted, word in re.findall(r'"([^"]*)"?|(\S+)', text):
+        if word.lower() == "or":
+            if clauses[-1]:
+                clauses.append([])
+            continue
+        negated = word.startswith("-")
+        phrase = lexemes(quoted if not word else word.lstrip("-"))
+        # Stopwords nas pontas não contam para a frase
+        while phrase and phrase[0] is None:
+            phrase.pop(0)
+        while phrase and phrase[-1] is None:
+            phrase.pop()
+        if phrase:
+            clauses[-1].append((negated, phrase))
+    return [clause for clause in clauses if clause]
+
+
+def _contains_phrase(document: List[Optional[str]], phrase: List[Optional[str]]) -> bool:
+    size = len(phrase)
+    return any(
+        all(expected is None or expected == document[start + offset] for offset, expected in enumerate(phrase))
+        for start in range(len(document) - size + 1)
+    )
+
+
+def websearch_matches(document: List[Optional[str]], clauses: List[List[Term]]) -> bool:
+    """Equivalente em memória de to_tsvector(...) @@ websearch_to_tsquery(...)."""
+    return any(
+        # Cláusula só com negações não casa sozinha (como no Postgres, exige um termo positivo)
+        any(not negated for negated, _ in clause) and all(
+            _contains_phrase(document, phrase) != negated for negated, phrase in clause
+        )
+        for clause in clauses
+    )
+
+
+class InMemoryConversationSearch(ConversationSearchBackend):
+    """
+    Implementação em memória com a mesma semântica de filtros, ordenação e
+    cursor; usada em testes e como baseline nos benchmarks. O texto casa
+    como no Postgres: full-text (websearch, com stopwords e stemming
+    aproximados) OU a consulta inteira como substring (ILIKE, sem ignorar
+    acentos). Company e contato também casam como ILIKE.
+    """
+
+    def __init__(self) -> None:
+        self.conversations: Dict[str, Dict[str, Any]] = {}
+        self.qualifications: Dict[str, Dict[str, Any]] = {}
+        self.messages: List[Dict[str, Any]] = []
+
+    def add_conversation(
+        self, conversation_id: str, platform: str, status: str = "active", external_id: Optional[str] = None
+    ) -> None:
+        self.conversations[conversation_id] = {
+            "platform": platform,
+            "status": status,
+            "external_id": external_id
+        }
+
+    def add_qualification(self, conversation_id: str, **fields: Any) -> None:
+        self.qualifications[conversation_id] = fields
+
+    def add_message(
+        self,
+        conversation_id: str,
+        content: str,
+        created_at: datetime,
+        message_type: str = "incoming",
+        message_id: Optional[str] = None
+    ) -> str:
+        message_id = message_id or str(uuid.uuid4())
+        self.messages.append({
+            "id": message_id,
+            "conversation_id": conversation_id,
+            "content": content,
+            "lexemes": lexemes(content),
+            "message_type": message_type,
+            "created_at": created_at
+        })
+        return message_id
+
+    def _matches(
+        self,
+        message: Dict[str, Any],
+        query: SearchQuery,
+        cursor: Optional[Tuple[datetime, str]],
+        clauses: List[List[Term]]
+    ) -> bool:
+        conversation = self.conversations.get(message["conversation_id"])
+        if conversation is None:
+            return False
+        qualification = self.qualifications.get(message["conversation_id"], {})
+
+        if query.text and not (
+            websearch_matches(message["lexemes"], clauses)
+            or query.text.lower() in message["content"].lower()
+        ):
+            return False
+        if query.platform and conversation["platform"] != query.platform:
+            return False
+        if query.status and conversation["status"] != query.status:
+            return False
+        if query.date_from and message["created_at"] < query.date_from:
+            return False
+        if query.date_to and message["created_at"] >= query.date_to:
+            return False
+        # Company/contato usam ILIKE no Postgres: sem ignorar acentos
+        if query.company and query.company.lower() not in (qualification.get("company") or "").lower():
+            return False
+        if query.contact:
+            contact = query.contact.lower()
+            if not any(
+                contact in (qualification.get(key) or "").lower()
+                for key in ("lead_name", "email", "phone")
+            ):
+                return False
+        if cursor and (message["created_at"], message["id"]) >= cursor:
+            return False
+        return True
+
+    async def search(self, query: SearchQuery) -> SearchPage:
+        query.validate()
+        cursor = decode_cursor(query.cursor) if query.cursor else None
+        clauses = parse_websearch(query.text) if query.text else []
+        matched = sorted(
+            (m for m in self.messages if self._matches(m, query, cursor, clauses)),
+            key=lambda m: (m["created_at"], m["id"]),
+            reverse=True
+        )[:query.limit + 1]
+
+        hits = []
+        for message in matched:
+            conversation = self.conversations[message["conversation_id"]]
+            qualification = self.qualifications.get(message["conversation_id"], {})
+            hits.append(SearchHit(
+                message_id=message["id"],
+                conversation_id=message["conversation_id"],
+                external_id=conversation["external_id"],
+                platform=conversation["platform"],
+                status=conversation["status"],
+                message_type=message["message_type"],
+                snippet=snippet(message["content"]),
+                created_at=message["created_at"],
+                company=qualification.get("company"),
+                lead_name=qualification.get("lead_name")
+            ))
+        return build_page(hits, query.limit)
@@ -6,8 +6,6 @@ import pytest
 import asyncio
 from unittest.mock import Mock, AsyncMock
 from fastapi.testclient import TestClient
-from src.mrdom.api import create_app
-from src.mrdom.core.config import settings
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -19,6 +17,8 @@ def event_loop():
 @pytest.fixture
 def app():
     """Cria aplicação FastAPI para testes."""
+    # Import tardio: testes de módulos isolados não dependem do app completo
+    from src.mrdom.api import create_app
     return create_app()
 
 @pytest.fixture
@@ -0,0 +1,166 @@
+"""
+Testes do cliente de entrega do Chatwoot contra o Chatwoot falso
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from src.mrdom.core.config import settings
+from src.mrdom.integrations.chatwoot import ChatwootClient, ChatwootDeliveryError
+from src.mrdom.integrations.chatwoot_fake import FakeChatwootServer
+
+
+class ScriptedRolls:
+    """Sorteios do servidor falso em sequência (depois, sempre sucesso)."""
+
+    def __init__(self, *rolls):
+        self.rolls = list(rolls)
+
+    def random(self):
+        return self.rolls.pop(0) if self.rolls else 1.0
+
+
+class FlakyTransport(httpx.AsyncBaseTransport):
+    """Levanta os erros de transporte dados antes de repassar ao servidor falso."""
+
+    def __init__(self, server, *errors):
+        self.inner = httpx.ASGITransport(app=server)
+        self.errors = list(errors)
+        self.attempts = 0
+
+    async def handle_async_request(self, request):
+        self.attempts += 1
+        if self.errors:
+            raise self.errors.pop(0)("falha simulada", request=request)
+        return await self.inner.handle_async_request(request)
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "chatwoot_retry_base_seconds", 0.001)
+    monkeypatch.setattr(settings, "chatwoot_retry_max_seconds", 1.0)
+
+
+def make_client(server, transport=None, **kwargs):
+    kwargs.setdefault("coalesce_window_seconds", 0.02)
+    return ChatwootClient(
+        base_url="http://chatwoot.test",
+        access_token="token",
+        account_id="1",
+        transport=transport or httpx.ASGITransport(app=server),
+        **kwargs
+    )
+
+
+async def test_rate_limited_post_is_retried_after_retry_after():
+    server = FakeChatwootServer(rate_limit_rate=0.5, retry_after="0.2")
+    server.random = ScriptedRolls(0.0)
+    client = make_client(server)
+
+    started = time.monotonic()
+    message = await client.post_message("7", "Olá!")
+    elapsed = time.monotonic() - started
+    await client.close()
+
+    assert message["content"] == "Olá!"
+    assert server.requests == 2
+    assert client.stats["retries"] == 1
+    assert elapsed >= 0.2
+    assert [m["content"] for m in server.messages["7"]] == ["Olá!"]
+
+
+async def test_unavailable_post_is_retried_until_limit():
+    server = FakeChatwootServer(error_rate=1.0)
+    client = make_client(server, max_retries=2)
+
+    with pytest.raises(ChatwootDeliveryError) as error:
+        await client.post_message("7", "Olá!")
+    await client.close()
+
+    assert error.value.status_code == 503
+    assert server.requests == 3
+    assert client.stats["failures"] == 1
+
+
+async def test_post_is_not_retried_when_it_may_have_been_delivered():
+    server = FakeChatwootServer()
+    transport = FlakyTransport(server, httpx.ReadTimeout)
+    client = make_client(server, transport=transport)
+
+    with pytest.raises(ChatwootDeliveryError):
+        await client.post_message("7", "Olá!")
+    await client.close()
+
+    assert transport.attempts == 1
+    assert client.stats["retries"] == 0
+
+
+async def test_post_is_retried_when_connection_failed():
+    server = FakeChatwootServer()
+    transport = FlakyTransport(server, httpx.ConnectError, httpx.ConnectTimeout)
+    client = make_client(server, transport=transport)
+
+    await client.post_message("7", "Olá!")
+    await client.close()
+
+    assert transport.attempts == 3
+    assert len(server.messages["7"]) == 1
+
+
+async def test_typing_is_retried_on_any_transport_error():
+    server = FakeChatwootServer()
+    transport = FlakyTransport(server, httpx.ReadTimeout, httpx.RemoteProtocolError)
+    client = make_client(server, transport=transport)
+
+    await client.toggle_typing("7", True)
+    await client.close()
+
+    assert transport.attempts == 3
+    assert server.typing["7"] == ["on"]
+
+
+async def test_messages_in_window_are_coalesced_into_one_post():
+    server = FakeChatwootServer()
+    client = make_client(server, coalesce_window_seconds=0.05)
+
+    results = await asyncio.gather(
+        client.send_message(7, "primeira"),
+        client.send_message(7, "segunda"),
+        client.send_message(8, "outra conversa")
+    )
+    await client.close()
+
+    assert [m["content"] for m in server.messages["7"]] == ["primeira\n\nsegunda"]
+    assert [m["content"] for m in server.messages["8"]] == ["outra conversa"]
+    assert results[0] == results[1]
+    assert client.stats["messages_coalesced"] == 1
+    assert server.requests == 2
+
+
+async def test_only_last_typing_state_in_window_is_sent():
+    server = FakeChatwootServer()
+    client = make_client(server)
+
+    client.set_typing(7, True)
+    client.set_typing(7, False)
+    client.set_typing(7, True)
+    client.set_typing(8, False)
+    await client.close()
+
+    assert server.typing["7"] == ["on"]
+    assert server.typing["8"] == ["off"]
+    assert client.stats["typing_coalesced"] == 2
+
+
+async def test_concurrency_is_bounded_by_semaphore():
+    server = FakeChatwootServer(latency_seconds=0.02)
+    client = make_client(server, max_concurrency=3)
+
+    await asyncio.gather(*(client.post_message(str(i), "oi") for i in range(12)))
+    await client.close()
+
+    assert server.requests == 12
+    assert server.max_inflight == 3
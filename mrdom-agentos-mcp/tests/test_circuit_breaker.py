@@ -0,0 +1,109 @@
+"""
+Testes do circuit breaker por provedor/modelo
+"""
+
+import asyncio
+
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError, ReadTimeoutError
+
+from src.mrdom.core.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    default_is_failure,
+)
+from src.mrdom.core.deadline import DeadlineExceededError
+
+
+def client_error(code, status):
+    return ClientError(
+        {"Error": {"Code": code, "Message": code}, "ResponseMetadata": {"HTTPStatusCode": status}},
+        "Converse"
+    )
+
+
+class ProviderError(Exception):
+    """Invólucro genérico do SDK do modelo (status 502 por padrão)."""
+
+    def __init__(self, message, status_code=502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def wrapped(cause):
+    try:
+        raise ProviderError(str(cause)) from cause
+    except ProviderError as e:
+        return e
+
+
+@pytest.mark.parametrize("error", [
+    client_error("ThrottlingException", 429),
+    client_error("ServiceUnavailableException", 503),
+    client_error("InternalServerException", 500),
+    EndpointConnectionError(endpoint_url="https://bedrock"),
+    ReadTimeoutError(endpoint_url="https://bedrock"),
+    ConnectionResetError(),
+    wrapped(client_error("ThrottlingException", 429)),
+    ProviderError("upstream", 503),
+])
+def test_provider_errors_count_as_failures(error):
+    assert default_is_failure(error)
+
+
+@pytest.mark.parametrize("error", [
+    client_error("ValidationException", 400),
+    client_error("AccessDeniedException", 403),
+    # O invólucro diz 502, mas a causa é um erro da requisição
+    wrapped(client_error("ValidationException", 400)),
+    ProviderError("prompt grande demais", 413),
+    ValueError("bug"),
+    KeyError("content"),
+    asyncio.CancelledError(),
+])
+def test_request_errors_and_bugs_do_not_count(error):
+    assert not default_is_failure(error)
+
+
+def test_short_budget_timeout_does_not_count():
+    assert not default_is_failure(DeadlineExceededError("model", 0.5))
+    assert default_is_failure(DeadlineExceededError("model", 60))
+
+
+async def fail(error):
+    raise error
+
+
+async def test_request_errors_never_open_circuit():
+    breaker = CircuitBreaker("bedrock", "test-client-errors", failure_threshold=2, reset_timeout_seconds=60)
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            await breaker.call(lambda: fail(ValueError("bug")))
+
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_failures == 0
+
+
+async def test_provider_failures_open_then_half_open_recovers():
+    breaker = CircuitBreaker("bedrock", "test-provider-errors", failure_threshold=2, reset_timeout_seconds=0.05)
+    for _ in range(2):
+        with pytest.raises(ClientError):
+            await breaker.call(lambda: fail(client_error("ThrottlingException", 429)))
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(lambda: fail(AssertionError("não deveria ser chamado")))
+
+    await asyncio.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    breaker.release()
+
+    async def ok():
+        return "ok"
+
+    assert await breaker.call(ok) == "ok"
+    assert breaker.state == CLOSED
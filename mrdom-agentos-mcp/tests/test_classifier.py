@@ -0,0 +1,142 @@
+"""
+Testes do classificador de intenção (treino, persistência, roteamento)
+"""
+
+import numpy as np
+import pytest
+
+# classifier importa o KeywordRouter do registro, que depende do modelo Bedrock do agno
+pytest.importorskip("agno.models.aws_bedrock")
+
+from src.mrdom.agents.classifier import ClassifierStore, IntentClassifier, IntentRouter
+from src.mrdom.agents.registry import KeywordRouter, parse_config
+from src.mrdom.core.config import settings
+
+TEMPLATES = {
+    "sales": ["quero agendar uma demo {}", "podemos marcar uma reunião {}", "gostaria de ver uma apresentação {}"],
+    "qualification": ["qual o preço {}", "quanto custa o plano {}", "qual o investimento necessário {}"],
+    "support": ["estou com um erro no sistema {}", "não consigo acessar minha conta {}", "o login está falhando {}"],
+}
+SUFFIXES = ["hoje", "amanhã", "por favor", "urgente", "esta semana", "para minha empresa", "agora", "ainda"]
+
+
+def corpus():
+    texts, labels = [], []
+    for label, templates in TEMPLATES.items():
+        for template in templates:
+            for suffix in SUFFIXES:
+                texts.append(template.format(suffix))
+                labels.append(label)
+    return texts, labels
+
+
+@pytest.fixture(scope="module")
+def trained():
+    texts, labels = corpus()
+    return IntentClassifier.fit(texts, labels, feature_bits=12, epochs=20)
+
+
+@pytest.fixture
+def keywords():
+    _, default_agent, definitions = parse_config({
+        "default_agent": "qualification",
+        "agents": {
+            "qualification": {"prompt": "q", "keywords": ["preço"]},
+            "sales": {"prompt": "s", "keywords": ["demo"]},
+            "support": {"prompt": "p", "keywords": ["erro"]},
+        }
+    })
+    return KeywordRouter(definitions, default_agent)
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(settings, "intent_classifier_enabled", True)
+
+
+def test_fit_learns_and_reports_validation_metrics(trained):
+    model, report = trained
+    assert model.classes == ["qualification", "sales", "support"]
+    assert report["validation_samples"] > 0
+    assert report["accuracy"] >= 0.9
+    assert model.rank("preciso agendar uma demo")[0][0] == "sales"
+    assert model.rank("quanto custa")[0][0] == "qualification"
+
+
+def test_fit_requires_two_classes():
+    with pytest.raises(ValueError):
+        IntentClassifier.fit(["a", "b"], ["sales", "sales"])
+
+
+def test_save_and_load_round_trip(trained, tmp_path):
+    model, _ = trained
+    path = tmp_path / "models" / "intent.npz"
+    model.save(path)
+
+    loaded = IntentClassifier.load(path)
+    messages = ["quero uma demo", "o sistema deu erro"]
+    assert loaded.classes == model.classes
+    assert loaded.temperature == pytest.approx(model.temperature)
+    np.testing.assert_allclose(loaded.predict_proba(messages), model.predict_proba(messages), rtol=1e-5)
+    assert not (tmp_path / "models" / "intent.npz.tmp").exists()
+
+
+def test_store_keeps_current_model_when_file_is_corrupt(trained, tmp_path, enabled):
+    model, _ = trained
+    path = tmp_path / "intent.npz"
+    model.save(path)
+    store = ClassifierStore(str(path))
+    assert store.load()
+    current = store.current
+
+    # Cópia parcial: começa como zip, mas está truncada
+    path.write_bytes(path.read_bytes()[:64])
+    assert not store.load()
+    assert store.current is current
+    assert store.last_error
+
+    path.write_bytes(b"")
+    assert not store.load()
+    assert store.current is current
+
+
+def test_store_without_file_falls_back_to_keywords(tmp_path, enabled, keywords):
+    store = ClassifierStore(str(tmp_path / "missing.npz"))
+    assert not store.load()
+
+    decision = store.router(keywords).decide("quero uma demo")
+    assert (decision.agent_type, decision.method, decision.confidence) == ("sales", "keywords", None)
+    assert store.router(keywords).decide("bom dia").method == "default"
+
+
+def test_low_confidence_falls_back_to_keyword(trained, keywords):
+    model, _ = trained
+    # Limiar inalcançável: toda decisão do classificador vira "baixa confiança"
+    router = IntentRouter(keywords, model, min_confidence=1.01)
+
+    decision = router.decide("qual o preço para agendar uma demo")
+    assert decision.method == "keywords"
+    assert decision.agent_type == "qualification"
+    assert decision.confidence is not None
+
+    # Sem palavra-chave, fica o agente mais provável do classificador
+    assert router.decide("não consigo acessar minha conta").method == "classifier"
+
+
+def test_confident_classifier_wins_over_keywords(trained, keywords):
+    model, _ = trained
+    router = IntentRouter(keywords, model, min_confidence=0.0)
+
+    decisions = router.decide_batch(["quero agendar uma demo hoje", "o login está falhando agora"])
+    assert [decision.method for decision in decisions] == ["classifier", "classifier"]
+    assert [decision.agent_type for decision in decisions] == ["sales", "support"]
+
+
+def test_model_classes_missing_from_config_are_ignored(trained):
+    model, _ = trained
+    _, default_agent, definitions = parse_config({
+        "agents": {"sales": {"prompt": "s", "keywords": ["demo"]}}
+    })
+    # Uma classe só na configuração: o classificador não decide
+    router = IntentRouter(KeywordRouter(definitions, default_agent), model)
+    assert router.decide("qual o preço").method == "default"
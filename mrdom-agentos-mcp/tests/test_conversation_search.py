@@ -0,0 +1,132 @@
+"""
+Testes da busca em memória (mesma semântica da busca no Postgres)
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.mrdom.search.conversations import InMemoryConversationSearch, SearchQuery
+
+T0 = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def backend():
+    backend = InMemoryConversationSearch()
+    backend.add_conversation("c1", "chatwoot", "active", "cw-1")
+    backend.add_conversation("c2", "n8n", "closed", "n8n-2")
+    backend.add_qualification("c1", company="Acme Ltda", lead_name="Ana Souza", email="ana@acme.com", phone="+55 11 90000-0001")
+    backend.add_qualification("c2", company="Beta SA", lead_name="Bruno Lima", email="bruno@beta.com", phone="+55 21 90000-0002")
+    backend.add_message("c1", "Quero conhecer os planos de vendas", T0)
+    backend.add_message("c1", "Qual o preço do plano anual?", T0 + timedelta(hours=1))
+    backend.add_message("c2", "Preciso de uma demonstração do plano", T0 + timedelta(days=2))
+    backend.add_message("c2", "Integração com o CRM da empresa", T0 + timedelta(days=3))
+    return backend
+
+
+async def texts(backend, **criteria):
+    page = await backend.search(SearchQuery(**criteria))
+    return [hit.snippet for hit in page.hits]
+
+
+async def test_text_matches_words_not_substrings(backend):
+    # "plano" casa "planos" (stemming); "lan" não casa como palavra
+    assert await texts(backend, text="plano") == [
+        "Preciso de uma demonstração do plano",
+        "Qual o preço do plano anual?",
+        "Quero conhecer os planos de vendas"
+    ]
+    assert await texts(backend, text="crm integração") == ["Integração com o CRM da empresa"]
+    # Todos os termos são obrigatórios, em qualquer ordem
+    assert await texts(backend, text="vendas planos") == ["Quero conhecer os planos de vendas"]
+
+
+async def test_text_supports_websearch_syntax(backend):
+    assert await texts(backend, text="crm or anual") == [
+        "Integração com o CRM da empresa",
+        "Qual o preço do plano anual?"
+    ]
+    assert await texts(backend, text="plano -demonstração") == [
+        "Qual o preço do plano anual?",
+        "Quero conhecer os planos de vendas"
+    ]
+    assert await texts(backend, text='"planos de vendas"') == ["Quero conhecer os planos de vendas"]
+    assert await texts(backend, text='"vendas de planos"') == []
+
+
+async def test_text_falls_back_to_phrase_substring(backend):
+    # Fragmento de palavra: não é lexema, mas casa pelo ILIKE da frase inteira
+    assert await texts(backend, text="nhecer os pla") == ["Quero conhecer os planos de vendas"]
+    assert await texts(backend, text="PREÇO DO") == ["Qual o preço do plano anual?"]
+    assert await texts(backend, text="lan anu") == []
+
+
+async def test_platform_status_and_date_filters(backend):
+    assert await texts(backend, text="plano", platform="n8n") == ["Preciso de uma demonstração do plano"]
+    assert await texts(backend, text="plano", status="active") == [
+        "Qual o preço do plano anual?",
+        "Quero conhecer os planos de vendas"
+    ]
+    assert await texts(backend, text="plano", platform="chatwoot", status="closed") == []
+    # date_from inclusivo, date_to exclusivo
+    assert await texts(
+        backend, text="plano", date_from=T0 + timedelta(hours=1), date_to=T0 + timedelta(days=2)
+    ) == ["Qual o preço do plano anual?"]
+
+
+async def test_company_and_contact_filters(backend):
+    assert await texts(backend, company="acme") == [
+        "Qual o preço do plano anual?",
+        "Quero conhecer os planos de vendas"
+    ]
+    assert await texts(backend, contact="bruno@") == [
+        "Integração com o CRM da empresa",
+        "Preciso de uma demonstração do plano"
+    ]
+    assert await texts(backend, contact="90000-0001", text="anual") == ["Qual o preço do plano anual?"]
+
+
+async def test_company_and_contact_filters_do_not_fold_accents():
+    backend = InMemoryConversationSearch()
+    backend.add_conversation("c1", "chatwoot")
+    backend.add_qualification("c1", company="Padaria São João", lead_name="José Araújo")
+    backend.add_message("c1", "Bom dia", T0)
+
+    # Mesma semântica do ILIKE: maiúsculas não importam, acentos sim
+    assert await texts(backend, company="SÃO JOÃO") == ["Bom dia"]
+    assert await texts(backend, company="sao joao") == []
+    assert await texts(backend, contact="josé") == ["Bom dia"]
+    assert await texts(backend, contact="jose") == []
+
+
+async def test_keyset_paging_with_created_at_ties():
+    backend = InMemoryConversationSearch()
+    backend.add_conversation("c1", "chatwoot")
+    ids = [str(uuid.uuid4()) for _ in range(7)]
+    # Cinco mensagens com o mesmo created_at: o desempate é pelo id
+    for index, message_id in enumerate(ids):
+        created_at = T0 if index < 5 else T0 + timedelta(minutes=index)
+        backend.add_message("c1", f"plano {index}", created_at, message_id=message_id)
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        page = await backend.search(SearchQuery(text="plano", limit=2, cursor=cursor))
+        seen.extend((hit.created_at, hit.message_id) for hit in page.hits)
+        pages += 1
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    expected = sorted(((m["created_at"], m["id"]) for m in backend.messages), reverse=True)
+    assert seen == expected
+    assert len(set(seen)) == 7
+    assert pages == 4
+
+
+async def test_query_requires_criteria(backend):
+    with pytest.raises(ValueError):
+        await backend.search(SearchQuery(platform="chatwoot"))
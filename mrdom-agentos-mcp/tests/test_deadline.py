@@ -0,0 +1,153 @@
+"""
+Testes do deadline por requisição e do orçamento por estágio
+"""
+
+import asyncio
+
+import pytest
+
+from src.mrdom.core import deadline as deadline_module
+from src.mrdom.core.circuit_breaker import CircuitBreaker
+from src.mrdom.core.config import settings
+from src.mrdom.core.deadline import (
+    DeadlineExceededError,
+    DeadlineMiddleware,
+    check_deadline,
+    current_deadline,
+    parse_timeout_header,
+    reset_deadline,
+    route_timeout,
+    run_stage,
+    set_deadline,
+    stage_budget,
+)
+from src.mrdom.core.inflight import InflightRegistry
+from src.mrdom.core.scheduler import Priority, PriorityScheduler
+
+PRIORITY = Priority("sales", "n8n", None, 1.0, "normal")
+
+
+@pytest.fixture(autouse=True)
+def clean_timeouts(monkeypatch):
+    monkeypatch.setattr(deadline_module, "stage_timeouts", {})
+
+
+def test_without_deadline_budget_is_the_cap():
+    assert current_deadline() is None
+    assert stage_budget() is None
+    assert stage_budget(cap=5) == 5
+
+
+def test_budget_is_remaining_time_minus_reserve_capped():
+    token = set_deadline(10)
+    try:
+        assert stage_budget(reserve=1) == pytest.approx(9, abs=0.05)
+        assert stage_budget(cap=2, reserve=1) == 2
+        # Reserva maior que o restante: orçamento zerado, nunca negativo
+        assert stage_budget(reserve=20) == 0.0
+    finally:
+        reset_deadline(token)
+
+
+def test_timeout_header_and_route_defaults(monkeypatch):
+    monkeypatch.setattr(settings, "request_timeout_max_seconds", 60)
+    monkeypatch.setattr(settings, "request_timeout_seconds", 30)
+    monkeypatch.setattr(settings, "request_timeout_routes", {"/api/v1": 20, "/api/v1/health": 5})
+
+    assert parse_timeout_header("2.5") == 2.5
+    assert parse_timeout_header("600") == 60
+    assert parse_timeout_header("abc") is None
+    assert parse_timeout_header("0") is None
+    assert route_timeout("/api/v1/health/live") == 5
+    assert route_timeout("/api/v1/agents/process") == 20
+    assert route_timeout("/metrics") == 30
+
+
+# Testes assíncronos rodam em uma task própria: o prazo definido neles não vaza
+async def test_run_stage_times_out_with_remaining_budget():
+    set_deadline(0.05)
+    with pytest.raises(DeadlineExceededError) as exc:
+        await run_stage("model", asyncio.sleep(10))
+
+    assert exc.value.stage == "model"
+    assert 0 < exc.value.budget <= 0.05
+    assert deadline_module.stage_timeouts == {"model": 1}
+
+
+async def test_run_stage_cap_applies_without_deadline():
+    with pytest.raises(DeadlineExceededError) as exc:
+        await run_stage("health.database", asyncio.sleep(10), cap=0.01)
+    assert exc.value.budget == 0.01
+
+
+async def test_expired_deadline_fails_fast_without_starting_work():
+    started = []
+
+    async def work():
+        started.append(True)
+
+    set_deadline(0.0)
+    with pytest.raises(DeadlineExceededError) as exc:
+        await run_stage("model", work())
+    assert exc.value.budget == 0.0
+    assert started == []
+
+    with pytest.raises(DeadlineExceededError):
+        check_deadline("routing")
+    assert deadline_module.stage_timeouts == {"model": 1, "routing": 1}
+
+
+async def test_stages_share_one_request_budget():
+    set_deadline(0.2)
+    await run_stage("queue", asyncio.sleep(0.1))
+    # O segundo estágio só tem o que sobrou do primeiro
+    assert stage_budget() < 0.11
+    with pytest.raises(DeadlineExceededError) as exc:
+        await run_stage("model", asyncio.sleep(0.15))
+    assert exc.value.stage == "model"
+
+
+async def test_queue_wait_is_bounded_by_the_deadline(monkeypatch):
+    monkeypatch.setattr(settings, "model_scheduler_enabled", True)
+    monkeypatch.setattr(settings, "deadline_response_reserve_seconds", 0.0)
+    scheduler = PriorityScheduler(capacity=1, max_wait_seconds=60, aging_share=0)
+    await scheduler.acquire(PRIORITY)
+
+    set_deadline(0.02)
+    with pytest.raises(DeadlineExceededError) as exc:
+        async with scheduler.slot(PRIORITY):
+            pass
+    assert exc.value.stage == "queue"
+    assert scheduler.waiting == 0
+
+
+async def test_deadline_propagates_through_inflight_and_breaker(monkeypatch):
+    monkeypatch.setattr(settings, "circuit_breaker_slow_call_seconds", 10)
+    breaker = CircuitBreaker("bedrock", "test", failure_threshold=1)
+    registry = InflightRegistry()
+
+    async def call_model():
+        return await breaker.call(lambda: run_stage("model", asyncio.sleep(10)))
+
+    # A task do registro herda a contextvar do prazo
+    set_deadline(0.02)
+    with pytest.raises(DeadlineExceededError) as exc:
+        await registry.run(call_model(), "agents.process")
+    assert exc.value.stage == "model"
+    # Orçamento curto demais: o timeout não é culpa do provedor
+    assert breaker.state == "closed"
+
+
+async def test_middleware_sets_deadline_for_the_request(monkeypatch):
+    monkeypatch.setattr(settings, "request_timeout_max_seconds", 120)
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["timeout"] = current_deadline().timeout_seconds
+
+    middleware = DeadlineMiddleware(app)
+    scope = {"type": "http", "path": "/api/v1/agents/process", "headers": [(b"x-request-timeout", b"3")]}
+    await middleware(scope, None, None)
+
+    assert seen["timeout"] == 3
+    assert current_deadline() is None
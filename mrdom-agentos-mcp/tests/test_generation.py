@@ -0,0 +1,51 @@
+"""
+Testes dos perfis de geração
+"""
+
+from src.mrdom.agents.generation import (
+    TOKEN_STEP,
+    GenerationProfile,
+    detect_conversation_stage,
+    resolve_generation_profile,
+)
+
+BASE = GenerationProfile(max_tokens=640, temperature=0.7)
+
+
+def test_request_without_context_uses_full_profile():
+    assert detect_conversation_stage(None) == "discovery"
+    assert detect_conversation_stage({}) == "discovery"
+
+    profile, stage = resolve_generation_profile("sales", None, base=BASE)
+    assert stage == "discovery"
+    assert profile.max_tokens == BASE.max_tokens
+
+
+def test_opening_halves_budget():
+    profile, stage = resolve_generation_profile("sales", {"message_count": 1}, base=BASE)
+    assert stage == "opening"
+    assert profile.max_tokens == 320
+
+
+def test_overrides_are_quantized():
+    variants = {
+        resolve_generation_profile("sales", max_tokens=tokens, temperature=temperature, base=BASE)[0]
+        for tokens in range(193, 225)
+        for temperature in (0.61, 0.62, 0.6249)
+    }
+    assert variants == {GenerationProfile(max_tokens=224, temperature=0.6)}
+
+    profile, _ = resolve_generation_profile("sales", max_tokens=225, temperature=0.63, base=BASE)
+    assert profile.max_tokens % TOKEN_STEP == 0
+    assert profile.max_tokens == 256
+    assert profile.temperature == 0.65
+
+
+def test_overrides_respect_safe_limits():
+    profile, _ = resolve_generation_profile("sales", max_tokens=1, temperature=5, base=BASE)
+    assert profile.max_tokens == 64
+    assert profile.temperature == 1.0
+
+    profile, _ = resolve_generation_profile("sales", max_tokens=10 ** 6, temperature=-1, base=BASE)
+    assert profile.max_tokens == 1000
+    assert profile.temperature == 0.0
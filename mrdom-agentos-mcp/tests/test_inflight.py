@@ -0,0 +1,180 @@
+"""
+Testes do registro de chamadas em andamento (desconexão, coalescência)
+"""
+
+import asyncio
+
+import pytest
+
+from src.mrdom.core.config import settings
+from src.mrdom.core.inflight import (
+    CANCEL_ADMIN,
+    CANCEL_CLIENT_DISCONNECT,
+    CallCancelledError,
+    InflightRegistry,
+)
+
+
+class FakeRequest:
+    """Request mínima: só is_disconnected()."""
+
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(settings, "disconnect_poll_interval_seconds", 0.001)
+    monkeypatch.setattr(settings, "inflight_cancel_on_disconnect_routes", ["agents.process"])
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0.005)
+
+
+async def model_call(started: asyncio.Event, result: str = "ok") -> str:
+    started.set()
+    await asyncio.sleep(60)
+    return result
+
+
+async def test_disconnect_cancels_call_on_opted_in_route():
+    registry = InflightRegistry()
+    request = FakeRequest()
+    started = asyncio.Event()
+    caller = asyncio.ensure_future(registry.run(model_call(started), "agents.process", request=request))
+    await started.wait()
+    assert len(registry) == 1
+
+    request.disconnected = True
+    with pytest.raises(CallCancelledError) as exc:
+        await asyncio.wait_for(caller, 1)
+
+    assert exc.value.reason == CANCEL_CLIENT_DISCONNECT
+    await settle()
+    assert len(registry) == 0
+    assert registry.cancelled_counts == {CANCEL_CLIENT_DISCONNECT: 1}
+
+
+async def test_disconnect_ignored_on_route_not_opted_in():
+    registry = InflightRegistry()
+    request = FakeRequest()
+    request.disconnected = True
+    release = asyncio.Event()
+
+    async def call() -> str:
+        await release.wait()
+        return "ok"
+
+    caller = asyncio.ensure_future(registry.run(call(), "webhooks.chatwoot", request=request))
+    await settle()
+    assert not caller.done()
+
+    release.set()
+    assert await asyncio.wait_for(caller, 1) == "ok"
+    assert registry.cancelled_counts == {}
+
+
+async def test_admin_cancel():
+    registry = InflightRegistry()
+    started = asyncio.Event()
+    caller = asyncio.ensure_future(registry.run(model_call(started), "agents.process"))
+    await started.wait()
+
+    (call,) = registry.list()
+    assert registry.cancel(call["call_id"])
+    with pytest.raises(CallCancelledError) as exc:
+        await caller
+    assert exc.value.reason == CANCEL_ADMIN
+    assert not registry.cancel(call["call_id"])
+
+
+async def test_same_key_coalesces_into_one_call():
+    registry = InflightRegistry()
+    release = asyncio.Event()
+    executions = []
+
+    async def call(label: str) -> str:
+        executions.append(label)
+        await release.wait()
+        return label
+
+    first = asyncio.ensure_future(registry.run(call("first"), "webhooks.chatwoot", key="chatwoot:1"))
+    await settle()
+    retry = asyncio.ensure_future(registry.run(call("retry"), "webhooks.chatwoot", key="chatwoot:1"))
+    await settle()
+
+    assert len(registry) == 1
+    assert registry.find("chatwoot:1") is not None
+    assert registry.list()[0]["attached"] == 2
+
+    release.set()
+    assert await asyncio.wait_for(asyncio.gather(first, retry), 1) == ["first", "first"]
+    assert executions == ["first"]
+    await settle()
+    assert registry.find("chatwoot:1") is None
+    assert len(registry) == 0
+
+
+async def test_coalesced_call_survives_until_every_client_disconnects():
+    registry = InflightRegistry()
+    started = asyncio.Event()
+    first_request, retry_request = FakeRequest(), FakeRequest()
+    first = asyncio.ensure_future(
+        registry.run(model_call(started), "agents.process", request=first_request, key="k")
+    )
+    await started.wait()
+    retry = asyncio.ensure_future(
+        registry.run(model_call(asyncio.Event()), "agents.process", request=retry_request, key="k")
+    )
+    await settle()
+
+    first_request.disconnected = True
+    await settle()
+    assert not first.done() and not retry.done()
+
+    retry_request.disconnected = True
+    for caller in (first, retry):
+        with pytest.raises(CallCancelledError):
+            await asyncio.wait_for(caller, 1)
+    await settle()
+    assert registry.cancelled_counts == {CANCEL_CLIENT_DISCONNECT: 1}
+
+
+async def test_external_cancel_of_one_caller_keeps_shared_call():
+    registry = InflightRegistry()
+    release = asyncio.Event()
+
+    async def call() -> str:
+        await release.wait()
+        return "ok"
+
+    first = asyncio.ensure_future(registry.run(call(), "webhooks.chatwoot", key="k"))
+    await settle()
+    retry = asyncio.ensure_future(registry.run(call(), "webhooks.chatwoot", key="k"))
+    await settle()
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    release.set()
+    assert await asyncio.wait_for(retry, 1) == "ok"
+
+
+async def test_external_cancel_of_only_caller_cancels_call():
+    registry = InflightRegistry()
+    started = asyncio.Event()
+    caller = asyncio.ensure_future(registry.run(model_call(started), "agents.process"))
+    await started.wait()
+
+    caller.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await caller
+    await settle()
+    assert len(registry) == 0
+    # Cancelamento externo (shutdown) não é contado como cancelamento do registro
+    assert registry.cancelled_counts == {}
@@ -0,0 +1,126 @@
+"""
+Testes do logging estruturado (correlation ID, amostragem, fila não bloqueante)
+"""
+
+import asyncio
+import io
+import json
+import logging
+import queue
+import uuid
+
+import httpx
+import pytest
+import structlog
+from asgi_correlation_id import CorrelationIdMiddleware
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from src.mrdom.core import logs
+from src.mrdom.core.config import settings
+
+
+@pytest.fixture
+def configured(monkeypatch):
+    """configure_logging() real, com a saída JSON em memória; restaura o logging ao final."""
+    monkeypatch.setattr(settings, "log_format", "json")
+    monkeypatch.setattr(settings, "log_level", "DEBUG")
+    monkeypatch.setattr(settings, "log_sampling_enabled", True)
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+
+    logs.configure_logging()
+    output = io.StringIO()
+    (handler,) = logs._listener.handlers
+    handler.setStream(output)
+
+    def records():
+        # Para a thread de escrita: a fila é esvaziada antes de ler a saída
+        logs.shutdown_logging()
+        events = [json.loads(line) for line in output.getvalue().splitlines()]
+        # Apenas os eventos da aplicação (o cliente httpx do teste também loga)
+        return [event for event in events if event["logger"].startswith("mrdom.")]
+
+    yield records
+    logs.shutdown_logging()
+    logs._queue_handler = None
+    root.handlers, root.level = handlers, level
+    structlog.reset_defaults()
+
+
+def build_app():
+    async def endpoint(request):
+        log = structlog.get_logger("mrdom.test")
+        log.debug("test.verbose", step=1)
+        logging.getLogger("mrdom.stdlib").info("stdlib %s", "verbose")
+        log.error("test.failed", step=2)
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/", endpoint)])
+    # Mesma ordem de create_app: correlation ID mais externo
+    return CorrelationIdMiddleware(logs.LogSamplingMiddleware(app), header_name="X-Request-ID")
+
+
+async def request(app, request_id=None):
+    headers = {"X-Request-ID": request_id} if request_id else {}
+
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/", headers=headers)
+
+    # Task própria, como no servidor: o contexto da requisição não vaza para o teste
+    return await asyncio.create_task(send())
+
+
+async def test_events_inside_request_carry_the_correlation_id(configured):
+    request_id = uuid.uuid4().hex
+    response = await request(build_app(), request_id)
+    generated = await request(build_app())
+    structlog.get_logger("mrdom.test").info("test.startup")
+
+    events = configured()
+    by_request = {}
+    for event in events:
+        by_request.setdefault(event.get("request_id"), []).append(event["event"])
+
+    assert response.headers["X-Request-ID"] == request_id
+    assert by_request[request_id] == ["test.verbose", "stdlib verbose", "test.failed"]
+    assert by_request[generated.headers["X-Request-ID"]] == ["test.verbose", "stdlib verbose", "test.failed"]
+    # Fora de requisição não há correlation ID
+    assert by_request[None] == ["test.startup"]
+
+
+async def test_sampled_out_requests_keep_only_warnings_and_errors(configured, monkeypatch):
+    monkeypatch.setattr(settings, "log_sampling_load_threshold", 0)
+    monkeypatch.setattr(settings, "log_verbose_sample_rate", 0.0)
+
+    request_id = uuid.uuid4().hex
+    await request(build_app(), request_id)
+
+    events = [event for event in configured() if event.get("request_id") == request_id]
+    assert [(event["event"], event["level"]) for event in events] == [("test.failed", "error")]
+
+
+async def test_requests_below_load_threshold_log_everything(configured, monkeypatch):
+    monkeypatch.setattr(settings, "log_sampling_load_threshold", 1)
+    monkeypatch.setattr(settings, "log_verbose_sample_rate", 0.0)
+
+    request_id = uuid.uuid4().hex
+    await request(build_app(), request_id)
+
+    events = [event["event"] for event in configured() if event.get("request_id") == request_id]
+    assert events == ["test.verbose", "stdlib verbose", "test.failed"]
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = logs.NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    logger = logging.getLogger("mrdom.test.queue")
+    for index in range(3):
+        handler.handle(logger.makeRecord(logger.name, logging.INFO, __file__, 1, "msg %d", (index,), None))
+
+    assert handler.dropped == 2
+    record = handler.queue.get_nowait()
+    # Mensagem resolvida na thread de origem (args podem mudar depois)
+    assert (record.msg, record.args) == ("msg 0", None)
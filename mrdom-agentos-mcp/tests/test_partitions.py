@@ -0,0 +1,61 @@
+"""
+Testes do planejamento de partições do job de manutenção
+"""
+
+from datetime import datetime, timezone
+
+from src.mrdom.maintenance.partitions import PartitionInfo, parse_bound, plan_partitions
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def monthly(*months):
+    return [
+        PartitionInfo(f"messages_p{start:%Y%m%d}", start, end)
+        for start, end in zip(months, months[1:])
+    ]
+
+
+def test_monthly_plan_skips_existing_partitions():
+    existing = monthly(utc(2024, 5, 1), utc(2024, 6, 1), utc(2024, 7, 1))
+    ranges = plan_partitions(existing, "month", 3, utc(2024, 5, 20, 15))
+
+    assert ranges == [
+        (utc(2024, 7, 1), utc(2024, 8, 1)),
+        (utc(2024, 8, 1), utc(2024, 9, 1))
+    ]
+
+
+def test_weekly_plan_starts_after_last_monthly_bound():
+    # Migration criou partições mensais até 2024-08-01
+    existing = monthly(utc(2024, 5, 1), utc(2024, 6, 1), utc(2024, 7, 1), utc(2024, 8, 1))
+    existing.append(parse_bound("messages_default", "DEFAULT"))
+    ranges = plan_partitions(existing, "week", 12, utc(2024, 5, 20))
+
+    # 2024-08-01 é quinta-feira: partição de transição até a segunda seguinte
+    assert ranges[0] == (utc(2024, 8, 1), utc(2024, 8, 5))
+    assert ranges[1] == (utc(2024, 8, 5), utc(2024, 8, 12))
+    assert ranges[-1][1] == utc(2024, 8, 19)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+    assert all(start >= utc(2024, 8, 1) for start, _ in ranges)
+
+
+def test_plan_without_partitions_starts_at_current_period():
+    ranges = plan_partitions([], "week", 1, utc(2024, 5, 22, 9))
+
+    assert ranges == [
+        (utc(2024, 5, 20), utc(2024, 5, 27)),
+        (utc(2024, 5, 27), utc(2024, 6, 3))
+    ]
+
+
+def test_parse_bound():
+    info = parse_bound(
+        "messages_p20240501",
+        "FOR VALUES FROM ('2024-05-01 00:00:00+00') TO ('2024-06-01 00:00:00+00')"
+    )
+    assert (info.start, info.end) == (utc(2024, 5, 1), utc(2024, 6, 1))
+    assert parse_bound("messages_default", "DEFAULT").is_default
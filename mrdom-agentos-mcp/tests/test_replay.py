@@ -0,0 +1,113 @@
+"""
+Testes do replay offline (mrdom-sdr replay com o modelo falso)
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+# replay importa o BedrockAgent, que depende do modelo Bedrock do agno
+pytest.importorskip("agno.models.aws_bedrock")
+
+from src.mrdom.agents.fake_model import FakeModel
+from src.mrdom.cli import main
+from src.mrdom.evaluation.replay import build_runner, replay_file
+
+AGENTS_CONFIG = str(Path(__file__).resolve().parents[1] / "config" / "agents.json")
+
+CORPUS = [
+    {"id": "conv-1", "context": {"lead_status": "warm"}, "messages": [
+        {"content": "Quero agendar uma demo", "message_type": "incoming", "expected_agent": "sales"},
+        {"content": "Claro! Qual horário?", "message_type": "outgoing"},
+        {"content": "Quanto custa o plano?", "message_type": "incoming", "expected_agent": "qualification"}
+    ]},
+    {"id": "msg-1", "message": "Estou com um erro no sistema", "expected_agent": "support"},
+    "linha inválida",
+    {"id": "msg-2", "message": "Bom dia"}
+]
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = tmp_path / "conversas.jsonl"
+    lines = [json.dumps(item, ensure_ascii=False) if isinstance(item, dict) else item for item in CORPUS]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def read_results(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_cli_replay_with_fake_model(corpus, tmp_path, capsys):
+    output = tmp_path / "resultados.jsonl"
+    summary = tmp_path / "resumo.json"
+    code = main([
+        "replay", str(corpus),
+        "--model", "fake",
+        "--fake-time-scale", "0",
+        "--workers", "0",
+        "--agents-config", AGENTS_CONFIG,
+        "--output", str(output),
+        "--summary", str(summary),
+        "--include-responses"
+    ])
+    assert code == 0
+
+    results = read_results(output)
+    # Apenas mensagens incoming com conteúdo; a linha inválida é contada, não processada
+    assert sorted((r["conversation_id"], r["message_index"]) for r in results) == [
+        ("conv-1", 0), ("conv-1", 2), ("msg-1", 0), ("msg-2", 0)
+    ]
+    assert all(r["success"] and r["response"] for r in results)
+    by_id = {(r["conversation_id"], r["message_index"]): r for r in results}
+    assert by_id[("conv-1", 0)]["predicted_agent"] == "sales"
+    assert by_id[("conv-1", 2)]["predicted_agent"] == "qualification"
+    assert by_id[("msg-2", 0)]["correct"] is None
+
+    report = json.loads(summary.read_text(encoding="utf-8"))
+    assert report == json.loads(capsys.readouterr().out)
+    assert report["backend"] == "fake"
+    assert report["messages"] == 4
+    assert report["errors"] == 0
+    assert report["invalid_lines"] == 1
+    assert report["routing"]["labeled"] == 3
+    assert set(report["timing_ms"]) == {"routing_cpu_total", "routing", "model"}
+
+
+async def test_process_pool_matches_in_process_replay(corpus, tmp_path):
+    def runner(workers: int = 0):
+        return build_runner(
+            "fake",
+            agents_config=AGENTS_CONFIG,
+            workers=workers,
+            batch_size=2,
+            include_responses=True,
+            fake_model=FakeModel(time_scale=0)
+        )
+
+    first, second = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+    await replay_file(corpus, runner(), first)
+    await replay_file(corpus, runner(workers=1), second)
+
+    def responses(path):
+        return sorted(
+            (r["conversation_id"], r["message_index"], r["predicted_agent"], r["response"], r["output_tokens"])
+            for r in read_results(path)
+        )
+
+    # Modelo falso determinístico: roteamento no pool e no processo atual dão o mesmo resultado
+    assert responses(first) == responses(second)
+
+    report = await replay_file(corpus, runner(), limit=2)
+    assert report["messages"] == 2
+
+
+def test_cli_replay_empty_corpus_fails(tmp_path):
+    empty = tmp_path / "vazio.jsonl"
+    empty.write_text("", encoding="utf-8")
+    assert main([
+        "replay", str(empty), "--model", "fake", "--fake-time-scale", "0",
+        "--workers", "0", "--agents-config", AGENTS_CONFIG
+    ]) == 1
@@ -0,0 +1,62 @@
+"""
+Testes do cache de respostas do modo degradado
+"""
+
+from src.mrdom.agents.response_cache import ResponseCache, cache_key
+
+
+def conversation(conversation_id, contact_id=None):
+    return {"conversation_id": conversation_id, "contact_id": contact_id, "source": "chatwoot"}
+
+
+def test_reply_is_not_served_to_another_conversation():
+    cache = ResponseCache(max_entries=10, ttl_seconds=60)
+    cache.put("sales", "Quero uma demo", "Claro, Ana! Enviei o convite para ana@lead.com", conversation(1, 10))
+
+    assert cache.get("sales", "quero  uma DEMO", conversation(1, 10)) == "Claro, Ana! Enviei o convite para ana@lead.com"
+    assert cache.get("sales", "Quero uma demo", conversation(2, 20)) is None
+    # Mesmo contato, outra conversa
+    assert cache.get("sales", "Quero uma demo", conversation(3, 10)) is None
+    # Sem contexto (resposta genérica) também não recebe a resposta personalizada
+    assert cache.get("sales", "Quero uma demo") is None
+
+
+def test_contextless_replies_are_shared_only_without_context():
+    cache = ResponseCache(max_entries=10, ttl_seconds=60)
+    cache.put("support", "oi", "Olá! Como posso ajudar?")
+
+    assert cache.get("support", "OI") == "Olá! Como posso ajudar?"
+    assert cache.get("support", "oi", conversation(1)) is None
+
+
+def test_context_without_identifiers_is_not_cached():
+    cache = ResponseCache(max_entries=10, ttl_seconds=60)
+    context = {"sender": {"name": "Ana", "email": "ana@lead.com"}}
+
+    assert cache_key("sales", "oi", context) is None
+    cache.put("sales", "oi", "Oi, Ana!", context)
+    assert len(cache) == 0
+    assert cache.get("sales", "oi", {"sender": {"name": "Bruno"}}) is None
+
+
+def test_contact_scope_when_there_is_no_conversation():
+    cache = ResponseCache(max_entries=10, ttl_seconds=60)
+    cache.put("sales", "preço", "Oi, Ana! Os planos...", {"contact_id": 10})
+
+    assert cache.get("sales", "preço", {"contact_id": 10}) == "Oi, Ana! Os planos..."
+    assert cache.get("sales", "preço", {"contact_id": 11}) is None
+
+
+def test_lru_and_ttl():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    cache.put("sales", "a", "A")
+    cache.put("sales", "b", "B")
+    cache.get("sales", "a")
+    cache.put("sales", "c", "C")
+
+    assert cache.get("sales", "b") is None
+    assert cache.get("sales", "a") == "A"
+
+    expired = ResponseCache(max_entries=2, ttl_seconds=-1)
+    expired.put("sales", "a", "A")
+    assert expired.get("sales", "a") is None
@@ -0,0 +1,108 @@
+"""
+Testes da fila de prioridade das chamadas ao modelo
+"""
+
+import asyncio
+from collections import Counter
+
+import pytest
+
+from src.mrdom.core.scheduler import Priority, PriorityScheduler
+
+HIGH = Priority("sales", "chatwoot", "hot", 2.0, "high")
+LOW = Priority("support", "n8n", "cold", 1.0, "low")
+
+
+async def settle():
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+async def test_cancel_racing_release_does_not_leak_slot():
+    scheduler = PriorityScheduler(capacity=1, max_wait_seconds=60, aging_share=0)
+    await scheduler.acquire(HIGH)
+    waiter = asyncio.ensure_future(scheduler.acquire(HIGH))
+    await settle()
+
+    # Cancelamento (prazo/desconexão) e release no mesmo tick, antes do except do waiter
+    waiter.cancel()
+    scheduler.release()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert scheduler.active == 0
+    assert scheduler.waiting == 0
+    assert await asyncio.wait_for(scheduler.acquire(LOW), 1) == 0.0
+
+
+async def test_slot_granted_then_cancelled_is_handed_back():
+    scheduler = PriorityScheduler(capacity=1, max_wait_seconds=60, aging_share=0)
+    await scheduler.acquire(HIGH)
+    waiter = asyncio.ensure_future(scheduler.acquire(HIGH))
+    await settle()
+
+    scheduler.release()
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert scheduler.active == 0
+    assert scheduler.waiting == 0
+
+
+async def test_timed_out_waiter_leaves_queue():
+    scheduler = PriorityScheduler(capacity=1, max_wait_seconds=60, aging_share=0)
+    await scheduler.acquire(HIGH)
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(scheduler.acquire(LOW), 0.01)
+
+    assert scheduler.waiting == 0
+    scheduler.release()
+    assert scheduler.active == 0
+
+
+async def serve(scheduler, grants):
+    """Libera uma vaga por vez; cada waiter atendido registra seu fluxo."""
+    for _ in range(grants):
+        scheduler.release()
+        await settle()
+
+
+async def enqueue(scheduler, priority, order):
+    await scheduler.acquire(priority)
+    order.append(priority.tier)
+
+
+async def test_weighted_share_under_contention():
+    scheduler = PriorityScheduler(capacity=1, max_wait_seconds=60, aging_share=0)
+    await scheduler.acquire(HIGH)
+    order = []
+    tasks = [asyncio.ensure_future(enqueue(scheduler, p, order)) for p in [HIGH, LOW] * 30]
+    await settle()
+
+    await serve(scheduler, 30)
+    share = Counter(order)
+    # Peso 2 x 1: dois terços das vagas para o fluxo mais pesado
+    assert share["high"] == 20
+    assert share["low"] == 10
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def test_aging_serves_oldest_waiter_first():
+    scheduler = PriorityScheduler(capacity=1, max_wait_seconds=0.02, aging_share=0.5)
+    await scheduler.acquire(HIGH)
+    order = []
+    old = asyncio.ensure_future(enqueue(scheduler, LOW, order))
+    await asyncio.sleep(0.05)
+    fresh = [asyncio.ensure_future(enqueue(scheduler, HIGH, order)) for _ in range(3)]
+    await settle()
+
+    await serve(scheduler, 1)
+    assert order == ["low"]
+    assert scheduler.snapshot()["classes"]["low"]["aged"] == 1
+
+    await serve(scheduler, 3)
+    assert order == ["low", "high", "high", "high"]
@@ -0,0 +1,83 @@
+"""
+Testes do sketch de latência e dos deltas de rollup
+"""
+
+import math
+import random
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from src.mrdom.analytics.rollups import build_deltas
+from src.mrdom.analytics.sketch import LatencySketch
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_quantiles_within_relative_accuracy():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(5, 1) for _ in range(5000)]
+    sketch = LatencySketch(0.01)
+    for value in values:
+        sketch.add(value)
+
+    for q in (0.5, 0.95, 0.99):
+        exact = exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - exact) <= 0.01 * exact + 1e-9
+
+
+def test_merge_with_different_accuracy_rebins():
+    rng = random.Random(11)
+    fine_values = [rng.lognormvariate(5, 1) for _ in range(3000)]
+    coarse_values = [rng.lognormvariate(6, 0.5) for _ in range(3000)]
+    fine, coarse = LatencySketch(0.01), LatencySketch(0.02)
+    for value in fine_values:
+        fine.add(value)
+    for value in coarse_values:
+        coarse.add(value)
+    coarse.add(0, 5)
+
+    fine.merge(coarse)
+
+    assert fine.count == 6005
+    assert fine.zero_count == 5
+    values = fine_values + coarse_values + [0.0] * 5
+    for q in (0.5, 0.9, 0.99):
+        exact = exact_quantile(values, q)
+        # Erro limitado à soma das precisões (com folga para o arredondamento de bins)
+        assert math.isclose(fine.quantile(q), exact, rel_tol=0.031)
+
+
+def test_zero_and_negative_values_go_to_zero_count():
+    sketch = LatencySketch()
+    sketch.add(0)
+    sketch.add(-3)
+    sketch.add(120)
+
+    assert sketch.zero_count == 2
+    assert sketch.count == 3
+    assert sketch.quantile(0.0) == 0.0
+    restored = LatencySketch.from_dict(sketch.to_dict())
+    assert (restored.zero_count, restored.count) == (2, 3)
+
+
+def test_deltas_count_zero_latencies_in_zero_count():
+    hour = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+    base = {"agent_name": "sales", "bucket_start": hour, "conversions": 0, "latency_sum_ms": 0.0}
+    rows = [
+        # processing_time_ms = 0 (3 linhas) e NULL (2 linhas) caem no grupo sem bin
+        {**base, "sketch_key": None, "interactions": 5, "latency_count": 3,
+         "latency_min_ms": 0, "latency_max_ms": 0},
+        {**base, "sketch_key": 240, "interactions": 2, "latency_count": 2,
+         "latency_sum_ms": 230.0, "latency_min_ms": 115, "latency_max_ms": 115},
+    ]
+
+    deltas = build_deltas(rows, ZoneInfo("UTC"))
+    sketch = deltas[("hour", "sales", hour)].sketch
+
+    assert sketch.zero_count == 3
+    assert sketch.bins == {240: 2}
+    assert sketch.count == 5
+    assert deltas[("hour", "sales", hour)].latency_count == 5
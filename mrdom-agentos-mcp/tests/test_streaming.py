@@ -0,0 +1,108 @@
+"""
+Testes do streaming NDJSON duplex (upload lido enquanto a resposta é enviada)
+"""
+
+import asyncio
+
+from starlette.requests import ClientDisconnect
+
+from src.mrdom.core.streaming import (
+    DuplexStreamingResponse,
+    UploadStream,
+    bounded_as_completed,
+    iter_ndjson,
+    ndjson_line,
+)
+
+SCOPE = {"type": "http", "method": "POST", "path": "/bulk", "headers": []}
+
+
+def make_receive(chunks, disconnect):
+    """Entrega os chunks do corpo e, depois de `disconnect` ser setado, http.disconnect."""
+    queue = list(chunks)
+
+    async def receive():
+        if queue:
+            body = queue.pop(0)
+            return {"type": "http.request", "body": body, "more_body": bool(queue)}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    return receive
+
+
+def bulk_response(receive, started, cancelled, delay):
+    upload = UploadStream(receive)
+
+    async def worker(record):
+        started.append(record.line)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(record.line)
+            raise
+        return {"line": record.line}
+
+    async def results():
+        try:
+            async for result in bounded_as_completed(iter_ndjson(upload, 1024), worker, 2):
+                yield ndjson_line(result)
+        except ClientDisconnect:
+            return
+        yield ndjson_line({"done": True})
+
+    return DuplexStreamingResponse(results(), upload=upload, media_type="application/x-ndjson")
+
+
+async def test_disconnect_after_upload_cancels_pending_workers():
+    disconnect = asyncio.Event()
+    started, cancelled, sent = [], [], []
+    receive = make_receive([b'{"a": 1}\n', b'{"a": 2}\n'], disconnect)
+    response = bulk_response(receive, started, cancelled, 10)
+
+    async def send(message):
+        sent.append(message)
+
+    call = asyncio.ensure_future(response(SCOPE, receive, send))
+    await asyncio.sleep(0.05)
+    assert started == [1, 2]
+    disconnect.set()
+    await asyncio.wait_for(call, 1)
+
+    assert sorted(cancelled) == [1, 2]
+    assert not any(m.get("body", b"").startswith(b'{"done"') for m in sent)
+
+
+async def test_disconnect_during_upload_ends_stream():
+    started, cancelled, sent = [], [], []
+    # Corpo incompleto (more_body) seguido de http.disconnect
+    chunks = [b'{"a": 1}\n', b'{"a": 2}']
+
+    async def receive():
+        if chunks:
+            return {"type": "http.request", "body": chunks.pop(0), "more_body": True}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await asyncio.wait_for(bulk_response(receive, started, cancelled, 0)(SCOPE, receive, send), 1)
+    body = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    assert b'"done"' not in body
+
+
+async def test_complete_stream_without_disconnect():
+    disconnect = asyncio.Event()
+    started, cancelled, sent = [], [], []
+    receive = make_receive([b'{"a": 1}\n', b'{"a": 2}'], disconnect)
+    response = bulk_response(receive, started, cancelled, 0)
+
+    async def send(message):
+        sent.append(message)
+
+    await asyncio.wait_for(response(SCOPE, receive, send), 1)
+
+    body = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    assert body.splitlines()[-1] == b'{"done": true}'
+    assert sorted(started) == [1, 2]
+    assert cancelled == []